@@ -1,5 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils.text import Truncator
+from django.utils.translation import ngettext
 from django_summernote.admin import SummernoteModelAdmin
+from chaos_app.paginators import EstimatedCountPaginator
 from .models import About, CollaborateRequest
 
 # Register About Model
@@ -13,4 +16,32 @@ class AboutAdmin(SummernoteModelAdmin):
 @admin.register(CollaborateRequest)
 class CollaborateRequestAdmin(admin.ModelAdmin):
 
-    list_display = ('message', 'read',)
+    list_display = ('name', 'email', 'short_message', 'read',)
+    # Indexed together with the id ordering (collaborate_read_idx)
+    list_filter = ('read',)
+    ordering = ('-id',)
+    actions = ('mark_read', 'mark_unread')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description='Message')
+    def short_message(self, obj):
+        return Truncator(obj.message).chars(80)
+
+    def _set_read(self, request, queryset, read):
+        # A single UPDATE, however many requests are selected
+        updated = queryset.update(read=read)
+        state = 'read' if read else 'unread'
+        self.message_user(request, ngettext(
+            '%(count)d request marked as %(state)s.',
+            '%(count)d requests marked as %(state)s.',
+            updated,
+        ) % {'count': updated, 'state': state}, messages.SUCCESS)
+
+    @admin.action(description='Mark selected requests as read')
+    def mark_read(self, request, queryset):
+        self._set_read(request, queryset, True)
+
+    @admin.action(description='Mark selected requests as unread')
+    def mark_unread(self, request, queryset):
+        self._set_read(request, queryset, False)
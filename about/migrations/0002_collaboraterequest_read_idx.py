@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('about', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='collaboraterequest',
+            index=models.Index(fields=['read', '-id'], name='collaborate_read_idx'),
+        ),
+    ]
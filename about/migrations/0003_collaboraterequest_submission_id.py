@@ -0,0 +1,31 @@
+import uuid
+from django.db import migrations, models
+
+
+def fill_submission_ids(apps, schema_editor):
+    # Existing rows each need their own id before the column can be unique
+    CollaborateRequest = apps.get_model('about', 'CollaborateRequest')
+    for collaborate_request in CollaborateRequest.objects.filter(submission_id__isnull=True).only('pk'):
+        collaborate_request.submission_id = uuid.uuid4()
+        collaborate_request.save(update_fields=['submission_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('about', '0002_collaboraterequest_read_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collaboraterequest',
+            name='submission_id',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_submission_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='collaboraterequest',
+            name='submission_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 # User Model
 from django.contrib.auth.models import User
@@ -28,6 +29,14 @@ class CollaborateRequest(models.Model):
     email = models.EmailField(max_length=254)  # Standard email max length
     message = models.TextField(max_length=500)  # Add reasonable limit
     read = models.BooleanField(default=False)
+    # Makes inserts idempotent when requests are written behind (see chaos_app/write_behind.py)
+    submission_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # The admin changelist: filtered by read, newest first
+            models.Index(fields=['read', '-id'], name='collaborate_read_idx'),
+        ]
 
     def __str__(self):
         return f"Collaboration request from {self.name}"
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from about.models import CollaborateRequest
+
+
+class CollaborateRequestAdminTest(TestCase):
+    """Test cases for the collaboration request admin"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        self.url = reverse('admin:about_collaboraterequest_changelist')
+        CollaborateRequest.objects.bulk_create(
+            CollaborateRequest(name=f'Person {n}', email=f'p{n}@example.com', message='x' * 400)
+            for n in range(5)
+        )
+
+    def test_message_is_truncated(self):
+        """Test that the changelist shows a shortened message"""
+        response = self.client.get(self.url)
+        self.assertContains(response, 'x' * 79 + '…')
+        self.assertNotContains(response, 'x' * 81)
+
+    def test_filter_by_read(self):
+        """Test that requests can be filtered by read status"""
+        CollaborateRequest.objects.filter(name='Person 0').update(read=True)
+        response = self.client.get(self.url, {'read__exact': '0'})
+        self.assertEqual(response.context['cl'].result_count, 4)
+
+    def test_mark_read_is_one_update(self):
+        """Test that the mark read action updates every selected row in one query"""
+        ids = list(CollaborateRequest.objects.values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'action': 'mark_read', '_selected_action': ids,
+            }, follow=True)
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "about_collaboraterequest"')]
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(CollaborateRequest.objects.filter(read=False).exists())
+        self.assertContains(response, '5 requests marked as read.')
+
+    def test_mark_unread(self):
+        """Test that requests can be marked unread again"""
+        CollaborateRequest.objects.update(read=True)
+        ids = list(CollaborateRequest.objects.values_list('pk', flat=True)[:2])
+        self.client.post(self.url, {'action': 'mark_unread', '_selected_action': ids})
+        self.assertEqual(CollaborateRequest.objects.filter(read=False).count(), 2)
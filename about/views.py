@@ -1,7 +1,11 @@
+import uuid
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from .models import About
 from .forms import FeedbackForm
+from chaos_app.conditional import not_modified, page_etag, set_validators
+from chaos_app.write_behind import get_buffer
 
 
 # Create your views here.
@@ -10,6 +14,9 @@ def about(request):
     Returns the 'about' model content created by the superuser to be displayed as the about section in about/about.html. Also returns the feedback form for users to submit their messages.
 
     Handles feedback form submissions. If form is valid the form is saved to the database, the user sees a success message and is redirected to the about template. If form is invalid the user sees an error message.
+    With COLLABORATE_WRITE_BEHIND the request is appended to a write-behind buffer instead, and inserted by the next flush.
+
+    GET responses carry an ETag built from About.updated_on (and a Last-Modified date), so a browser whose copy is current gets a 304 without a render. Pending flash messages always get a full page.
 
     **Context**
         about (About): The latest About model instance.
@@ -22,16 +29,34 @@ def about(request):
     if request.method == "POST":
         form = FeedbackForm(request.POST)
         if form.is_valid():
-            form.save()
+            if settings.COLLABORATE_WRITE_BEHIND:
+                # Buffered on disk and inserted later by a flush (chaos_app/write_behind.py)
+                get_buffer('collaborate_requests').append({
+                    **form.cleaned_data, 'submission_id': uuid.uuid4(),
+                })
+            else:
+                form.save()
             messages.add_message(request, messages.SUCCESS, "Contact form sent successfully!")
             return redirect('about')
         else:
             messages.add_message(request, messages.ERROR, "Error sending contact form. Please try again.")
 
     about = About.objects.all().order_by("-updated_on").first()
+    updated_on = about.updated_on if about else None
+    etag = None
+    if request.method != "POST":
+        # A 304 when the browser's copy is current, before anything is rendered
+        etag = page_etag(request, request.user, 'about', updated_on)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
     form = FeedbackForm()
 
-    return render(request, 'about/about.html', {
+    response = render(request, 'about/about.html', {
         'about': about,
         'form': form,
     })
+    if etag is not None:
+        set_validators(response, etag, updated_on)
+    return response
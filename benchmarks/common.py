@@ -0,0 +1,285 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The scripts talk to a real server process over HTTP, so they need the same
+environment variables as the app itself (DATABASE_URL, SECRET_KEY,
+CLOUDINARY_URL) and a collected static manifest. A throwaway SQLite database
+works for quick local runs:
+
+    DATABASE_URL=sqlite:////tmp/chaos-bench.sqlite3 python manage.py migrate
+    python manage.py collectstatic --noinput
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# gunicorn config with no settings, i.e. gunicorn's built-in defaults
+DEFAULT_CONFIG = 'python:benchmarks.gunicorn_defaults'
+
+
+def setup_django():
+    """Configure Django so the scripts can seed data through the ORM."""
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chaos_cards.settings')
+    import django
+    django.setup()
+
+
+def seed_user(username, card_count):
+    """
+    Create (or reset) a benchmark user with ``card_count`` cards and return
+    the cookies that log a client in as that user.
+    """
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from chaos_app.models import Card
+
+    user, _ = User.objects.get_or_create(username=username)
+    Card.objects.filter(user=user).delete()
+    Card.objects.bulk_create(
+        Card(user=user, title=f'Bench card {i}', content='Benchmark content')
+        for i in range(card_count)
+    )
+    client = Client()
+    client.force_login(user)
+    return {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value}
+
+
+def seed_users(prefix, count, card_count):
+    """
+    Create (or reset) ``count`` benchmark users named ``{prefix}-{n}``, each
+    with ``card_count`` cards, and return the login cookies of each user.
+    """
+    return [seed_user(f'{prefix}-{n}', card_count) for n in range(count)]
+
+
+def free_port():
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """
+    Context manager which starts gunicorn in a subprocess and waits until it
+    accepts connections. ``args`` are passed straight to gunicorn. By default
+    gunicorn runs with its built-in defaults; pass ``config='gunicorn.conf.py'``
+    to use the production profile.
+    """
+
+    def __init__(self, *args, config=DEFAULT_CONFIG, env=None):
+        self.port = free_port()
+        self.args = args
+        self.config = config
+        self.env = env
+        self.process = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', self.config,
+             '--bind', f'127.0.0.1:{self.port}', *self.args],
+            cwd=BASE_DIR,
+            env={**os.environ, **(self.env or {})},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(('127.0.0.1', self.port), timeout=0.5):
+                    break
+            except OSError:
+                time.sleep(0.2)
+        else:
+            self.process.kill()
+            raise RuntimeError('Server did not start within 60 seconds')
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+    def rss_mb(self):
+        """Resident memory of the master plus all of its workers, in MB."""
+        return sum(process_rss_kb(pid) for pid in self.pids()) / 1024
+
+    def memory(self):
+        """Per-process RSS and PSS in MB, keyed by role (master / worker-N)."""
+        pids = self.pids()
+        roles = ['master'] + [f'worker-{n}' for n in range(1, len(pids))]
+        return {
+            role: {
+                'rss_mb': round(process_rss_kb(pid) / 1024, 1),
+                'pss_mb': round(process_pss_kb(pid) / 1024, 1),
+            }
+            for role, pid in zip(roles, pids)
+        }
+
+    def pids(self):
+        """The gunicorn master pid followed by its worker pids."""
+        pids = [self.process.pid]
+        children = Path(f'/proc/{self.process.pid}/task/{self.process.pid}/children')
+        if children.exists():
+            pids += [int(pid) for pid in children.read_text().split()]
+        return pids
+
+
+def process_rss_kb(pid):
+    """Return VmRSS for ``pid`` in kB (Linux only, 0 elsewhere)."""
+    try:
+        for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def process_pss_kb(pid):
+    """
+    Return the proportional set size for ``pid`` in kB. Unlike RSS, pages
+    shared copy-on-write with the master are split between the processes
+    sharing them (Linux only, 0 elsewhere).
+    """
+    try:
+        for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines():
+            if line.startswith('Pss:'):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def run_load(url, cookies=None, concurrency=10, duration=10.0):
+    """
+    Hit ``url`` from ``concurrency`` client threads for ``duration`` seconds
+    and return throughput and latency percentiles (milliseconds).
+    """
+    def get(session, state):
+        return session.get(url, allow_redirects=False, timeout=30)
+
+    return run_clients(get, cookies, concurrency, duration)
+
+
+def run_clients(action, cookies=None, concurrency=10, duration=10.0, setup=None):
+    """
+    Run ``action(session, state)`` in a loop from ``concurrency`` client
+    threads for ``duration`` seconds and return throughput and latency
+    percentiles (milliseconds).
+
+    ``cookies`` is one dict shared by every client, or a list of dicts handed
+    out round robin (e.g. one benchmark user per client). ``setup(session,
+    index)`` runs once per client before the clock starts and returns the
+    ``state`` passed to ``action``. An action returning None has nothing left
+    to do, and its client stops early.
+    """
+    if not isinstance(cookies, list):
+        cookies = [cookies or {}]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    ready = threading.Barrier(concurrency + 1)
+    stop_at = None
+
+    def client(index):
+        nonlocal errors
+        session = requests.Session()
+        session.cookies.update(cookies[index % len(cookies)])
+        state = setup(session, index) if setup else None
+        ready.wait()
+        local, local_errors = [], 0
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = action(session, state)
+                if response is None:
+                    break
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            if ok:
+                local.append((time.perf_counter() - started) * 1000)
+            else:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    # Start the clock once every client has finished its setup
+    stop_at = time.monotonic() + duration
+    started = time.monotonic()
+    ready.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+class SQLTimer:
+    """Adds up the time spent executing SQL on a connection."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+
+def time_spins(spin, spins):
+    """Run ``spin()`` ``spins`` times; percentiles of the whole call and of its SQL."""
+    from django.db import connection
+
+    totals, sql = [], []
+    for _ in range(spins):
+        timer = SQLTimer()
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            spin()
+            totals.append((time.perf_counter() - started) * 1000)
+        sql.append(timer.elapsed * 1000)
+    totals.sort()
+    sql.sort()
+    return {
+        'p50_ms': round(percentile(totals, 50), 3),
+        'p95_ms': round(percentile(totals, 95), 3),
+        'sql_p50_ms': round(percentile(sql, 50), 3),
+        'sql_p95_ms': round(percentile(sql, 95), 3),
+    }
@@ -0,0 +1,101 @@
+"""
+Time of a global spin (chaos_app.global_spin.random_public_card) over a
+table of 10M cards of which one in ten is public, next to the naive
+ORDER BY RANDOM() over the public cards. Runs in-process against
+DATABASE_URL and prints the plan of an id probe, which should only read
+card_public_idx.
+
+    python -m benchmarks.global_spin --cards 10000000 --public-every 10
+
+The SQL columns time statement execution only (see benchmarks/tag_spin.py).
+The pool stats are read once before timing, as a busy site always has them
+cached; their cold read is reported on its own.
+
+The cards are written by a single INSERT ... SELECT per million rows, which
+works on SQLite and PostgreSQL, and belong to one benchmark user. Public
+cards are spread evenly, so most probed ids miss, as they would with many
+private decks. The seeded table is reused by later runs with the same sizes.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import setup_django, time_spins
+
+USERNAME = 'bench-global'
+CHUNK = 1_000_000
+
+
+def seed(card_count, public_every):
+    """Create (or reuse) the benchmark user's cards, every ``public_every``-th one public."""
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+    from chaos_app.models import Card
+
+    user, _ = User.objects.get_or_create(username=USERNAME)
+    cards = Card.objects.filter(user=user)
+    if cards.count() == card_count and cards.filter(is_public=True).count() == card_count // public_every:
+        return user
+
+    table = Card._meta.db_table
+    # Straight DELETE: the ORM would fetch and signal every card
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE user_id = %s', [user.pk])
+    for start in range(0, card_count, CHUNK):
+        size = min(CHUNK, card_count - start)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < %s)
+                INSERT INTO {table}
+                    (user_id, title, content, featured_image, created_on, updated_on, is_public)
+                SELECT %s, 'Bench card', 'Benchmark content', 'placeholder',
+                       CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, (i + %s) %% %s = 0
+                FROM n
+                """,
+                [size, user.pk, start, public_every],
+            )
+        print(f'seeded {start + size} cards', flush=True)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {table}')
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cards', type=int, default=10_000_000)
+    parser.add_argument('--public-every', type=int, default=10)
+    parser.add_argument('--spins', type=int, default=1000)
+    parser.add_argument('--naive-spins', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from chaos_app import global_spin
+
+    seed(args.cards, args.public_every)
+
+    cache.delete(global_spin.STATS_KEY)
+    started = time.perf_counter()
+    low, high, count = global_spin.pool_stats()
+    stats_ms = (time.perf_counter() - started) * 1000
+    size = global_spin.batch_size(low, high, count)
+
+    results = {
+        'cards': args.cards,
+        'public_cards': count,
+        'batch_size': size,
+        'cold_stats_ms': round(stats_ms, 3),
+        'probed': time_spins(global_spin.random_public_card, args.spins),
+        # The naive spin sorts every public card: a handful of runs is plenty
+        'order_by_random': time_spins(
+            lambda: global_spin.public_cards().order_by('?').first(), args.naive_spins,
+        ),
+    }
+    print(json.dumps(results, indent=2))
+    print('Plan of an id probe:')
+    print(global_spin.public_cards().order_by().filter(pk__in=list(range(low, low + size))).explain())
+
+
+if __name__ == '__main__':
+    main()
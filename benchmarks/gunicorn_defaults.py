@@ -0,0 +1,4 @@
+"""
+Empty gunicorn config used by the benchmarks to run with gunicorn's
+built-in defaults instead of the production profile in gunicorn.conf.py.
+"""
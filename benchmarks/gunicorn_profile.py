@@ -0,0 +1,51 @@
+"""
+Compare the production gunicorn profile (gunicorn.conf.py) against gunicorn's
+defaults, reporting throughput, latency and RSS/PSS per worker. PSS shows how
+much memory preloading saves through copy-on-write sharing with the master.
+
+    python -m benchmarks.gunicorn_profile --concurrency 32 --duration 20
+"""
+import argparse
+import json
+
+from benchmarks.common import DEFAULT_CONFIG, Server, run_load, seed_user, setup_django
+
+PROFILES = {
+    # What the Procfile used to run: one sync worker, no preload
+    'defaults': {'args': ('chaos_cards.wsgi:application',)},
+    'production': {'args': ('chaos_cards.asgi:application',), 'config': 'gunicorn.conf.py'},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--cards', type=int, default=100)
+    parser.add_argument('--path', default='/spin/')
+    args = parser.parse_args()
+
+    setup_django()
+    cookies = seed_user('bench-gunicorn', args.cards)
+
+    results = {}
+    for name, profile in PROFILES.items():
+        with Server(*profile['args'], config=profile.get('config', DEFAULT_CONFIG)) as server:
+            url = f'{server.url}{args.path}'
+            run_load(url, cookies, concurrency=2, duration=2)
+            result = run_load(url, cookies, args.concurrency, args.duration)
+            memory = server.memory()
+            workers = [usage for role, usage in memory.items() if role != 'master']
+            result['workers'] = len(workers)
+            result['memory'] = memory
+            result['total_pss_mb'] = round(sum(usage['pss_mb'] for usage in memory.values()), 1)
+            result['avg_worker_pss_mb'] = round(
+                sum(usage['pss_mb'] for usage in workers) / len(workers), 1
+            ) if workers else None
+            results[name] = result
+
+    print(json.dumps({'path': args.path, 'concurrency': args.concurrency, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Measure the cost of ServerTimingMiddleware by running the same spin and
+My Cards load with SERVER_TIMING_SAMPLE_RATE=0 (disabled) and 1 (every
+request instrumented).
+
+    python -m benchmarks.server_timing_overhead --concurrency 16
+"""
+import argparse
+import json
+
+from benchmarks.common import Server, run_load, seed_user, setup_django
+
+RATES = ('0', '1')
+PATHS = ('/spin/', '/my-cards/')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--cards', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    cookies = seed_user('bench-timing', args.cards)
+
+    results = {}
+    for rate in RATES:
+        env = {'SERVER_TIMING_SAMPLE_RATE': rate}
+        with Server(
+            'chaos_cards.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker',
+            '--workers', str(args.workers), env=env,
+        ) as server:
+            results[f'sample_rate_{rate}'] = {}
+            for path in PATHS:
+                # Warm-up pass so imports and connections are not measured
+                run_load(f'{server.url}{path}', cookies, concurrency=2, duration=2)
+                results[f'sample_rate_{rate}'][path] = run_load(
+                    f'{server.url}{path}', cookies, args.concurrency, args.duration,
+                )
+
+    for path in PATHS:
+        off = results['sample_rate_0'][path]['p50_ms']
+        on = results['sample_rate_1'][path]['p50_ms']
+        results.setdefault('p50_overhead_ms', {})[path] = round(on - off, 2)
+    print(json.dumps({'workers': args.workers, 'concurrency': args.concurrency, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Compare concurrent spin throughput under WSGI (sync gunicorn workers) and
+ASGI (gunicorn with uvicorn workers) using the same number of worker
+processes, so both servers run in roughly the same memory.
+
+    python -m benchmarks.spin_wsgi_vs_asgi --workers 2 --concurrency 32
+"""
+import argparse
+import json
+
+from benchmarks.common import Server, run_load, seed_user, setup_django
+
+PROFILES = {
+    'wsgi': ('chaos_cards.wsgi:application', '--worker-class', 'sync'),
+    'asgi': ('chaos_cards.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--cards', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    cookies = seed_user('bench-spin', args.cards)
+
+    results = {}
+    for name, server_args in PROFILES.items():
+        with Server(*server_args, '--workers', str(args.workers)) as server:
+            # Warm-up pass so imports and connections are not measured
+            run_load(f'{server.url}/spin/', cookies, concurrency=2, duration=2)
+            result = run_load(f'{server.url}/spin/', cookies, args.concurrency, args.duration)
+            result['rss_mb'] = round(server.rss_mb(), 1)
+            result['rps_per_100mb'] = round(result['rps'] / result['rss_mb'] * 100, 1) if result['rss_mb'] else None
+            results[name] = result
+
+    print(json.dumps({'workers': args.workers, 'concurrency': args.concurrency, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
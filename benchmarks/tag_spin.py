@@ -0,0 +1,105 @@
+"""
+Time of a tag-filtered spin (chaos_app.tags.arandom_tagged_card) over a deck
+of 100k cards with 50 tags, for one, two and three tags, next to the naive
+ORDER BY RANDOM() over the same cards. Runs in-process against DATABASE_URL
+with the deck cache off, so every spin goes to the database, and prints the
+plan of the match query, which should only read the CardTag indexes.
+
+    python -m benchmarks.tag_spin --cards 100000 --tags 50
+
+The SQL columns time statement execution only; rows streamed out of the
+database afterwards show in the whole-call columns, as do the thread hops
+of the async ORM.
+
+Tags are spread unevenly (tag n is on roughly 1/(n+1) as many cards as tag
+0), so the cases cover large and small matches. The seeded deck is reused
+by later runs with the same sizes.
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import setup_django, time_spins
+
+USERNAME = 'bench-tags'
+
+
+def seed(card_count, tag_count):
+    """Create (or reuse) the benchmark user's tagged deck. Returns (user, tag names by size)."""
+    from django.contrib.auth.models import User
+    from chaos_app.models import Card, CardTag, Tag
+
+    user, _ = User.objects.get_or_create(username=USERNAME)
+    names = [f'tag{n:02d}' for n in range(tag_count)]
+    if Card.objects.filter(user=user).count() == card_count and Tag.objects.filter(user=user).count() == tag_count:
+        return user, names
+
+    Card.objects.filter(user=user).delete()
+    Tag.objects.filter(user=user).delete()
+    tags = Tag.objects.bulk_create(Tag(user=user, name=name) for name in names)
+    weights = [1 / (n + 1) for n in range(tag_count)]
+    rng = random.Random(47)
+    for start in range(0, card_count, 5000):
+        cards = Card.objects.bulk_create(
+            Card(user=user, title=f'Bench card {n}', content='Benchmark content')
+            for n in range(start, min(start + 5000, card_count))
+        )
+        CardTag.objects.bulk_create(
+            CardTag(card=card, tag=tag)
+            for card in cards
+            for tag in set(rng.choices(tags, weights, k=rng.randint(1, 3)))
+        )
+    # bulk_create() skips the signals which keep the counts
+    for tag in tags:
+        Tag.objects.filter(pk=tag.pk).update(card_count=CardTag.objects.filter(tag=tag).count())
+    return user, names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cards', type=int, default=100_000)
+    parser.add_argument('--tags', type=int, default=50)
+    parser.add_argument('--spins', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from asgiref.sync import async_to_sync
+    from django.conf import settings
+    from chaos_app.models import Card
+    from chaos_app.tags import arandom_tagged_card, atagged_card_ids
+
+    settings.DECK_CACHE_ENABLED = False
+    user, names = seed(args.cards, args.tags)
+    cases = {
+        'largest tag': [names[0]],
+        'smallest tag': [names[-1]],
+        'two tags': [names[0], names[1]],
+        'three tags': [names[0], names[1], names[2]],
+    }
+
+    def matches(names):
+        return async_to_sync(atagged_card_ids)(user.pk, names)
+
+    results = {}
+    for case, case_names in cases.items():
+        def naive(case_names=case_names):
+            cards = Card.objects.filter(user=user)
+            for name in case_names:
+                cards = cards.filter(tags__name=name)
+            return cards.order_by('?').first()
+
+        results[case] = {
+            'tags': case_names,
+            'matches': matches(case_names).count(),
+            'indexed': time_spins(lambda: async_to_sync(arandom_tagged_card)(user.pk, case_names), args.spins),
+            # The naive spin sorts every match: a tenth of the runs is plenty
+            'order_by_random': time_spins(naive, max(1, args.spins // 10)),
+        }
+
+    print(json.dumps({'cards': args.cards, 'tags': args.tags, 'results': results}, indent=2))
+    print('Plan of the match query (three tags):')
+    print(matches(cases['three tags']).explain())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Per-render time for the home, My Cards and login templates, comparing
+uncached template loaders with the cached loader, and cold with warm
+{% cache %} fragments (nav and footer in base.html). Runs in-process and
+needs no database rows.
+
+    python -m benchmarks.template_render --renders 500
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import percentile, setup_django
+
+
+def build_cases():
+    from allauth.account.forms import LoginForm
+    from django.contrib.auth.models import AnonymousUser, User
+    from django.core.paginator import Paginator
+    from django.test import RequestFactory
+    from django.urls import resolve
+    from chaos_app.forms import CardForm
+    from chaos_app.models import Card
+
+    user = User(id=1, username='bench')
+    cards = [Card(id=i, user=user, title=f'Card {i}', content='Benchmark content ' * 10) for i in range(10)]
+    page = Paginator(cards, 10).get_page(1)
+
+    def request_for(path, request_user):
+        request = RequestFactory().get(path)
+        request.user = request_user
+        request.resolver_match = resolve(path)
+        return request
+
+    return {
+        'home': ('chaos_app/home.html', lambda: request_for('/spin/', user), lambda request: {
+            'random_card': cards[0], 'spin_attempted': True,
+        }),
+        'user_cards': ('chaos_app/user_cards.html', lambda: request_for('/my-cards/', user), lambda request: {
+            'form': CardForm(), 'cards': page, 'page_obj': page, 'is_paginated': False,
+        }),
+        'login': ('account/login.html', lambda: request_for('/accounts/login/', AnonymousUser()), lambda request: {
+            'form': LoginForm(request=request), 'signup_url': '/accounts/signup/',
+            'redirect_field_name': 'next', 'redirect_field_value': '',
+        }),
+    }
+
+
+def uncached_backend():
+    """A copy of the configured template backend without the cached loader."""
+    from django.conf import settings
+    from django.template.backends.django import DjangoTemplates
+
+    config = settings.TEMPLATES[0]
+    options = {**config['OPTIONS'], 'loaders': [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]}
+    return DjangoTemplates({
+        'NAME': 'uncached', 'DIRS': config['DIRS'], 'APP_DIRS': False, 'OPTIONS': options,
+    })
+
+
+def time_renders(backend, template_name, make_request, make_context, renders, clear_fragments):
+    from django.core.cache import caches
+
+    timings = []
+    for _ in range(renders):
+        if clear_fragments:
+            caches['template_fragments'].clear()
+        request = make_request()
+        context = make_context(request)
+        started = time.perf_counter()
+        backend.get_template(template_name).render(context, request)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--renders', type=int, default=300)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.template import engines
+
+    modes = {
+        'uncached_loaders': (uncached_backend(), True),
+        'cached_loader': (engines['django'], True),
+        'cached_loader_warm_fragments': (engines['django'], False),
+    }
+    results = {}
+    for case, (template_name, make_request, make_context) in build_cases().items():
+        results[case] = {
+            mode: time_renders(backend, template_name, make_request, make_context, args.renders, clear)
+            for mode, (backend, clear) in modes.items()
+        }
+    print(json.dumps({'renders': args.renders, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
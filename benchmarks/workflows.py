@@ -0,0 +1,159 @@
+"""
+Throughput and p50/p95/p99 latency of the card workflows (spin, list page 1
+and a deep page, create, edit, delete, about) against a locally started
+gunicorn running the production profile, with one synthetic user per client.
+
+    python -m benchmarks.workflows --cards 1000 --concurrency 16 --output run.json
+    python -m benchmarks.workflows --baseline run.json --threshold 10
+
+With --baseline, the run fails (exit status 1) when any scenario's p95
+latency rose, or its throughput fell, by more than --threshold percent.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, Server, run_clients, run_load, seed_users, setup_django
+
+
+def card_ids(prefix, users):
+    """Card ids of each benchmark user, in the order seed_users created them."""
+    from chaos_app.models import Card
+
+    return [
+        list(Card.objects.filter(user__username=f'{prefix}-{n}').values_list('id', flat=True))
+        for n in range(users)
+    ]
+
+
+def get(path):
+    def action(session, state):
+        return session.get(state['url'] + path, allow_redirects=False, timeout=30)
+    return action
+
+
+def create(session, state):
+    return session.post(state['url'] + '/my-cards/', data={
+        'csrfmiddlewaretoken': state['csrf'], 'title': 'Bench card', 'content': 'Benchmark content',
+    }, allow_redirects=False, timeout=30)
+
+
+def edit(session, state):
+    card_id = random.choice(state['card_ids'])
+    return session.post(f"{state['url']}/my-cards/edit_card/{card_id}/", data={
+        'csrfmiddlewaretoken': state['csrf'], 'title': 'Edited card', 'content': 'Edited content',
+    }, allow_redirects=False, timeout=30)
+
+
+def delete(session, state):
+    if not state['card_ids']:
+        return None  # This client's deck is empty
+    card_id = state['card_ids'].pop()
+    return session.post(f"{state['url']}/my-cards/delete-card/{card_id}/", data={
+        'csrfmiddlewaretoken': state['csrf'],
+    }, allow_redirects=False, timeout=30)
+
+
+def scenarios(cards):
+    last_page = max(1, (cards + 9) // 10)
+    return {
+        'spin': get('/spin/'),
+        'list_first_page': get('/my-cards/'),
+        'list_deep_page': get(f'/my-cards/?page={last_page}'),
+        'create': create,
+        'edit': edit,
+        'delete': delete,
+        'about': get('/about/'),
+    }
+
+
+def run_scenario(server, action, args):
+    """Reseed the users, then run one scenario with one user per client."""
+    prefix = 'bench-workflow'
+    cookies = seed_users(prefix, args.concurrency, args.cards)
+    ids = card_ids(prefix, args.concurrency)
+
+    def setup(session, index):
+        # Visiting My Cards sets the CSRF cookie used by the POST scenarios
+        session.get(f'{server.url}/my-cards/', timeout=30)
+        return {'url': server.url, 'csrf': session.cookies.get('csrftoken'), 'card_ids': ids[index]}
+
+    return run_clients(action, cookies, args.concurrency, args.duration, setup=setup)
+
+
+def compare(results, baseline, threshold):
+    """Return a description of every scenario that regressed past threshold %."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and result['p95_ms'] > before['p95_ms'] * (1 + threshold / 100):
+            regressions.append(f"{name}: p95 {before['p95_ms']} ms -> {result['p95_ms']} ms")
+        if before['rps'] and result['rps'] < before['rps'] * (1 - threshold / 100):
+            regressions.append(f"{name}: throughput {before['rps']} -> {result['rps']} req/s")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, text=True, stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cards', type=int, default=100, help='cards in each user deck')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients (one user each)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--scenarios', nargs='+', help='run only these scenarios')
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed regression, in percent')
+    args = parser.parse_args()
+
+    setup_django()
+    selected = scenarios(args.cards)
+    if args.scenarios:
+        selected = {name: selected[name] for name in args.scenarios}
+
+    results = {}
+    env = {'WEB_CONCURRENCY': str(args.workers)}
+    with Server('chaos_cards.asgi:application', config='gunicorn.conf.py', env=env) as server:
+        # Warm-up pass so imports, templates and connections are not measured
+        run_load(f'{server.url}/about/', concurrency=2, duration=2)
+        for name, action in selected.items():
+            results[name] = run_scenario(server, action, args)
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'cards': args.cards,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'workers': args.workers,
+        'results': results,
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            report['regressions'] = compare(results, json.load(baseline_file), args.threshold)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    if report.get('regressions'):
+        print('\n'.join(['Regressions:'] + report['regressions']), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,145 @@
 from django.contrib import admin
-from .models import Card
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .models import Card, RequestProfile, SharedDeck, SlowQuery, Tag
+from .paginators import EstimatedCountPaginator
+from .profiler import HEADER, make_token
 
 # Register card model
 
 @admin.register(Card)
 class CardAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'created_on')
+    # Trigram-indexed on PostgreSQL (migration 0005_card_trigram_search)
     search_fields = ('title', 'content')
     list_filter = ('created_on',)
     ordering = ('-created_on',)
+    # One query for the page, not one per row for the user column
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    # No COUNT(*) over the whole table: the total is estimated (see
+    # chaos_app/paginators.py) and filtered lists skip the full count
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+# Register tag model
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'card_count')
+    search_fields = ('name',)
+    ordering = ('user', 'name')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+# Register shared deck model
+
+@admin.register(SharedDeck)
+class SharedDeckAdmin(admin.ModelAdmin):
+    list_display = ('user', 'slug', 'published', 'version', 'created_on')
+    list_filter = ('published',)
+    search_fields = ('slug', 'user__username')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('version',)
+
+# Register request profile model
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_on', 'method', 'path', 'view_name', 'status_code', 'duration_ms', 'user')
+    list_filter = ('view_name', 'status_code')
+    search_fields = ('path',)
+    list_select_related = ('user',)
+    readonly_fields = ('created_on', 'user', 'method', 'path', 'view_name', 'status_code',
+                       'duration_ms', 'peak_memory_kb', 'results')
+    exclude = ('stats', 'collapsed_stacks', 'memory')
+    change_list_template = 'admin/chaos_app/requestprofile/change_list.html'
+
+    # Sortable columns of the cProfile table
+    STATS_COLUMNS = ('function', 'calls', 'tottime', 'cumtime')
+
+    def has_add_permission(self, request):
+        # Profiles are only ever created by ProfilerMiddleware
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/stats/', self.admin_site.admin_view(self.stats_view),
+                 name='chaos_app_requestprofile_stats'),
+            path('<int:pk>/collapsed/', self.admin_site.admin_view(self.collapsed_view),
+                 name='chaos_app_requestprofile_collapsed'),
+        ] + super().get_urls()
+
+    @admin.display(description='Results')
+    def results(self, obj):
+        return format_html(
+            '<a href="{}">cProfile table</a> | <a href="{}">Collapsed stacks (flamegraph)</a>',
+            reverse('admin:chaos_app_requestprofile_stats', args=[obj.pk]),
+            reverse('admin:chaos_app_requestprofile_collapsed', args=[obj.pk]),
+        )
+
+    def changelist_view(self, request, extra_context=None):
+        # A fresh signed header for profiling a request from outside the browser
+        extra_context = {
+            **(extra_context or {}),
+            'profile_header': HEADER,
+            'profile_token': make_token(),
+            'profile_memory_token': make_token(memory=True),
+        }
+        return super().changelist_view(request, extra_context)
+
+    def stats_view(self, request, pk):
+        # admin_view() only checks for staff, not for this model
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        sort = request.GET.get('sort', 'cumtime')
+        if sort not in self.STATS_COLUMNS:
+            sort = 'cumtime'
+        rows = sorted(profile.stats, key=lambda row: row[sort], reverse=sort != 'function')
+        return TemplateResponse(request, 'admin/chaos_app/requestprofile/stats.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Profile of {profile}',
+            'profile': profile,
+            'rows': rows,
+            'columns': self.STATS_COLUMNS,
+            'sort': sort,
+        })
+
+    def collapsed_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(profile.collapsed_stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.folded"'
+        return response
+
+# Register slow query model
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('recorded_on', 'duration_ms', 'view_name', 'short_sql')
+    list_filter = ('view_name',)
+    search_fields = ('sql',)
+    readonly_fields = ('recorded_on', 'duration_ms', 'view_name', 'sql', 'params', 'many', 'plan', 'stack')
+    exclude = ('slot',)
+
+    def has_add_permission(self, request):
+        # Slow queries are only ever recorded by chaos_app.slow_queries
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='SQL')
+    def short_sql(self, obj):
+        return obj.sql[:120]
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+# Cache-backed resolution of request.user
+
+USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300)
+
+
+def user_cache_key(user_id):
+    """Return the cache key holding the resolved user for ``user_id``."""
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drop the cached user so the next request reloads it from the database."""
+    cache.delete(user_cache_key(user_id))
+
+
+def enabled():
+    """True if resolved users are cached (AUTH_USER_CACHE_ENABLED)."""
+    return settings.AUTH_USER_CACHE_ENABLED
+
+
+def _is_valid_hit(user, backend_path, session_hash):
+    """
+    A cached user is only trusted when the session was created by a configured
+    backend, the user is still active (the backends refuse inactive users) and
+    the session auth hash still matches the cached user's password hash, which
+    mirrors the checks made by django.contrib.auth.get_user.
+    """
+    return (
+        user is not None
+        and user.is_active
+        and backend_path in settings.AUTHENTICATION_BACKENDS
+        and session_hash
+        and constant_time_compare(session_hash, user.get_session_auth_hash())
+    )
+
+
+def get_cached_user(request):
+    """
+    Return the user for the request session, serving it from the cache when the
+    session auth hash matches. On a miss (or any mismatch) fall back to the
+    regular database lookup, which also handles session rotation and flushing,
+    and cache the result for the next request.
+    """
+    if not enabled():
+        return auth.get_user(request)
+    try:
+        user_id = request.session[SESSION_KEY]
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if _is_valid_hit(user, backend_path, request.session.get(HASH_SESSION_KEY)):
+        return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, USER_CACHE_TIMEOUT)
+    return user
+
+
+async def aget_cached_user(request):
+    """See get_cached_user()."""
+    if not enabled():
+        return await auth.aget_user(request)
+    user_id = await request.session.aget(SESSION_KEY)
+    backend_path = await request.session.aget(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path is None:
+        return AnonymousUser()
+
+    key = user_cache_key(user_id)
+    user = await cache.aget(key)
+    if _is_valid_hit(user, backend_path, await request.session.aget(HASH_SESSION_KEY)):
+        return user
+
+    user = await auth.aget_user(request)
+    if user.is_authenticated:
+        await cache.aset(key, user, USER_CACHE_TIMEOUT)
+    return user
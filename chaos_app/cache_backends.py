@@ -0,0 +1,31 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from .metrics import observe_cache_lookup
+
+# Cache backends reporting hits and misses to chaos_app.metrics
+#
+# Each cache is labelled with the METRICS_NAME given in its CACHES entry.
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    """Count every get() as a hit or a miss."""
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.metrics_name = params.get('METRICS_NAME', 'default')
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        hit = value is not _MISSING
+        observe_cache_lookup(self.metrics_name, hit)
+        return value if hit else default
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    pass
+
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    pass
@@ -0,0 +1,115 @@
+import functools
+import hashlib
+from pathlib import Path
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.http import HttpResponseNotModified
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags
+
+# Conditional GET for user-scoped pages
+#
+# A page's ETag is computed from cheap validators (a data version or date)
+# before anything is rendered, together with everything else the HTML
+# depends on: the user, the CSRF cookie (its token is in the page's forms)
+# and the release. Pages are marked private and always revalidated, so the
+# browser keeps its copy and a matching request costs a 304.
+#
+# The release is RELEASE_VERSION when the deployment sets it, and otherwise a
+# fingerprint of the build: the static files manifest (every hashed static
+# URL) and the project's templates. Either way a deploy that changes the HTML
+# or the static URLs it points at changes every ETag.
+
+
+def etag_matches(request, etag):
+    """
+    Weak If-None-Match comparison: CompressionMiddleware turns our ETags
+    into weak ones when it compresses a response.
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or any(candidate.removeprefix('W/') == etag for candidate in etags)
+
+
+def has_pending_messages(request):
+    """True if messages are waiting to be shown (len() does not consume them)."""
+    return len(get_messages(request)) > 0
+
+
+def template_dirs():
+    """The project's template directories (not those of installed packages)."""
+    base = Path(settings.BASE_DIR)
+    dirs = [Path(directory) for engine in settings.TEMPLATES for directory in engine.get('DIRS', [])]
+    dirs += [Path(app.path) / 'templates' for app in apps.get_app_configs() if Path(app.path).is_relative_to(base)]
+    return [directory for directory in dirs if directory.is_dir()]
+
+
+@functools.cache
+def build_fingerprint():
+    """Hash of the static files manifest and the project's templates, read once per process."""
+    digest = hashlib.sha1()
+    files = [Path(settings.STATIC_ROOT) / 'staticfiles.json']
+    files += sorted(path for directory in template_dirs() for path in directory.rglob('*') if path.is_file())
+    for path in files:
+        if path.is_file():
+            digest.update(str(path).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def release():
+    """Identifies the deployed code in ETags: RELEASE_VERSION, or the build fingerprint."""
+    return settings.RELEASE_VERSION or build_fingerprint()
+
+
+def page_etag(request, user, name, *validators):
+    """The ETag of page ``name`` for ``user`` and this request, given its data validators."""
+    if 'CSRF_COOKIE' not in request.META:
+        # Issue the CSRF secret now rather than during the render, so the
+        # first response's ETag already matches the cookie it sets
+        get_token(request)
+    parts = (
+        release(),
+        user.pk if user.is_authenticated else '',
+        request.META['CSRF_COOKIE'],
+        *validators,
+    )
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{name}-{digest}"'
+
+
+def not_modified(request, etag):
+    """
+    A 304 for a GET whose copy is current, or None. Never when messages are
+    pending: they are only shown (and cleared) by a full render.
+    """
+    if request.method not in ('GET', 'HEAD') or not etag_matches(request, etag):
+        return None
+    if has_pending_messages(request):
+        return None
+    return set_validators(HttpResponseNotModified(), etag)
+
+
+async def anot_modified(request, etag):
+    """See not_modified()."""
+    if request.method not in ('GET', 'HEAD') or not etag_matches(request, etag):
+        return None
+    # Messages may be kept in the session, which is read synchronously
+    if await sync_to_async(has_pending_messages)(request):
+        return None
+    return set_validators(HttpResponseNotModified(), etag)
+
+
+def set_validators(response, etag, last_modified=None):
+    """Add the ETag (and Last-Modified) of a private, always revalidated page."""
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    response.headers['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Cookie',))
+    return response
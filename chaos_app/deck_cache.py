@@ -0,0 +1,165 @@
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.templatetags.static import static
+from .models import Card
+
+# Cached decks
+#
+# For each user the cache holds the ids of every card in their deck (used to
+# pick a spin without counting the deck) and the first page of My Cards with
+# the deck size. Keys include a per-user deck version which is bumped
+# whenever one of the user's cards is saved or deleted, so a change never
+# serves an old deck: the new version simply misses and reloads.
+#
+# Only worth enabling with a cache shared by every worker (DECK_CACHE_ENABLED
+# defaults to on when REDIS_URL is set): with per-process caches a change made
+# in one worker would not be seen by the others until DECK_CACHE_TIMEOUT.
+#
+# Versions start from the current time in milliseconds rather than 1, so a
+# version key lost from the cache never hands out a version (or deck ETag)
+# that was already used for different cards.
+
+PAGE_SIZE = 10
+
+# Columns of each card in the deck payload (see deck_payload)
+PAYLOAD_FIELDS = ('id', 'title', 'content', 'image', 'tags')
+
+
+def enabled():
+    return settings.DECK_CACHE_ENABLED
+
+
+def version_key(user_id):
+    return f'deck:{user_id}:version'
+
+
+def deck_keys(user_id, version):
+    """The (card ids, first page) keys for a version of a user's deck."""
+    return f'deck:{user_id}:{version}:ids', f'deck:{user_id}:{version}:page1'
+
+
+def new_version():
+    return time.time_ns() // 1_000_000
+
+
+def deck_version(user_id):
+    """The current deck version of a user, starting a new one if needed."""
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = new_version()
+        if not cache.add(key, version, timeout=None):
+            # Another request started one first
+            version = cache.get(key, version)
+    return version
+
+
+async def adeck_version(user_id):
+    """See deck_version()."""
+    key = version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = new_version()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+    return version
+
+
+def invalidate_deck(user_id):
+    """Move the user to a new deck version, so their cached deck is reloaded."""
+    key = version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No version yet (or evicted): nothing cached can be served anyway
+        cache.add(key, new_version(), timeout=None)
+
+
+def deck_queryset(user_id):
+    return Card.objects.filter(user_id=user_id).order_by('-created_on')
+
+
+def page_queryset(user_id):
+    """The cards of the first My Cards page, with the tags it shows."""
+    return deck_queryset(user_id).prefetch_related('tags')[:PAGE_SIZE]
+
+
+def load_deck(user_id):
+    """Read a user's deck from the database and cache it. Returns (ids, count, first page)."""
+    ids_key, page_key = deck_keys(user_id, deck_version(user_id))
+    ids = list(deck_queryset(user_id).values_list('id', flat=True))
+    first_page = list(page_queryset(user_id))
+    cache.set_many({ids_key: ids, page_key: (len(ids), first_page)}, settings.DECK_CACHE_TIMEOUT)
+    return ids, len(ids), first_page
+
+
+async def adeck_ids(user_id):
+    """The ids of every card in the user's deck, from the cache when possible."""
+    ids_key, _ = deck_keys(user_id, await adeck_version(user_id))
+    ids = await cache.aget(ids_key)
+    if ids is None:
+        ids = [card_id async for card_id in deck_queryset(user_id).values_list('id', flat=True)]
+        await cache.aset(ids_key, ids, settings.DECK_CACHE_TIMEOUT)
+    return ids
+
+
+async def afirst_page(user_id):
+    """(deck size, cards on the first My Cards page), from the cache when possible."""
+    _, page_key = deck_keys(user_id, await adeck_version(user_id))
+    cached = await cache.aget(page_key)
+    if cached is None:
+        cached = (await deck_queryset(user_id).acount(), [card async for card in page_queryset(user_id)])
+        await cache.aset(page_key, cached, settings.DECK_CACHE_TIMEOUT)
+    return cached
+
+
+# Deck payload for spinning in the browser (static/js/spin.js)
+
+
+def image_url(card):
+    """The https URL a card's image is shown from, as in chaos_app/home.html."""
+    image = card.featured_image
+    if not image or 'placeholder' in str(getattr(image, 'public_id', image)):
+        return static('images/default-image.webp')
+    return image.build_url(secure=True)
+
+
+def deck_etag(user_id, version):
+    return f'"deck-{user_id}-{version}"'
+
+
+async def abuild_payload(user_id):
+    """
+    The user's deck as compact JSON: one array per card, with the columns
+    named once in "fields". Decks larger than DECK_PAYLOAD_MAX_CARDS are cut
+    short and marked incomplete, and the browser then spins on the server.
+    """
+    limit = settings.DECK_PAYLOAD_MAX_CARDS
+    cards = [
+        [card.pk, card.title, card.content, image_url(card), [tag.name for tag in card.tags.all()]]
+        async for card in deck_queryset(user_id).only(
+            'id', 'title', 'content', 'featured_image',
+        ).prefetch_related('tags')[:limit + 1]
+    ]
+    return json.dumps(
+        {'fields': PAYLOAD_FIELDS, 'complete': len(cards) <= limit, 'cards': cards[:limit]},
+        separators=(',', ':'),
+    ).encode()
+
+
+async def apayload(user_id, version):
+    """The payload of a deck version, from the cache when possible."""
+    key = f'deck:{user_id}:{version}:json'
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = await abuild_payload(user_id)
+        await cache.aset(key, payload, settings.DECK_CACHE_TIMEOUT)
+    return payload
+
+
+def content_etag(payload):
+    """An ETag derived from the payload itself, for when the deck cache is off."""
+    return f'"deck-{hashlib.sha1(payload).hexdigest()}"'
@@ -1,9 +1,16 @@
 from django import forms
 from .models import Card
+from .tags import MAX_TAGS_PER_CARD, parse_tags
 
 # Form for creating cards
 
 class CardForm(forms.ModelForm):
+    # Saved separately with tags.set_card_tags(), once the card has an id
+    tags = forms.CharField(required=False, widget=forms.TextInput(attrs={
+        'class': 'form-control',
+        'placeholder': 'Tags, separated by commas (e.g. party, work)',
+    }), help_text=f'Up to {MAX_TAGS_PER_CARD} tags, so you can spin just those cards.')
+
     class Meta:
         model = Card
         fields = ['title', 'content', 'featured_image']
@@ -22,3 +29,5 @@ class CardForm(forms.ModelForm):
             'featured_image': forms.ClearableFileInput(attrs={'class': 'form-control-file'}),
         }
 
+    def clean_tags(self):
+        return parse_tags(self.cleaned_data['tags'])
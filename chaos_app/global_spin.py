@@ -0,0 +1,112 @@
+import math
+import random
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Max, Min
+from .models import Card
+
+# Global spin
+#
+# Picks a random card out of every public card (Card.is_public), which may
+# be millions, without counting, sorting or scanning them. Public cards have
+# a partial index on id (card_public_idx), so the lowest and highest public
+# id and the lookup of any id are a few index pages away.
+#
+# A spin draws a batch of random ids between the lowest and highest public
+# id and looks them all up in one query. Ids that fall into gaps (deleted or
+# private cards) simply miss; one of the hits is picked at random, and if
+# the whole batch missed another batch is tried. Every public id is equally
+# likely to be drawn, so the pick is uniform however the ids are spread.
+# The batch is sized from the density of public ids in the range so that
+# it holds about TARGET_HITS of them.
+#
+# The id range and the number of public cards (the planner's estimate on
+# PostgreSQL, read from the partial index, capped to the size of the range
+# and ignored when the range is empty) are cached for
+# GLOBAL_SPIN_STATS_TIMEOUT: cards published since then join the draw once
+# the stats are refreshed. Small pools are counted and offset instead.
+#
+# PostgreSQL's TABLESAMPLE SYSTEM would sample whole table pages: cards
+# sharing a page would come up together, and with few public cards most
+# sampled pages would hold none. Id probes only need the partial index and
+# work unchanged on SQLite.
+
+STATS_KEY = 'global_spin:stats'
+
+# Public cards expected among the ids of a batch (a batch misses
+# completely about e^-3, one time in twenty)
+TARGET_HITS = 3
+# Most ids looked up per batch, and batches per spin
+MAX_BATCH = 500
+MAX_PROBES = 5
+# Pools smaller than this are counted and offset instead of probed
+SMALL_POOL = 1000
+
+
+def public_cards():
+    return Card.objects.filter(is_public=True)
+
+
+def estimated_public_count():
+    """The planner's estimate of the entries in card_public_idx (PostgreSQL only), or None."""
+    connection = connections[Card.objects.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = 'card_public_idx'")
+        row = cursor.fetchone()
+    # reltuples is -1 (0 before PostgreSQL 14) until the table is analysed
+    return row[0] if row and row[0] > 0 else None
+
+
+def load_stats():
+    """Read and cache (lowest public id, highest public id, number of public cards)."""
+    bounds = public_cards().aggregate(low=Min('id'), high=Max('id'))
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        # The estimate may be stale (e.g. a deck was just unpublished): trust the bounds
+        count = 0
+    else:
+        count = estimated_public_count()
+        if count is not None:
+            # No more public cards than ids in the range
+            count = min(count, high - low + 1)
+        if count is None or count < SMALL_POOL:
+            count = public_cards().count()
+    stats = (low, high, count)
+    cache.set(STATS_KEY, stats, settings.GLOBAL_SPIN_STATS_TIMEOUT)
+    return stats
+
+
+def pool_stats():
+    stats = cache.get(STATS_KEY)
+    return stats if stats is not None else load_stats()
+
+
+def batch_size(low, high, count):
+    """Ids to draw per batch for about TARGET_HITS public cards among them."""
+    return max(1, min(MAX_BATCH, math.ceil(TARGET_HITS * (high - low + 1) / count)))
+
+
+def random_public_card():
+    """A random public card, with its owner, or None if no card is public."""
+    low, high, count = pool_stats()
+    if not count or low is None:
+        return None
+    cards = public_cards().select_related('user').order_by()
+
+    if count < SMALL_POOL:
+        index = random.randrange(count)
+        card = cards.order_by('id')[index:index + 1].first()
+        # Cards may have been unpublished since the pool was counted
+        return card or cards.order_by('id').first()
+
+    size = batch_size(low, high, count)
+    for _ in range(MAX_PROBES):
+        hits = list(cards.filter(pk__in={random.randint(low, high) for _ in range(size)}))
+        if hits:
+            return random.choice(hits)
+    # Every batch missed, e.g. many cards were unpublished since the stats
+    # were read: settle for the next public card after a random id
+    return cards.filter(pk__gte=random.randint(low, high)).order_by('id').first() or cards.order_by('id').first()
@@ -0,0 +1,105 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Per-request instrumentation
+#
+# A RequestStats object is bound to the current context for the duration of an
+# instrumented request. The database and template hooks below add to it while
+# it is set and do nothing otherwise, so uninstrumented requests only pay for
+# one ContextVar lookup per query and per template render.
+
+_request_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Query count, SQL time and template render time for one request."""
+
+    __slots__ = ('request', 'started', 'queries', 'sql_time', 'template_time', '_render_depth')
+
+    def __init__(self, request=None):
+        self.request = request
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self._render_depth = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def view_name(self):
+        """The view the request resolved to, once URL resolution has run."""
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else ''
+
+
+def current_stats():
+    """Return the RequestStats of the current request, or None."""
+    return _request_stats.get()
+
+
+@contextmanager
+def collect_request_stats(request=None):
+    """Bind a fresh RequestStats to the current context while the block runs."""
+    stats = RequestStats(request)
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+@contextmanager
+def suspended_stats():
+    """Leave the work done in the block out of the current request's stats."""
+    token = _request_stats.set(None)
+    try:
+        yield
+    finally:
+        _request_stats.reset(token)
+
+
+def query_observer(execute, sql, params, many, context):
+    """
+    Database execute wrapper (installed on every connection) which counts and
+    times queries for the current request.
+    """
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.sql_time += time.perf_counter() - started
+
+
+def install_query_observer(sender, connection, **kwargs):
+    """connection_created receiver adding query_observer to the connection."""
+    if query_observer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_observer)
+
+
+@contextmanager
+def timed_render():
+    """
+    Add the time spent in the block to the current request's template time.
+    Nested renders (e.g. crispy forms rendering inside a page) are only
+    counted once, as part of the outermost render.
+    """
+    stats = _request_stats.get()
+    if stats is None:
+        yield
+        return
+    stats._render_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats._render_depth -= 1
+        if not stats._render_depth:
+            stats.template_time += time.perf_counter() - started
@@ -0,0 +1,50 @@
+import json
+from django.core.management.base import BaseCommand
+from chaos_app.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = 'Print the slow query log, slowest or most recent first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Number of entries to print.')
+        parser.add_argument('--sort', choices=('recent', 'slowest'), default='recent')
+        parser.add_argument('--view', help='Only entries recorded while serving this view.')
+        parser.add_argument('--json', action='store_true', help='Print JSON instead of text.')
+        parser.add_argument('--clear', action='store_true', help='Empty the log after printing it.')
+
+    def handle(self, *args, **options):
+        entries = SlowQuery.objects.order_by('-duration_ms' if options['sort'] == 'slowest' else '-recorded_on')
+        if options['view']:
+            entries = entries.filter(view_name=options['view'])
+        entries = list(entries[:options['limit']])
+
+        if options['json']:
+            self.stdout.write(json.dumps([
+                {
+                    'recorded_on': entry.recorded_on.isoformat(),
+                    'duration_ms': entry.duration_ms,
+                    'view_name': entry.view_name,
+                    'sql': entry.sql,
+                    'params': entry.params,
+                    'plan': entry.plan,
+                    'stack': entry.stack,
+                }
+                for entry in entries
+            ], indent=2))
+        else:
+            for entry in entries:
+                self.stdout.write(self.style.WARNING(
+                    f'{entry.recorded_on:%Y-%m-%d %H:%M:%S} {entry.duration_ms:.1f} ms {entry.view_name or "-"}'
+                ))
+                self.stdout.write(entry.sql)
+                self.stdout.write(f'Params: {entry.params}')
+                if entry.plan:
+                    self.stdout.write('Plan:\n' + entry.plan)
+                if entry.stack:
+                    self.stdout.write('Stack:\n' + entry.stack.rstrip())
+                self.stdout.write('')
+
+        if options['clear']:
+            SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS('Slow query log cleared.'))
@@ -0,0 +1,39 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from chaos_app.write_behind import get_buffer
+
+# Write-behind flush
+#
+# Inserts the records waiting in the write-behind buffers (see
+# chaos_app/write_behind.py). Run it once, from cron, or with --interval as a
+# long-running process on a host that shares the buffer directory.
+
+
+class Command(BaseCommand):
+    help = 'Insert the records held in the write-behind buffers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('buffers', nargs='*', help='Buffers to flush (default: all of WRITE_BEHIND_BUFFERS).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk_create.')
+        parser.add_argument('--interval', type=float, help='Keep running, flushing every this many seconds.')
+
+    def handle(self, *args, **options):
+        names = options['buffers'] or list(settings.WRITE_BEHIND_BUFFERS)
+        unknown = set(names) - set(settings.WRITE_BEHIND_BUFFERS)
+        if unknown:
+            raise CommandError(f"Unknown buffer(s): {', '.join(sorted(unknown))}.")
+        buffers = [get_buffer(name) for name in names]
+        while True:
+            for buffer in buffers:
+                started = time.perf_counter()
+                flushed = buffer.flush(options['batch_size'])
+                if flushed or options['interval'] is None:
+                    self.stdout.write(
+                        f'{buffer.name}: flushed {flushed} records in {time.perf_counter() - started:.2f}s'
+                    )
+            if options['interval'] is None:
+                return
+            connections.close_all()
+            time.sleep(options['interval'])
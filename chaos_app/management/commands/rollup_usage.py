@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections
+from chaos_app.usage_stats import prune_spin_events, roll_up
+
+# Usage rollup
+#
+# Adds the cards created and spins logged since the last run to the daily
+# usage tables read by the stats page (see chaos_app/usage_stats.py), then
+# deletes spin events older than SPIN_EVENT_RETENTION_DAYS. Spin events
+# reach the database when the spin_events buffer is flushed. Run it from
+# cron, or with --interval as a long-running process.
+
+
+class Command(BaseCommand):
+    help = 'Add new cards and spins to the daily usage rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Source rows counted per transaction.')
+        parser.add_argument('--interval', type=float, help='Keep running, rolling up every this many seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            counted = roll_up(options['batch_size'])
+            pruned = prune_spin_events()
+            if any(counted.values()) or options['interval'] is None:
+                summary = ', '.join(f'{name}: {rows} rows' for name, rows in counted.items())
+                self.stdout.write(
+                    f'Rolled up {summary}; pruned {pruned} spin events in {time.perf_counter() - started:.2f}s'
+                )
+            if options['interval'] is None:
+                return
+            connections.close_all()
+            time.sleep(options['interval'])
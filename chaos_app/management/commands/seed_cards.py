@@ -0,0 +1,224 @@
+import csv
+import io
+import multiprocessing
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.base import BaseCommand, CommandError
+
+# Synthetic data generator
+#
+# Creates users and cards at production scale, far faster than going through
+# the ORM one row at a time: cards are written with COPY on PostgreSQL and
+# with batched bulk_create elsewhere, from several processes at once.
+#
+# Every user's deck is generated from its own random stream derived from
+# --seed and the user's position, so the same --seed and --end produce the
+# same data whatever the number of processes.
+
+WORDS = (
+    'chaos', 'dare', 'sing', 'dance', 'shout', 'swap', 'seats', 'spin', 'again',
+    'tell', 'a', 'joke', 'draw', 'card', 'skip', 'turn', 'everyone', 'drinks',
+    'water', 'left', 'right', 'player', 'challenge', 'truth', 'mime', 'animal',
+    'impression', 'whisper', 'rhyme', 'story', 'the', 'next', 'round', 'freeze',
+)
+
+# Relative likelihood of a card being created in each hour of the day (UTC)
+HOUR_WEIGHTS = (
+    2, 1, 1, 1, 1, 1, 2, 3, 4, 5, 5, 6, 7, 6, 6, 6, 7, 8, 10, 12, 13, 12, 8, 4,
+)
+
+# Unusable password shared by every seeded user (they cannot log in)
+SEEDED_PASSWORD = f'{UNUSABLE_PASSWORD_PREFIX}seeded'
+
+
+def deck_sizes(users, mean, skew, seed):
+    """
+    Log-normally distributed deck sizes averaging ``mean`` cards: most users
+    have a small deck and a few have very large ones. Higher ``skew`` means a
+    longer tail.
+    """
+    rng = random.Random(f'{seed}:decks')
+    raw = [rng.lognormvariate(0, skew) for _ in range(users)]
+    scale = mean * users / sum(raw) if users else 0
+    return [max(1, round(value * scale)) for value in raw]
+
+
+def user_rng(seed, index):
+    """The random stream for the ``index``-th seeded user."""
+    return random.Random(f'{seed}:user:{index}')
+
+
+def joined_at(rng, end, days):
+    """A signup time within ``days`` of ``end``, with more recent signups more likely."""
+    return end - timedelta(days=days * rng.random() ** 1.5)
+
+
+def created_times(rng, count, start, end):
+    """
+    ``count`` sorted creation times between ``start`` and ``end``. Decks are
+    mostly built soon after signup, then topped up occasionally, and cards are
+    created more often in the evening.
+    """
+    span = (end - start).total_seconds()
+    times = []
+    for _ in range(count):
+        day = start + timedelta(seconds=span * rng.betavariate(0.6, 2.5))
+        hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+        moment = datetime.combine(day.date(), dt_time(hour), tzinfo=dt_timezone.utc)
+        moment += timedelta(seconds=rng.randrange(3600))
+        times.append(min(max(moment, start), end))
+    return sorted(times)
+
+
+def card_rows(rng, user_id, count, start, end):
+    """Yield (user_id, title, content, featured_image, created_on) tuples."""
+    for created_on in created_times(rng, count, start, end):
+        title = ' '.join(rng.choices(WORDS, k=rng.randint(1, 4))).capitalize()
+        content = ' '.join(rng.choices(WORDS, k=rng.randint(5, 60))).capitalize() + '!'
+        yield user_id, title[:200], content[:500], 'placeholder', created_on
+
+
+@contextmanager
+def explicit_created_on():
+    """Let bulk_create keep the generated created_on instead of using now()."""
+    from chaos_app.models import Card
+
+    field = Card._meta.get_field('created_on')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+# Card fields written by COPY, in card_rows() order. Every other column needs
+# a database default (db_default), as COPY bypasses the model's defaults
+COPY_FIELDS = ('user', 'title', 'content', 'featured_image', 'created_on')
+
+
+def copy_cards(connection, rows):
+    """Stream rows into the card table with PostgreSQL COPY."""
+    from chaos_app.models import Card
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for user_id, title, content, image, created_on in rows:
+        writer.writerow((user_id, title, content, image, created_on.isoformat()))
+    buffer.seek(0)
+    columns = ', '.join(
+        connection.ops.quote_name(Card._meta.get_field(name).column)
+        for name in COPY_FIELDS
+    )
+    table = connection.ops.quote_name(Card._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def insert_cards(rows, batch_size):
+    """Write card rows with COPY on PostgreSQL, bulk_create otherwise."""
+    from django.db import connection, transaction
+    from chaos_app.models import Card
+
+    rows = list(rows)
+    if connection.vendor == 'postgresql':
+        copy_cards(connection, rows)
+        return len(rows)
+    with explicit_created_on(), transaction.atomic():
+        Card.objects.bulk_create(
+            (Card(user_id=user_id, title=title, content=content, featured_image=image, created_on=created_on)
+             for user_id, title, content, image, created_on in rows),
+            batch_size=batch_size,
+        )
+    return len(rows)
+
+
+def seed_chunk(job):
+    """Create the cards of one chunk of users (runs in a worker process)."""
+    users, seed, end, batch_size = job
+    rows = []
+    for index, user_id, date_joined, size in users:
+        rows.extend(card_rows(user_rng(seed, index), user_id, size, date_joined, end))
+    return insert_cards(rows, batch_size)
+
+
+def init_worker():
+    """Set Django up in a fresh worker, without any inherited connections."""
+    import django
+    django.setup()
+    from django.db import connections
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Create synthetic users and cards for benchmarking and capacity testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, required=True, help='Number of users to create.')
+        parser.add_argument('--cards-per-user', type=int, required=True, help='Average deck size.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed and --end reproduce the same data.')
+        parser.add_argument('--skew', type=float, default=1.2, help='Spread (log-normal sigma) of deck sizes; higher is more skewed.')
+        parser.add_argument('--days', type=int, default=365, help='Days of history to spread signups and cards over.')
+        parser.add_argument('--end', type=datetime.fromisoformat, help='Latest created_on (ISO date), defaults to today.')
+        parser.add_argument('--prefix', default='seed-user', help='Username prefix of the seeded users.')
+        parser.add_argument('--processes', type=int, default=min(os.cpu_count() or 1, 8),
+                            help='Worker processes writing cards (always 1 on SQLite).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT with bulk_create.')
+        parser.add_argument('--chunk-users', type=int, default=200, help='Users per unit of work.')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User
+        from django.db import connection, connections
+
+        if options['users'] < 1 or options['cards_per_user'] < 1:
+            raise CommandError('--users and --cards-per-user must be at least 1.')
+        seed = options['seed']
+        end = options['end'] or datetime.combine(datetime.now(dt_timezone.utc).date(), dt_time())
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=dt_timezone.utc)
+        prefix = options['prefix']
+        processes = 1 if connection.vendor == 'sqlite' else max(1, options['processes'])
+        started = time.perf_counter()
+
+        # Users: created up front in one process so their ids are known
+        sizes = deck_sizes(options['users'], options['cards_per_user'], options['skew'], seed)
+        names = [f'{prefix}-{index}' for index in range(options['users'])]
+        if User.objects.filter(username__in=names[:1000]).exists():
+            raise CommandError(f'Users named {prefix}-N already exist; choose another --prefix.')
+        User.objects.bulk_create(
+            (User(username=name, password=SEEDED_PASSWORD,
+                  date_joined=joined_at(user_rng(seed, index), end, options['days']))
+             for index, name in enumerate(names)),
+            batch_size=options['batch_size'],
+        )
+        joined = dict(User.objects.filter(username__startswith=f'{prefix}-').values_list('username', 'id'))
+        dates = dict(User.objects.filter(username__startswith=f'{prefix}-').values_list('id', 'date_joined'))
+        users = [(index, joined[name], dates[joined[name]], sizes[index]) for index, name in enumerate(names)]
+        self.stdout.write(f'Created {len(users)} users, writing {sum(sizes)} cards with {processes} process(es)...')
+
+        chunk = options['chunk_users']
+        jobs = [(users[i:i + chunk], seed, end, options['batch_size']) for i in range(0, len(users), chunk)]
+        written = 0
+        if processes == 1:
+            results = map(seed_chunk, jobs)
+        else:
+            connections.close_all()
+            pool = multiprocessing.get_context().Pool(processes, initializer=init_worker)
+            results = pool.imap_unordered(seed_chunk, jobs)
+        try:
+            for done, count in enumerate(results, start=1):
+                written += count
+                self.stdout.write(f'  {done}/{len(jobs)} chunks, {written} cards')
+        finally:
+            if processes > 1:
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users and {written} cards in {elapsed:.1f}s '
+            f'({written / elapsed:.0f} cards/s).'
+        ))
@@ -0,0 +1,121 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Startup profile
+#
+# Starts fresh Python processes that load the project the way a new worker
+# does (django.setup(), the WSGI application, chaos_app.warmup) and serve one
+# request. One run uses -X importtime to attribute import time to top-level
+# packages; the other runs are timed without it, since import tracing slows
+# the interpreter down.
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+loaded = time.perf_counter()
+if {warm_up}:
+    from chaos_app.warmup import warm_up
+    warm_up()
+warmed = time.perf_counter()
+environ = {{'PATH_INFO': {path!r}, 'HTTP_HOST': {host!r}}}
+setup_testing_defaults(environ)
+statuses = []
+body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({{
+    'status': statuses[0],
+    'setup_ms': (loaded - started) * 1000,
+    'warm_up_ms': (warmed - loaded) * 1000,
+    'first_response_ms': (done - started) * 1000,
+    'modules': len(sys.modules),
+}}))
+'''
+
+
+def parse_importtime(stderr):
+    """Sum -X importtime self times (microseconds) per top-level package."""
+    packages = defaultdict(lambda: [0, 0])
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        self_us, _, name = line.split(':', 1)[1].split('|')
+        package = packages[name.strip().split('.')[0]]
+        package[0] += int(self_us)
+        package[1] += 1
+    return packages
+
+
+class Command(BaseCommand):
+    help = 'Measure cold start: import time per package and time to first response.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Timed cold starts (the median is reported).')
+        parser.add_argument('--top', type=int, default=20, help='Packages listed in the import table.')
+        parser.add_argument('--path', default='/', help='Path of the first request.')
+        parser.add_argument('--no-warm-up', action='store_true', help='Skip chaos_app.warmup before the request.')
+        parser.add_argument('--target-ms', type=float,
+                            help='Fail if the median time to first response exceeds this many milliseconds.')
+        parser.add_argument('--json', action='store_true', help='Print JSON instead of text.')
+
+    def child(self, options, importtime=False):
+        host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host), 'localhost')
+        script = CHILD.format(warm_up=not options['no_warm_up'], path=options['path'], host=host)
+        command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', script]
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'chaos_cards.settings')}
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        process_ms = (time.perf_counter() - started) * 1000
+        if result.returncode:
+            raise CommandError(f'Startup failed:\n{result.stderr[-3000:]}')
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        timings['process_ms'] = process_ms
+        return timings, result.stderr
+
+    def handle(self, *args, **options):
+        _, stderr = self.child(options, importtime=True)
+        packages = parse_importtime(stderr)
+        runs = [self.child(options)[0] for _ in range(options['runs'])]
+
+        summary = {
+            key: round(statistics.median(run[key] for run in runs), 1)
+            for key in ('setup_ms', 'warm_up_ms', 'first_response_ms', 'process_ms')
+        }
+        summary['status'] = runs[-1]['status']
+        summary['modules'] = runs[-1]['modules']
+        imports = [
+            {'package': name, 'import_ms': round(total / 1000, 1), 'modules': count}
+            for name, (total, count) in sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps({'summary': summary, 'imports': imports[:options['top']]}, indent=2))
+        else:
+            total_ms = sum(package['import_ms'] for package in imports)
+            self.stdout.write(f'Import time by package (-X importtime, {total_ms:.0f} ms in total):')
+            for package in imports[:options['top']]:
+                self.stdout.write(f"  {package['package']:<28} {package['import_ms']:>8.1f} ms  {package['modules']:>4} modules")
+            self.stdout.write('')
+            self.stdout.write(f"Cold start, median of {options['runs']} runs ({summary['modules']} modules loaded):")
+            for label, key in (
+                ('django.setup() + WSGI app', 'setup_ms'),
+                ('warm-up', 'warm_up_ms'),
+                (f"first response ({summary['status']})", 'first_response_ms'),
+                ('whole process', 'process_ms'),
+            ):
+                self.stdout.write(f'  {label:<28} {summary[key]:>8.1f} ms')
+
+        target = options['target_ms']
+        if target is not None:
+            if summary['first_response_ms'] > target:
+                raise CommandError(f"Time to first response {summary['first_response_ms']} ms exceeds the {target:.0f} ms target.")
+            self.stdout.write(self.style.SUCCESS(f'Time to first response is within the {target:.0f} ms target.'))
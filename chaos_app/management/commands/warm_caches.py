@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from chaos_app.warmup import warm_caches
+
+# Cache warming
+#
+# Run after a deploy (or from the gunicorn post_worker_init hook with
+# WARM_CACHES_ON_START=true) so the first visitors don't pay for cold caches.
+
+
+class Command(BaseCommand):
+    help = 'Prime the template, page fragment, user and deck caches after a deploy.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Most recently active users to warm.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Users warmed at the same time.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 0 or options['concurrency'] < 1:
+            raise CommandError('--users must be 0 or more and --concurrency at least 1.')
+        timings = warm_caches(
+            users=options['users'], concurrency=options['concurrency'],
+            progress=lambda message: self.stdout.write(f'  {message}'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed caches in {timings['total']:.2f}s "
+            f"(templates {timings['templates']:.2f}s, pages {timings['pages']:.2f}s, users {timings['users']:.2f}s)."
+        ))
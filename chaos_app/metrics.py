@@ -0,0 +1,134 @@
+import fcntl
+import glob
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+from prometheus_client.mmap_dict import MmapedDict
+
+# Application metrics
+#
+# Metrics live in the default prometheus_client registry. When gunicorn runs
+# several workers, gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR before the
+# app is loaded so every process writes its values to memory-mapped files in
+# that directory, and the metrics endpoint adds them all up.
+#
+# Each process writes its own files, so recycled workers (max_requests)
+# would leave a growing pile of them behind. When a worker exits the master
+# folds its counters and histograms into one archive file per type (see
+# archive_dead_process) and deletes its files. A scrape and a fold take a
+# lock on the directory, so no scrape sees the values twice or not at all.
+
+REQUEST_LATENCY = Histogram(
+    'chaos_request_latency_seconds',
+    'Time spent handling a request, by URL name.',
+    ['view'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUEST_QUERIES = Histogram(
+    'chaos_request_db_queries',
+    'Database queries run while handling a request, by URL name.',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+CACHE_LOOKUPS = Counter(
+    'chaos_cache_lookups',
+    'Cache get() calls, by cache and result (hit or miss).',
+    ['cache', 'result'],
+)
+REQUESTS_THROTTLED = Counter(
+    'chaos_requests_throttled',
+    'Requests refused with a 429 by the throttle, by URL name.',
+    ['view'],
+)
+CARDS_CREATED = Counter('chaos_cards_created', 'Cards created.')
+CARDS_DELETED = Counter('chaos_cards_deleted', 'Cards deleted.')
+
+
+def is_multiprocess():
+    """True when values are shared between processes through files."""
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def view_label(request):
+    """The URL name the request resolved to, used to label request metrics."""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+def observe_request(request, duration, queries):
+    """Record the latency and query count of a finished request."""
+    label = view_label(request)
+    REQUEST_LATENCY.labels(label).observe(duration)
+    REQUEST_QUERIES.labels(label).observe(queries)
+
+
+def observe_cache_lookup(cache_name, hit):
+    """Count one cache lookup as a hit or a miss."""
+    CACHE_LOOKUPS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+# Metric types whose values add up across processes. Gauges are not used
+ADDITIVE_TYPES = ('counter', 'histogram', 'summary')
+
+
+@contextmanager
+def directory_lock(path, exclusive):
+    """Lock the multiprocess directory against a concurrent fold (exclusive) or scrape (shared)."""
+    with open(os.path.join(path, 'fold.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def archive_dead_process(pid, path=None):
+    """
+    Fold the counter, histogram and summary files of an exited process into
+    ``<type>_archive.db`` and delete them, so the directory only holds the
+    files of live processes plus one archive per type.
+    """
+    path = path or os.environ['PROMETHEUS_MULTIPROC_DIR']
+    with directory_lock(path, exclusive=True):
+        for typ in ADDITIVE_TYPES:
+            dead = os.path.join(path, f'{typ}_{pid}.db')
+            if not os.path.exists(dead):
+                continue
+            archive = os.path.join(path, f'{typ}_archive.db')
+            # Raw values keyed by (metric, sample, labels): buckets are not
+            # cumulative on disk, so every value simply adds up
+            totals = defaultdict(float)
+            for source in (archive, dead):
+                if os.path.exists(source):
+                    for key, value, _, _ in MmapedDict.read_all_values_from_file(source):
+                        totals[key] += value
+            # Not *.db until complete, so it is never read half written
+            partial = os.path.join(path, f'{typ}_archive.partial')
+            merged = MmapedDict(partial)
+            for key, value in totals.items():
+                merged.write_value(key, value, 0.0)
+            merged.close()
+            os.replace(partial, archive)
+            os.remove(dead)
+
+
+def clear_directory(path, keep_pid=None):
+    """Delete the metric files of a previous run, except those of ``keep_pid``."""
+    for filename in glob.glob(os.path.join(path, '*.db')):
+        if keep_pid is None or not filename.endswith(f'_{keep_pid}.db'):
+            os.remove(filename)
+
+
+def export():
+    """
+    Return (body, content type) in the Prometheus text format. In multiprocess
+    mode the values of every worker (live or exited) are aggregated.
+    """
+    if not is_multiprocess():
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path)
+    with directory_lock(path, exclusive=False):
+        return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,367 @@
+import logging
+import random
+import re
+import time
+import zlib
+from contextlib import nullcontext
+from functools import partial
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+from django.utils.text import compress_string
+from .auth import get_cached_user, aget_cached_user
+from .instrumentation import collect_request_stats, current_stats
+from .metrics import REQUESTS_THROTTLED, observe_request, view_label
+from . import profiler, throttle
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, fall back to gzip only
+    brotli = None
+
+timing_logger = logging.getLogger('chaos_app.timing')
+
+# Middleware
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_cached_user(request)
+    return request._cached_user
+
+
+async def auser(request):
+    # Shares the sync cache attribute so that request.user and
+    # request.auser() always resolve to the same object.
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = await aget_cached_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    Drop-in replacement for Django's AuthenticationMiddleware which resolves
+    request.user through the user cache instead of querying auth_user on
+    every request.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        request.auser = partial(auser, request)
+
+
+# Rate limiting
+
+class ThrottleMiddleware(MiddlewareMixin):
+    """
+    Refuse requests over the THROTTLE_RATES limit of their URL name with a
+    plain 429 (see chaos_app/throttle.py). Runs as the first process_view,
+    so a refused request never reaches CSRF checks, form validation or the
+    database.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.THROTTLE_ENABLED:
+            return None
+        retry_after = throttle.check(request)
+        if retry_after is None:
+            return None
+        REQUESTS_THROTTLED.labels(view_label(request)).inc()
+        response = HttpResponse('Too many requests, please slow down.', status=429, content_type='text/plain')
+        response.headers['Retry-After'] = str(max(1, round(retry_after)))
+        return response
+
+
+# Response compression
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml')
+re_accept_encoding = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q=([0-9.]+))?')
+
+
+def negotiate_encoding(accept_encoding, allow_brotli=True):
+    """
+    Pick the best content coding from an Accept-Encoding header: Brotli when
+    the client accepts it (and it is available), then gzip, else None.
+    """
+    accepted = set()
+    for coding, quality in re_accept_encoding.findall(accept_encoding):
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.lower())
+    if allow_brotli and brotli is not None and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def _stream_compressor(encoding):
+    """Return ``(compress_chunk, finish)`` callables for a streaming encoder."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        # Flush after every chunk so it reaches the client as soon as it is ready
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)  # gzip container
+    return (
+        (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)),
+        compressor.flush,
+    )
+
+
+def compress_stream(chunks, encoding):
+    compress, finish = _stream_compressor(encoding)
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compress, finish = _stream_compressor(encoding)
+    async for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress HTML and JSON responses with Brotli or gzip, whichever the
+    client prefers, once they are larger than COMPRESSION_MIN_SIZE bytes.
+
+    Responses which set the CSRF cookie carry a CSRF token in the body. As a
+    BREACH mitigation they are left uncompressed unless COMPRESS_CSRF_RESPONSES
+    is enabled, in which case they are gzipped with a random-length filename
+    (as Django's GZipMiddleware does) to hide the exact compressed length.
+
+    Streaming responses are compressed chunk by chunk and never buffered.
+    """
+
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 500)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        carries_csrf = settings.CSRF_COOKIE_NAME in response.cookies
+        if carries_csrf and not getattr(settings, 'COMPRESS_CSRF_RESPONSES', False):
+            return response
+
+        encoding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            # Random-length padding only exists for gzip
+            allow_brotli=not carries_csrf,
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding)
+            # The compressed length is unknown until the stream finishes
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=5)
+            else:
+                compressed = compress_string(
+                    response.content,
+                    max_random_bytes=self.max_random_bytes if carries_csrf else None,
+                )
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # A strong ETag no longer matches the encoded bytes, so weaken it
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+# Server-Timing instrumentation
+
+class ServerTimingMiddleware:
+    """
+    Record query count, SQL time, template render time and total view time
+    for a sample of requests (SERVER_TIMING_SAMPLE_RATE, 0.0 - 1.0). Results
+    are sent as a Server-Timing header to staff users (to everyone with
+    DEBUG on) and logged as one structured line on the chaos_app.timing
+    logger (level set by TIMING_LOG_LEVEL).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0.1)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        with collect_request_stats(request) as stats:
+            response = self.get_response(request)
+        self.report(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        with collect_request_stats(request) as stats:
+            response = await self.get_response(request)
+        self.report(request, response, stats)
+        return response
+
+    def show_header(self, request):
+        if settings.DEBUG:
+            return True
+        # Only the user the request already loaded: the header never costs a query
+        user = getattr(request, '_cached_user', None)
+        return user is not None and user.is_staff
+
+    def report(self, request, response, stats):
+        view_ms = stats.elapsed * 1000
+        sql_ms = stats.sql_time * 1000
+        template_ms = stats.template_time * 1000
+        if self.show_header(request):
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={sql_ms:.1f};desc="{stats.queries} queries"',
+                f'tpl;dur={template_ms:.1f};desc="Templates"',
+                f'view;dur={view_ms:.1f};desc="View"',
+            ])
+        match = request.resolver_match
+        timing_logger.info(
+            'request_timing method=%s path=%s view=%s status=%s queries=%d '
+            'sql_ms=%.1f template_ms=%.1f view_ms=%.1f',
+            request.method, request.path, match.view_name if match else '-',
+            response.status_code, stats.queries, sql_ms, template_ms, view_ms,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'queries': stats.queries,
+                'sql_ms': round(sql_ms, 1),
+                'template_ms': round(template_ms, 1),
+                'view_ms': round(view_ms, 1),
+            },
+        )
+
+
+# Prometheus metrics
+
+class MetricsMiddleware:
+    """
+    Record the latency and query count of every request, labelled with the
+    URL name it resolved to. Reuses the stats of ServerTimingMiddleware when
+    that sampled the request, and collects its own otherwise.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = current_stats()
+        with nullcontext(stats) if stats else collect_request_stats(request) as stats:
+            started = time.perf_counter()
+            response = self.get_response(request)
+        observe_request(request, time.perf_counter() - started, stats.queries)
+        return response
+
+    async def __acall__(self, request):
+        stats = current_stats()
+        with nullcontext(stats) if stats else collect_request_stats(request) as stats:
+            started = time.perf_counter()
+            response = await self.get_response(request)
+        observe_request(request, time.perf_counter() - started, stats.queries)
+        return response
+
+
+# On-demand profiling
+
+class ProfilerMiddleware:
+    """
+    Profile requests carrying a signed X-Chaos-Profile header, or a
+    ?_profile= flag from a staff user, and store the result as a
+    RequestProfile (see chaos_app/profiler.py). The id of the stored profile
+    is returned in the X-Chaos-Profile-Id header. Any other request only pays
+    for a header and query string lookup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not profiler.requested(request):
+            return self.get_response(request)
+        options = profiler.profile_options(request, request.user)
+        session = profiler.ProfileSession(memory=bool(options and options.get('memory')))
+        if options is None or not session.start():
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            session.stop()
+        profile = session.save(request, response)
+        response.headers['X-Chaos-Profile-Id'] = str(profile.pk)
+        return response
+
+    async def __acall__(self, request):
+        if not profiler.requested(request):
+            return await self.get_response(request)
+        options = profiler.profile_options(request, await request.auser())
+        # Async views hand database work to worker threads, so sample them all
+        session = profiler.ProfileSession(memory=bool(options and options.get('memory')), all_threads=True)
+        if options is None or not session.start():
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            session.stop()
+        profile = await sync_to_async(session.save)(request, response)
+        response.headers['X-Chaos-Profile-Id'] = str(profile.pk)
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chaos_app', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view_name', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('stats', models.JSONField(default=list)),
+                ('collapsed_stacks', models.TextField(blank=True)),
+                ('memory', models.JSONField(blank=True, default=list)),
+                ('peak_memory_kb', models.PositiveIntegerField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Request profile',
+                'verbose_name_plural': 'Request profiles',
+                'ordering': ['-created_on'],
+            },
+        ),
+    ]
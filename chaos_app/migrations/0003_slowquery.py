@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chaos_app', '0002_requestprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveIntegerField(unique=True)),
+                ('recorded_on', models.DateTimeField()),
+                ('duration_ms', models.FloatField()),
+                ('sql', models.TextField()),
+                ('params', models.TextField(blank=True)),
+                ('many', models.BooleanField(default=False)),
+                ('view_name', models.CharField(blank=True, max_length=200)),
+                ('stack', models.TextField(blank=True)),
+                ('plan', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Slow query',
+                'verbose_name_plural': 'Slow queries',
+                'ordering': ['-recorded_on'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chaos_app', '0003_slowquery'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', '-created_on'], name='card_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['-created_on'], name='card_created_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Trigram indexes for the admin search on Card.title and Card.content.
+# Django runs icontains as UPPER(column::text) LIKE UPPER('%term%') on
+# PostgreSQL, so the indexes are on that expression. They are built
+# CONCURRENTLY so writes to a large table carry on meanwhile, which cannot
+# happen inside a transaction. Other databases have no trigram indexes and
+# keep scanning.
+
+INDEXES = (
+    ('card_title_trgm_idx', 'title'),
+    ('card_content_trgm_idx', 'content'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON chaos_app_card '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('chaos_app', '0004_card_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:45
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chaos_app', '0005_card_trigram_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chaos_app', '0006_card_updated_on'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('card_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CardTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chaos_app.card')),
+                ('tag', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chaos_app.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='cards', through='chaos_app.CardTag', to='chaos_app.tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='tag_user_name_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='cardtag',
+            index=models.Index(fields=['card', 'tag'], name='cardtag_card_tag_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cardtag',
+            constraint=models.UniqueConstraint(fields=('tag', 'card'), name='cardtag_tag_card_uniq'),
+        ),
+    ]
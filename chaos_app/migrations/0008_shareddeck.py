@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:09
+
+import chaos_app.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chaos_app', '0007_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedDeck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(default=chaos_app.models.new_share_slug, max_length=16, unique=True)),
+                ('published', models.BooleanField(default=True)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='shared_deck', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Shared deck',
+                'verbose_name_plural': 'Shared decks',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_public_cards(apps, schema_editor):
+    """Cards of decks shared before this migration are public."""
+    Card = apps.get_model('chaos_app', 'Card')
+    SharedDeck = apps.get_model('chaos_app', 'SharedDeck')
+    Card.objects.filter(
+        user_id__in=SharedDeck.objects.filter(published=True).values('user_id'),
+    ).update(is_public=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chaos_app', '0008_shareddeck'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='is_public',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['id'], name='card_public_idx'),
+        ),
+        migrations.RunPython(mark_public_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chaos_app', '0010_usage_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='card',
+            name='is_public',
+            field=models.BooleanField(db_default=False, default=False, editable=False),
+        ),
+    ]
@@ -1,4 +1,6 @@
+import secrets
 from django.db import models
+from django.db.models.functions import Now
 from django.contrib.auth.models import User
 from cloudinary.models import CloudinaryField
 
@@ -10,11 +12,218 @@ class Card(models.Model):
     content = models.CharField(max_length=500)
     featured_image = CloudinaryField('image', default='placeholder', blank=True)
     created_on = models.DateTimeField(auto_now_add=True)
+    # Rows written outside the ORM (seed_cards COPY) get the database default
+    updated_on = models.DateTimeField(auto_now=True, db_default=Now())
+    tags = models.ManyToManyField('Tag', through='CardTag', related_name='cards', blank=True)
+    # Whether the owner shares their deck (SharedDeck.published), copied here
+    # by signals.py so the global spin needs no join (see global_spin.py).
+    # Rows written outside the ORM (seed_cards COPY) get the database default
+    is_public = models.BooleanField(default=False, db_default=False, editable=False)
 
     class Meta:
         ordering = ['-created_on']
         verbose_name = 'Card'
         verbose_name_plural = 'Cards'
+        indexes = [
+            # A user's deck, newest first (My Cards, spins, the deck cache)
+            models.Index(fields=['user', '-created_on'], name='card_user_created_idx'),
+            # The admin changelist, ordered and filtered by date
+            models.Index(fields=['-created_on'], name='card_created_idx'),
+            # The ids of public cards only, probed by the global spin
+            models.Index(fields=['id'], condition=models.Q(is_public=True), name='card_public_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} by {self.user.username}'
+
+# Models for card tags (see chaos_app/tags.py)
+
+class Tag(models.Model):
+    """A label a user gives some of their cards, e.g. "party" or "work"."""
+    # Covered by the (user, name) unique index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tags', db_index=False)
+    name = models.CharField(max_length=50)
+    # Kept up to date by signals.py. Only used to start a tagged spin from
+    # its smallest tag, so a count that drifts costs speed, never results
+    card_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Tag'
+        verbose_name_plural = 'Tags'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='tag_user_name_uniq'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class CardTag(models.Model):
+    """
+    Links a card to a tag. Indexed both ways round, so a tag's cards (spins)
+    and a card's tags (My Cards, the deck payload) are index-only lookups.
+    """
+    card = models.ForeignKey(Card, on_delete=models.CASCADE, related_name='+', db_index=False)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    class Meta:
+        constraints = [
+            # The cards of a tag in id order: spins count and offset into it
+            models.UniqueConstraint(fields=['tag', 'card'], name='cardtag_tag_card_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['card', 'tag'], name='cardtag_card_tag_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.card_id} tagged {self.tag_id}'
+
+# Model for shared decks (see chaos_app/shared_decks.py)
+
+def new_share_slug():
+    return secrets.token_urlsafe(9)
+
+
+class SharedDeck(models.Model):
+    """
+    A user's deck, published read-only at /decks/<slug>/. The version is
+    bumped whenever the deck changes and is part of the URL of the page
+    itself, so caches never need purging: the page simply moves.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='shared_deck')
+    slug = models.SlugField(max_length=16, unique=True, default=new_share_slug)
+    published = models.BooleanField(default=True)
+    version = models.PositiveIntegerField(default=1)
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Shared deck'
+        verbose_name_plural = 'Shared decks'
+
+    def __str__(self):
+        return f'Deck of {self.user.username} ({self.slug})'
+
+# Model for request profiles (see chaos_app/profiler.py)
+
+class RequestProfile(models.Model):
+    """
+    Stores the profile of a single request: the cProfile table, the sampled
+    stacks in collapsed (flamegraph) format and, optionally, the largest
+    memory allocation sites.
+    """
+    created_on = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    stats = models.JSONField(default=list)
+    collapsed_stacks = models.TextField(blank=True)
+    memory = models.JSONField(default=list, blank=True)
+    peak_memory_kb = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_on']
+        verbose_name = 'Request profile'
+        verbose_name_plural = 'Request profiles'
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} ms)'
+
+# Model for slow queries (see chaos_app/slow_queries.py)
+
+class SlowQuery(models.Model):
+    """
+    Stores one query that ran slower than SLOW_QUERY_THRESHOLD_MS, with its
+    EXPLAIN plan. Rows live in a fixed number of slots (SLOW_QUERY_LOG_SIZE)
+    which are overwritten in turn, so the table works as a ring buffer.
+    """
+    slot = models.PositiveIntegerField(unique=True)
+    recorded_on = models.DateTimeField()
+    duration_ms = models.FloatField()
+    sql = models.TextField()
+    params = models.TextField(blank=True)
+    many = models.BooleanField(default=False)
+    view_name = models.CharField(max_length=200, blank=True)
+    stack = models.TextField(blank=True)
+    plan = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-recorded_on']
+        verbose_name = 'Slow query'
+        verbose_name_plural = 'Slow queries'
+
+    def __str__(self):
+        return f'{self.duration_ms:.0f} ms: {self.sql[:80]}'
+
+# Models for usage statistics (see chaos_app/usage_stats.py)
+
+class SpinEvent(models.Model):
+    """
+    Logs one spin of a user's own deck. Written behind (see
+    chaos_app/write_behind.py) and only read by the rollup, so the user and
+    card are plain ids: a card deleted before the flush must not fail it.
+    """
+    # Makes inserts idempotent when a flush is repeated
+    event_id = models.UUIDField(unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    card = models.ForeignKey(Card, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    spun_at = models.DateTimeField()
+    # When the flush inserted the row; the rollup waits for rows to settle
+    recorded_on = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Card {self.card_id} spun by user {self.user_id} at {self.spun_at}'
+
+
+class DailyUsage(models.Model):
+    """Cards created and spins by one user on one day."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, related_name='+')
+    day = models.DateField()
+    cards_created = models.PositiveIntegerField(default=0)
+    spins = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # A user's days in order: the stats page reads a range of them
+            models.UniqueConstraint(fields=['user', 'day'], name='dailyusage_user_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f'User {self.user_id} on {self.day}'
+
+
+class DailyCardSpins(models.Model):
+    """
+    How often one card came up in its owner's spins on one day. Rows of a
+    deleted card are left behind rather than deleted with it (the stats page
+    joins them away), so deleting a card costs no extra query.
+    """
+    card = models.ForeignKey(Card, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, related_name='+')
+    day = models.DateField()
+    spins = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['card', 'day'], name='dailycardspins_card_day_uniq'),
+        ]
+        indexes = [
+            # A user's most spun cards over the last days (the stats page)
+            models.Index(fields=['user', 'day'], name='dailycardspins_user_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'Card {self.card_id} on {self.day}'
+
+
+class RollupWatermark(models.Model):
+    """The highest source row id a rollup has counted."""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} up to {self.last_id}'
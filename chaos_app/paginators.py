@@ -0,0 +1,47 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+# Paginators for admin changelists over large tables
+
+# Below this many (estimated) rows an exact COUNT(*) is cheap enough
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimated_count(queryset):
+    """
+    The planner's row estimate for an unfiltered PostgreSQL queryset, read
+    from pg_class.reltuples (kept current by ANALYZE and autovacuum). None
+    when the queryset is filtered, another database is in use or the table
+    has never been analysed.
+    """
+    if not isinstance(queryset, QuerySet) or queryset.query.where or queryset.query.distinct:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 (0 before PostgreSQL 14) until the table is analysed
+    return row[0] if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts an unfiltered changelist from the planner statistics instead of a
+    COUNT(*) over the whole table. Filtered lists, small tables and other
+    databases are counted exactly, so page numbers stay correct where they
+    are cheap to get right.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
@@ -0,0 +1,191 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core import signing
+
+# On-demand request profiling
+#
+# A request is profiled when it carries a valid signed X-Chaos-Profile header
+# (see make_token) or when a staff user adds ?_profile=1 (or ?_profile=memory)
+# to the URL. Each profiled request runs under cProfile, a stack sampler for
+# flamegraphs and, optionally, tracemalloc. Other requests are not affected.
+
+TOKEN_SALT = 'chaos_app.profiler'
+HEADER = 'X-Chaos-Profile'
+QUERY_FLAG = '_profile'
+
+# One profiled request at a time per process: cProfile and tracemalloc are
+# process (or thread) wide and cannot be nested
+_active = threading.Lock()
+
+# Functions kept in the stored cProfile table, by cumulative time
+MAX_STATS_ROWS = 300
+# Allocation sites kept from tracemalloc
+MAX_MEMORY_ROWS = 50
+
+
+def make_token(memory=False):
+    """A signed header value that turns on profiling for a request."""
+    return signing.dumps({'memory': memory}, salt=TOKEN_SALT)
+
+
+def read_token(token):
+    """Return the token's options, or None if it is invalid or has expired."""
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+def requested(request):
+    """
+    Cheap check run for every request: is there a profiling header or query
+    flag at all? Whether it is allowed is decided by profile_options().
+    """
+    return HEADER in request.headers or f'{QUERY_FLAG}=' in request.META.get('QUERY_STRING', '')
+
+
+def profile_options(request, user):
+    """The profiling options for a request, or None if it may not be profiled."""
+    token = request.headers.get(HEADER)
+    if token:
+        return read_token(token)
+    flag = request.GET.get(QUERY_FLAG)
+    if flag and user.is_staff:
+        return {'memory': flag == 'memory'}
+    return None
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """
+    Background thread recording the stack of the profiled threads every
+    ``interval`` seconds, counted per unique stack. ``threads`` is a set of
+    thread ids, or None for every thread except the sampler itself.
+    """
+
+    def __init__(self, threads=None, interval=None):
+        self.threads = threads
+        self.interval = interval or settings.PROFILER_SAMPLE_INTERVAL
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='chaos-profiler-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.threads is not None and thread_id not in self.threads):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """The samples in the collapsed-stack format read by flamegraph tools."""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """
+    Profile the code run between start() and stop(). cProfile (and tracemalloc)
+    only see the thread that called start(); the sampler follows the same
+    thread, or every thread with ``all_threads``, which is how work that async
+    views hand to worker threads (e.g. database queries) is captured.
+    """
+
+    def __init__(self, memory=False, all_threads=False):
+        # Imported here so that workers only load the profilers when needed
+        import cProfile
+
+        self.memory = memory
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(None if all_threads else {threading.get_ident()})
+        self.snapshot = None
+        self.peak_memory = None
+        self.duration = None
+
+    def start(self):
+        """Start profiling; False if another request is already being profiled."""
+        import tracemalloc
+
+        if not _active.acquire(blocking=False):
+            return False
+        if self.memory:
+            tracemalloc.start()
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profiler.enable()
+        return True
+
+    def stop(self):
+        import tracemalloc
+
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        self.sampler.stop()
+        if self.memory:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        _active.release()
+
+    def stats_rows(self):
+        """cProfile results as a list of dicts, slowest cumulative time first."""
+        import pstats
+
+        rows = []
+        for (filename, line, name), (primitive, calls, tottime, cumtime, _) in pstats.Stats(self.profiler).stats.items():
+            rows.append({
+                'function': f'{name} ({os.path.basename(filename)}:{line})' if line else name,
+                'calls': calls,
+                'primitive_calls': primitive,
+                'tottime': round(tottime * 1000, 3),
+                'cumtime': round(cumtime * 1000, 3),
+            })
+        rows.sort(key=lambda row: row['cumtime'], reverse=True)
+        return rows[:MAX_STATS_ROWS]
+
+    def memory_rows(self):
+        """Largest allocation sites still alive at the end of the request."""
+        if self.snapshot is None:
+            return []
+        return [
+            {'location': str(stat.traceback), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+            for stat in self.snapshot.statistics('lineno')[:MAX_MEMORY_ROWS]
+        ]
+
+    def save(self, request, response):
+        """Store the results as a RequestProfile and return it."""
+        from .models import RequestProfile
+
+        user = getattr(request, 'user', None)
+        match = request.resolver_match
+        return RequestProfile.objects.create(
+            user=user if user is not None and user.is_authenticated else None,
+            method=request.method,
+            path=request.get_full_path()[:500],
+            view_name=match.view_name if match else '',
+            status_code=response.status_code,
+            duration_ms=round(self.duration * 1000, 3),
+            stats=self.stats_rows(),
+            collapsed_stacks=self.sampler.collapsed(),
+            memory=self.memory_rows(),
+            peak_memory_kb=round(self.peak_memory / 1024) if self.peak_memory is not None else None,
+        )
@@ -0,0 +1,75 @@
+import re
+from collections import Counter
+from contextlib import ContextDecorator
+import sqlparse
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+# Query budgets
+#
+# Used by the test suite to fail when a block of code (usually one request)
+# runs more queries than it is allowed to, e.g. because a template or
+# __str__ started following a foreign key per row (an N+1 query).
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a query_budget block runs more queries than allowed."""
+
+
+def normalise_sql(sql):
+    """Replace literal values so repeats of the same statement compare equal."""
+    return _LITERALS.sub('?', sql)
+
+
+class query_budget(ContextDecorator):
+    """
+    Context manager (or decorator) asserting that at most ``max_queries`` are
+    run on the ``using`` connection inside the block.
+
+        with query_budget(3, label='My Cards, 10 cards'):
+            client.get(reverse('user_cards'))
+
+    On failure the message lists every query, pretty-printed, with statements
+    that were repeated (the usual sign of an N+1) summarised first.
+    """
+
+    def __init__(self, max_queries, label='', using=DEFAULT_DB_ALIAS):
+        self.max_queries = max_queries
+        self.label = label
+        self.using = using
+
+    def __enter__(self):
+        self.capture = CaptureQueriesContext(connections[self.using])
+        self.capture.__enter__()
+        return self.capture
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.capture.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and len(self.capture) > self.max_queries:
+            raise QueryBudgetExceeded(self.report())
+        return False
+
+    def report(self):
+        """A readable description of the queries that broke the budget."""
+        queries = [query['sql'] for query in self.capture.captured_queries]
+        prefix = f'{self.label}: ' if self.label else ''
+        lines = [f'{prefix}{len(queries)} queries executed, budget is {self.max_queries}']
+
+        repeated = [
+            (count, sql) for sql, count in Counter(map(normalise_sql, queries)).most_common()
+            if count > 1
+        ]
+        if repeated:
+            lines.append('')
+            lines.append('Repeated statements:')
+            for count, sql in repeated:
+                lines.append(f'  {count}x {sql}')
+
+        lines.append('')
+        lines.append('Queries:')
+        for number, sql in enumerate(queries, start=1):
+            formatted = sqlparse.format(sql, reindent=True, keyword_case='upper')
+            lines.append(f'{number}. ' + formatted.replace('\n', '\n   '))
+        return '\n'.join(lines)
@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.urls import reverse
+from .deck_cache import deck_queryset, image_url
+from .models import SharedDeck
+
+# Shared decks
+#
+# A published deck has two public URLs:
+#
+#   /decks/<slug>/            a pointer which redirects to the current version
+#   /decks/<slug>/v<version>/ the page itself
+#
+# The pointer may only be cached for SHARED_DECK_POINTER_MAX_AGE seconds. A
+# versioned page never changes, so browsers, CDNs and this app keep it for
+# SHARED_DECK_MAX_AGE. Every change to the deck bumps the version (see
+# signals.py), which gives the page a new URL. Nothing has to be purged:
+# the pointer moves to the new page once it expires. Responses also carry a
+# surrogate key, for CDNs that can purge by key.
+#
+# Both views render without the request, so they never read the session,
+# the user or the CSRF cookie. Their responses are the same for everyone and
+# safe to share. Once warm they are served from the cache without a query.
+#
+# Unpublishing clears this app's cache (when it is shared by the workers),
+# but copies of a page already held by a CDN or a browser stay readable at
+# that page's URL until SHARED_DECK_MAX_AGE runs out.
+
+
+def pointer_key(slug):
+    return f'shared:{slug}:version'
+
+
+def page_key(slug, version):
+    return f'shared:{slug}:v{version}'
+
+
+def surrogate_key(slug):
+    return f'shared-deck-{slug}'
+
+
+def page_url(slug, version):
+    return reverse('shared_deck_version', args=[slug, version])
+
+
+def current_version(slug):
+    """The published version of a deck, or 0 if it is not shared."""
+    version = cache.get(pointer_key(slug))
+    if version is None:
+        version = SharedDeck.objects.filter(slug=slug, published=True).values_list('version', flat=True).first() or 0
+        cache.set(pointer_key(slug), version, settings.SHARED_DECK_POINTER_MAX_AGE)
+    return version
+
+
+def render_page(shared_deck):
+    """The HTML of a shared deck at its current version."""
+    cards = deck_queryset(shared_deck.user_id).only(
+        'id', 'title', 'content', 'featured_image',
+    )[:settings.SHARED_DECK_MAX_CARDS]
+    # Rendered without a request: no context processors, no session
+    return render_to_string('chaos_app/shared_deck.html', {
+        'owner': shared_deck.user.username,
+        'cards': [
+            {'id': card.pk, 'title': card.title, 'content': card.content, 'image': image_url(card)}
+            for card in cards
+        ],
+        'public_page': True,
+    }).encode()
+
+
+def page(slug, version):
+    """
+    ``(html, current version)`` of a shared deck: the html of ``version``
+    if that is current and published, else None. Read from the cache when
+    possible.
+    """
+    # A cached page is only served while the pointer says it is current, so
+    # an unpublished or outdated page stops being served within
+    # SHARED_DECK_POINTER_MAX_AGE (at once on this worker, see forget())
+    current = current_version(slug)
+    if version < current:
+        return None, current
+    if version == current:
+        html = cache.get(page_key(slug, version))
+        if html is not None:
+            return html, version
+    # Not cached, or newer than the cached pointer: ask the database
+    shared_deck = SharedDeck.objects.select_related('user').filter(slug=slug, published=True).first()
+    if shared_deck is None:
+        return None, 0
+    if shared_deck.version != version:
+        return None, shared_deck.version
+    html = render_page(shared_deck)
+    cache.set(page_key(slug, version), html, settings.SHARED_DECK_MAX_AGE)
+    cache.set(pointer_key(slug), version, settings.SHARED_DECK_POINTER_MAX_AGE)
+    return html, version
+
+
+def bump_version(user_id):
+    """Give the user's published deck (if any) a new version, and so a new page URL."""
+    SharedDeck.objects.filter(user_id=user_id, published=True).update(version=F('version') + 1)
+
+
+def forget(shared_deck):
+    """
+    Drop a deck's pointer and current page from the cache. Call it before
+    changing the version, e.g. when unpublishing, so the page dropped is the
+    one that was being served.
+    """
+    cache.delete_many([pointer_key(shared_deck.slug), page_key(shared_deck.slug, shared_deck.version)])
+
+
+def set_public_cache(response, slug, max_age, s_maxage):
+    """Let browsers keep the response for ``max_age`` seconds and shared caches for ``s_maxage``."""
+    response.headers['Cache-Control'] = f'public, max-age={max_age}, s-maxage={s_maxage}'
+    response.headers['Surrogate-Key'] = surrogate_key(slug)
+    return response
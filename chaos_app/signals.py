@@ -0,0 +1,134 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from .auth import invalidate_cached_user
+from .deck_cache import invalidate_deck
+from .instrumentation import install_query_observer
+from .metrics import CARDS_CREATED, CARDS_DELETED
+from .models import Card, CardTag, SharedDeck, Tag
+from .shared_decks import bump_version
+from .slow_queries import install_slow_query_recorder
+
+# Signal handlers
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_on_change(sender, instance, **kwargs):
+    """Drop the cached user whenever the user row changes or is deleted."""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_user_on_logout(sender, request, user, **kwargs):
+    """Drop the cached user on logout."""
+    if user is not None:
+        invalidate_cached_user(user.pk)
+
+
+@receiver(post_save, sender=Card)
+def count_created_card(sender, instance, created, **kwargs):
+    """Count new cards in the chaos_cards_created metric."""
+    if created:
+        CARDS_CREATED.inc()
+
+
+@receiver(post_delete, sender=Card)
+def count_deleted_card(sender, instance, **kwargs):
+    """Count deleted cards in the chaos_cards_deleted metric."""
+    CARDS_DELETED.inc()
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def invalidate_deck_on_change(sender, instance, **kwargs):
+    """
+    Move the owner to a new cached deck once the change is committed, so no
+    request can cache the deck as it was before the change.
+    """
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_deck(user_id))
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def bump_shared_deck_on_change(sender, instance, **kwargs):
+    """Move the owner's published deck to a new version and page URL."""
+    # Cards are public exactly while their deck is published (and republishing
+    # bumps the version anyway), so most card writes need no deck write
+    if instance.is_public:
+        bump_version(instance.user_id)
+
+
+@receiver(pre_save, sender=Card)
+def publish_new_card(sender, instance, raw=False, **kwargs):
+    """A card added to a shared deck is public straight away."""
+    if instance._state.adding and not raw:
+        instance.is_public = SharedDeck.objects.filter(user_id=instance.user_id, published=True).exists()
+
+
+@receiver(post_save, sender=SharedDeck)
+@receiver(post_delete, sender=SharedDeck)
+def publish_shared_cards(sender, instance, **kwargs):
+    """Copy the published flag of a deck to its cards, for the global spin."""
+    public = instance.published and kwargs.get('signal') is post_save
+    Card.objects.filter(user_id=instance.user_id).exclude(is_public=public).update(is_public=public)
+
+
+@receiver(m2m_changed, sender=Card.tags.through)
+def invalidate_deck_on_tagging(sender, instance, action, **kwargs):
+    """
+    Tags are part of the cached deck (first page, payload, tagged spins), so
+    tagging or untagging cards also moves the owner to a new deck.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # The card or the tag, depending on the side changed: same owner
+        user_id = instance.user_id
+        transaction.on_commit(lambda: invalidate_deck(user_id))
+
+
+@receiver(m2m_changed, sender=Card.tags.through)
+def count_tagged_cards(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Tag.card_count in step as cards are tagged and untagged."""
+    if action in ('post_add', 'post_remove') and pk_set:
+        change = len(pk_set) if action == 'post_add' else -len(pk_set)
+        if reverse:
+            # tag.cards.add(...): pk_set holds cards
+            adjust_card_count(Tag.objects.filter(pk=instance.pk), change)
+        else:
+            adjust_card_count(Tag.objects.filter(pk__in=pk_set), change // len(pk_set))
+    elif action == 'pre_clear':
+        if reverse:
+            Tag.objects.filter(pk=instance.pk).update(card_count=0)
+        else:
+            untag_card(Card, instance)
+
+
+@receiver(pre_delete, sender=Card)
+def untag_card(sender, instance, **kwargs):
+    """A deleted card no longer counts towards its tags."""
+    adjust_card_count(Tag.objects.filter(pk__in=CardTag.objects.filter(card=instance).values('tag_id')), -1)
+
+
+def adjust_card_count(tags, change):
+    # Never below zero, even if the count has drifted
+    tags.update(card_count=Greatest(F('card_count') + change, 0))
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_deck_on_tag_delete(sender, instance, **kwargs):
+    """Deleting a tag untags its cards: move the owner to a new deck."""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_deck(user_id))
+
+
+# Count and time the queries of instrumented requests on every connection
+connection_created.connect(install_query_observer)
+
+# Record slow queries, with their EXPLAIN plan, on every connection
+connection_created.connect(install_slow_query_recorder)
@@ -0,0 +1,136 @@
+import hashlib
+import time
+import traceback
+from contextvars import ContextVar
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from .instrumentation import current_stats, suspended_stats
+
+# Slow query recorder
+#
+# An execute wrapper installed on every connection times each query. Queries
+# slower than SLOW_QUERY_THRESHOLD_MS are stored as SlowQuery rows together
+# with their parameters, the view and project stack that ran them and an
+# EXPLAIN plan. Rows are written to SLOW_QUERY_LOG_SIZE fixed slots taken in
+# turn from a cache counter, so the log never grows beyond that size.
+#
+# Recording costs a write and an EXPLAIN inside the request that ran the
+# slow query. A statement (its SQL, whatever the parameters) is recorded at
+# most once per SLOW_QUERY_RECORD_INTERVAL, so a slow database does not get
+# an extra write and EXPLAIN from every request that hits it.
+#
+# The recorder's own cache and database work is left out of the request's
+# stats, and it wraps the query observer, so the query counts and times of
+# Server-Timing and the metrics only cover the request's own queries.
+
+SLOT_COUNTER_KEY = 'slow-queries:next-slot'
+
+# Statements an EXPLAIN can be run for without executing them
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+# Set while a slow query is being recorded, so the recorder's own queries
+# (EXPLAIN, saving the row) are not timed and recorded in turn
+_recording = ContextVar('recording_slow_query', default=False)
+
+PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+
+
+def threshold():
+    """Threshold in seconds, or None when the recorder is turned off."""
+    threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+    return threshold_ms / 1000 if threshold_ms is not None else None
+
+
+def project_stack():
+    """The calling stack, limited to the project's own code."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(PROJECT_DIR) and 'site-packages' not in frame.filename
+    ]
+    return ''.join(traceback.format_list(frames[-15:]))
+
+
+def fingerprint(sql):
+    """Cache key standing for a statement, whatever its parameters."""
+    return 'slow-queries:seen:' + hashlib.blake2b(sql.encode(), digest_size=16).hexdigest()
+
+
+def due(sql):
+    """True if ``sql`` was not recorded within the last SLOW_QUERY_RECORD_INTERVAL seconds."""
+    interval = settings.SLOW_QUERY_RECORD_INTERVAL
+    # add() only succeeds for the first caller in each interval
+    return not interval or cache.add(fingerprint(sql), 1, timeout=interval)
+
+
+def next_slot():
+    """The ring buffer slot to write next."""
+    cache.add(SLOT_COUNTER_KEY, -1, timeout=None)
+    try:
+        index = cache.incr(SLOT_COUNTER_KEY)
+    except ValueError:  # Evicted between add() and incr()
+        cache.set(SLOT_COUNTER_KEY, 0, timeout=None)
+        index = 0
+    return index % settings.SLOW_QUERY_LOG_SIZE
+
+
+def explain(connection, sql, params, many):
+    """Return the query plan for ``sql``, or '' when it cannot be explained."""
+    if many or not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return ''
+    try:
+        # A savepoint keeps a failing EXPLAIN from breaking the caller's transaction
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+
+
+def record(connection, sql, params, many, duration):
+    """Store one slow query in the ring buffer, unless that statement was recorded recently."""
+    from .models import SlowQuery
+
+    stats = current_stats()
+    token = _recording.set(True)
+    try:
+        with suspended_stats():
+            if not due(sql):
+                return
+            SlowQuery.objects.using(connection.alias).update_or_create(slot=next_slot(), defaults={
+                'recorded_on': timezone.now(),
+                'duration_ms': round(duration * 1000, 3),
+                'sql': sql,
+                'params': repr(params)[:2000],
+                'many': many,
+                'view_name': stats.view_name if stats else '',
+                'stack': project_stack(),
+                'plan': explain(connection, sql, params, many),
+            })
+    except DatabaseError:
+        # Never let the recorder fail the request that ran the query
+        pass
+    finally:
+        _recording.reset(token)
+
+
+def slow_query_recorder(execute, sql, params, many, context):
+    """Database execute wrapper recording queries slower than the threshold."""
+    limit = threshold()
+    if limit is None or _recording.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration >= limit:
+        record(context['connection'], sql, params, many, duration)
+    return result
+
+
+def install_slow_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver adding slow_query_recorder to the connection."""
+    if slow_query_recorder not in connection.execute_wrappers:
+        # Outermost: recording happens outside the query observer's timing
+        connection.execute_wrappers.insert(0, slow_query_recorder)
@@ -0,0 +1,138 @@
+import hashlib
+import random
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef, Subquery
+from . import deck_cache
+from .models import Card, CardTag, Tag
+
+# Card tags
+#
+# A tag-filtered spin picks from the cards carrying every chosen tag without
+# reading the rest of the deck. The matching card ids come straight from the
+# (tag, card) unique index of CardTag: the entries of the smallest tag are
+# read in card id order, and every further tag costs one index probe per
+# candidate. A spin by one tag counts its entries and reads the card at a
+# random offset of the same index range; a spin by several reads out the
+# matching ids once and picks one. Either way its cost follows the size of
+# the smallest chosen tag, not the size of the deck or of the table.
+#
+# With the deck cache, the matching ids are cached per deck version, so a
+# spin reads a single row. Tag changes bump the version (see signals.py).
+
+# Most tags a card may have, and most tags a spin may combine
+MAX_TAGS_PER_CARD = 10
+MAX_SPIN_TAGS = 5
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+def normalise(name):
+    """Tags are compared lower case, with runs of whitespace collapsed."""
+    return ' '.join(name.split()).lower()
+
+
+def parse_tags(value):
+    """
+    Split a comma separated list into distinct normalised tag names. Raises
+    ValidationError for an overlong tag or too many tags.
+    """
+    names = []
+    for name in value.split(','):
+        name = normalise(name)
+        if name and name not in names:
+            names.append(name)
+    if any(len(name) > TAG_MAX_LENGTH for name in names):
+        raise ValidationError(f'Tags can be at most {TAG_MAX_LENGTH} characters long.')
+    if len(names) > MAX_TAGS_PER_CARD:
+        raise ValidationError(f'A card can have at most {MAX_TAGS_PER_CARD} tags.')
+    return names
+
+
+def spin_tags(values):
+    """The tags a spin asked for (?tag=...): distinct, normalised, at most MAX_SPIN_TAGS."""
+    names = []
+    for value in values:
+        name = normalise(value)
+        if name and len(name) <= TAG_MAX_LENGTH and name not in names:
+            names.append(name)
+    return names[:MAX_SPIN_TAGS]
+
+
+def set_card_tags(card, names):
+    """Give the card exactly the tags ``names``, creating any its owner does not have yet."""
+    if not names:
+        card.tags.clear()
+        return
+    Tag.objects.bulk_create([Tag(user_id=card.user_id, name=name) for name in names], ignore_conflicts=True)
+    card.tags.set(Tag.objects.filter(user_id=card.user_id, name__in=names))
+
+
+def tagged_card_ids(tag_ids):
+    """
+    The ids of the cards carrying every tag of ``tag_ids``, in id order. The
+    entries of the first tag are walked and the others are probed, so the
+    smallest tag should come first.
+    """
+    first, *others = tag_ids
+    matches = CardTag.objects.filter(tag_id=first)
+    for tag_id in others:
+        # One (tag, card) index probe per candidate, rather than a list of
+        # every card of the other tag
+        matches = matches.filter(Exists(CardTag.objects.filter(card_id=OuterRef('card_id'), tag_id=tag_id)))
+    return matches.order_by('card_id').values_list('card_id', flat=True)
+
+
+async def atagged_card_ids(user_id, names):
+    """
+    tagged_card_ids() for the user's tags called ``names``, smallest first,
+    or None if the user has no tag of one of the names.
+    """
+    tag_ids = [
+        tag_id async for tag_id in Tag.objects.filter(
+            user_id=user_id, name__in=names,
+        ).order_by('card_count').values_list('id', flat=True)
+    ]
+    if len(tag_ids) < len(names):
+        return None
+    return tagged_card_ids(tag_ids)
+
+
+def tagged_ids_key(user_id, version, names):
+    digest = hashlib.sha1('\n'.join(sorted(names)).encode()).hexdigest()[:16]
+    return f'deck:{user_id}:{version}:tags:{digest}'
+
+
+async def arandom_tagged_card(user_id, names):
+    """A random card of the user tagged with every one of ``names``, or None."""
+    user_cards = Card.objects.filter(user_id=user_id)
+    if deck_cache.enabled():
+        key = tagged_ids_key(user_id, await deck_cache.adeck_version(user_id), names)
+        card_ids = await cache.aget(key)
+        if card_ids is None:
+            matches = await atagged_card_ids(user_id, names)
+            card_ids = [] if matches is None else [card_id async for card_id in matches]
+            await cache.aset(key, card_ids, settings.DECK_CACHE_TIMEOUT)
+        if not card_ids:
+            return None
+        card = await user_cards.filter(pk=random.choice(card_ids)).afirst()
+        if card is not None:
+            return card
+        # Deleted since the ids were cached: fall back to the database
+
+    matches = await atagged_card_ids(user_id, names)
+    if matches is None:
+        return None
+    if len(names) == 1:
+        # Counting and offsetting walk the tag's index without reading it out
+        count = await matches.acount()
+        if not count:
+            return None
+        index = random.randrange(count)
+        return await user_cards.filter(pk=Subquery(matches[index:index + 1])).afirst()
+    # An intersection probes every card of the smallest tag: do that once and
+    # read out only the (fewer) matches
+    card_ids = [card_id async for card_id in matches]
+    if not card_ids:
+        return None
+    return await user_cards.filter(pk=random.choice(card_ids)).afirst()
@@ -0,0 +1,29 @@
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from .instrumentation import timed_render
+
+# Template backend
+
+
+class TimedTemplate(Template):
+    """Django template whose render time is added to the request stats."""
+
+    def render(self, context=None, request=None):
+        with timed_render():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The standard Django template backend, returning templates that report
+    their render time to chaos_app.instrumentation.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
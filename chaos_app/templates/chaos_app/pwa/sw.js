@@ -0,0 +1,139 @@
+/**
+ * Chaos Cards service worker (served at the site root by service_worker_view).
+ *
+ * - Hashed static files, Bootstrap and card images: cache first, since their
+ *   URLs change whenever their content does.
+ * - The deck payload: stale-while-revalidate, so spins work offline and the
+ *   newest deck is fetched in the background.
+ * - The home and My Cards pages: network first, falling back to the last
+ *   copy when offline.
+ * Cached decks and pages are deleted on logout.
+**/
+const VERSION = '{{ version }}';
+const STATIC_CACHE = `chaos-static-${VERSION}`;
+const IMAGE_CACHE = 'chaos-images';
+const DECK_CACHE = 'chaos-deck';
+const PAGE_CACHE = 'chaos-pages';
+const PRECACHE = {{ precache|safe }};
+const STATIC_URL = '{{ static_url }}';
+const DECK_URL = '{% url "deck_json" %}';
+const LOGOUT_URL = '{% url "account_logout" %}';
+const OFFLINE_PAGES = ['{% url "home" %}', '{% url "user_cards" %}'];
+const IMAGE_HOSTS = ['res.cloudinary.com'];
+const MAX_IMAGES = {{ max_images }};
+// ManifestStaticFilesStorage names, e.g. style.0123456789ab.css
+const HASHED_NAME = /\.[0-9a-f]{12}\.[a-z0-9]+$/;
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(STATIC_CACHE)
+            .then((cache) => cache.addAll(PRECACHE))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    // Drop the static files of earlier deploys
+    event.waitUntil(
+        caches.keys()
+            .then((names) => Promise.all(names
+                .filter((name) => name.startsWith('chaos-static-') && name !== STATIC_CACHE)
+                .map((name) => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+/**
+ * Only keep complete, same-user responses: no errors, redirects or partial content.
+**/
+function cacheable(response) {
+    return response && (response.ok || response.type === 'opaque') && !response.redirected && response.status !== 206;
+}
+
+async function trimCache(cacheName, maxEntries) {
+    const cache = await caches.open(cacheName);
+    const keys = await cache.keys();
+    // Keys come back in insertion order, so the oldest go first
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - maxEntries)).map((key) => cache.delete(key)));
+}
+
+async function cacheFirst(request, cacheName, maxEntries) {
+    const cached = await caches.match(request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (cacheable(response)) {
+        const cache = await caches.open(cacheName);
+        await cache.put(request, response.clone());
+        if (maxEntries) {
+            trimCache(cacheName, maxEntries);
+        }
+    }
+    return response;
+}
+
+async function networkFirst(request, cacheName) {
+    try {
+        const response = await fetch(request);
+        if (cacheable(response)) {
+            const cache = await caches.open(cacheName);
+            await cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await caches.match(request, {cacheName});
+        if (cached) {
+            return cached;
+        }
+        throw error;
+    }
+}
+
+async function staleWhileRevalidate(event, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(event.request);
+    const update = fetch(event.request).then(async (response) => {
+        if (cacheable(response) && response.ok) {
+            await cache.put(event.request, response.clone());
+        }
+        return response;
+    });
+    if (cached) {
+        // Answer straight away; the update finishes in the background
+        event.waitUntil(update.catch(() => undefined));
+        return cached;
+    }
+    return update;
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+    const sameOrigin = url.origin === self.location.origin;
+
+    if (sameOrigin && url.pathname === LOGOUT_URL && request.method === 'POST') {
+        // The next user of this browser must not see this user's cards
+        event.waitUntil(Promise.all([caches.delete(DECK_CACHE), caches.delete(PAGE_CACHE)]));
+        return;
+    }
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    if (sameOrigin && url.pathname.startsWith(STATIC_URL)) {
+        if (HASHED_NAME.test(url.pathname)) {
+            event.respondWith(cacheFirst(request, STATIC_CACHE));
+        } else {
+            event.respondWith(networkFirst(request, STATIC_CACHE));
+        }
+    } else if (PRECACHE.includes(url.href)) {
+        event.respondWith(cacheFirst(request, STATIC_CACHE));
+    } else if (IMAGE_HOSTS.includes(url.hostname)) {
+        event.respondWith(cacheFirst(request, IMAGE_CACHE, MAX_IMAGES));
+    } else if (sameOrigin && url.pathname === DECK_URL) {
+        event.respondWith(staleWhileRevalidate(event, DECK_CACHE));
+    } else if (sameOrigin && request.mode === 'navigate' && OFFLINE_PAGES.includes(url.pathname) && !url.search) {
+        event.respondWith(networkFirst(request, PAGE_CACHE));
+    }
+});
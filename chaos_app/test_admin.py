@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from chaos_app.models import Card
+from chaos_app.paginators import EstimatedCountPaginator, estimated_count
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Test cases for the admin paginator that estimates large counts"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        Card.objects.bulk_create(Card(user=self.user, title=f'Card {n}', content='Content') for n in range(5))
+
+    def test_no_estimate_outside_postgresql(self):
+        """Test that only PostgreSQL statistics are used for estimates"""
+        self.assertIsNone(estimated_count(Card.objects.all()))
+
+    def test_no_estimate_for_filtered_querysets(self):
+        """Test that a filtered queryset is never estimated"""
+        self.assertIsNone(estimated_count(Card.objects.filter(title='Card 1')))
+
+    def test_falls_back_to_exact_count(self):
+        """Test that the paginator counts exactly when there is no estimate"""
+        paginator = EstimatedCountPaginator(Card.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual(paginator.num_pages, 3)
+
+
+class CardAdminTest(TestCase):
+    """Test cases for the card admin changelist"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        for n in range(5):
+            user = User.objects.create_user(username=f'user-{n}')
+            Card.objects.create(user=user, title=f'Card {n}', content='Party dare')
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test that the users shown are joined rather than loaded per row"""
+        url = reverse('admin:chaos_app_card_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for n in range(5, 15):
+            Card.objects.create(user=User.objects.create_user(username=f'user-{n}'), title='More', content='More')
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(many), len(few))
+        self.assertContains(response, 'user-14')
+
+    def test_search_skips_full_count(self):
+        """Test that a search does not also count the whole table"""
+        response = self.client.get(reverse('admin:chaos_app_card_changelist'), {'q': 'Card 3'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertIsNone(response.context['cl'].full_result_count)
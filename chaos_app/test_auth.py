@@ -0,0 +1,85 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from chaos_app.auth import user_cache_key
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=True)
+class CachedUserTest(TestCase):
+    """Test cases for the cache-backed request.user resolution"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.login(username='testuser', password='testpass')
+
+    def test_user_cached_after_first_request(self):
+        """Test that the resolved user is stored in the cache"""
+        self.client.get(reverse('home'))
+        self.assertEqual(cache.get(user_cache_key(self.user.pk)), self.user)
+
+    def test_warm_cache_runs_no_auth_queries(self):
+        """Test that a warm cache serves the home page without any queries"""
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_user_save_invalidates_cache(self):
+        """Test that saving the user drops the cached copy"""
+        self.client.get(reverse('home'))
+        self.user.first_name = 'Changed'
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['user'].first_name, 'Changed')
+
+    def test_logout_invalidates_cache(self):
+        """Test that logging out drops the cached copy"""
+        self.client.get(reverse('home'))
+        self.client.logout()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_password_change_logs_out_other_sessions(self):
+        """Test that a stale session hash is not served from the cache"""
+        self.client.get(reverse('home'))
+        self.user.set_password('newpass')
+        self.user.save()
+        response = self.client.get(reverse('home'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_deactivated_user_is_not_served_from_the_cache(self):
+        """Test that an inactive user found in the cache is not trusted"""
+        self.client.get(reverse('home'))
+        stale = User.objects.get(pk=self.user.pk)
+        stale.is_active = False
+        cache.set(user_cache_key(self.user.pk), stale)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.get(reverse('home'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_stale_cache_entry_is_not_trusted(self):
+        """Test that a cached user with a different auth hash is ignored"""
+        self.client.get(reverse('home'))
+        other = User.objects.create_user(username='otheruser', password='otherpass')
+        cache.set(user_cache_key(self.user.pk), other)
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['user'], self.user)
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=False)
+class UncachedUserTest(TestCase):
+    """Test cases for request.user with the user cache turned off"""
+
+    def test_user_is_read_from_the_database(self):
+        """Test that nothing is cached and the user is loaded on every request"""
+        cache.clear()
+        user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.login(username='testuser', password='testpass')
+        self.client.get(reverse('home'))
+        self.assertIsNone(cache.get(user_cache_key(user.pk)))
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['user'], user)
@@ -0,0 +1,158 @@
+import gzip
+import brotli
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.contrib.auth.models import User
+from chaos_app.models import Card
+from chaos_app.middleware import CompressionMiddleware, negotiate_encoding
+
+
+def decode(response):
+    """Return the uncompressed body of a response"""
+    encoding = response.get('Content-Encoding')
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    if encoding == 'br':
+        return brotli.decompress(body)
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    return body
+
+
+class BytesOnTheWireTest(TestCase):
+    """Test cases measuring compressed response sizes for each view"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client(HTTP_ACCEPT_ENCODING='br, gzip')
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        for i in range(10):
+            Card.objects.create(user=self.user, title=f"Card {i}", content="Test Content " * 20)
+
+    def measure(self, url_name):
+        """Return (encoding, bytes on the wire, uncompressed bytes) for a view"""
+        response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return response.get('Content-Encoding'), len(response.content), len(decode(response))
+
+    def test_pages_without_csrf_tokens_are_compressed(self):
+        """Test that home and spin pages are sent Brotli compressed"""
+        self.client.login(username='testuser', password='testpass')
+        for url_name in ('home', 'spin_card'):
+            encoding, wire_bytes, raw_bytes = self.measure(url_name)
+            self.assertEqual(encoding, 'br', url_name)
+            self.assertLess(wire_bytes, raw_bytes * 0.5, url_name)
+
+    def test_anonymous_home_is_compressed(self):
+        """Test that the anonymous home page is compressed"""
+        encoding, wire_bytes, raw_bytes = self.measure('home')
+        self.assertEqual(encoding, 'br')
+        self.assertLess(wire_bytes, raw_bytes * 0.5)
+
+    def test_pages_with_csrf_tokens_are_not_compressed(self):
+        """Test that pages carrying a CSRF token are left uncompressed (BREACH)"""
+        self.client.login(username='testuser', password='testpass')
+        for url_name in ('user_cards', 'about', 'account_login'):
+            if url_name == 'account_login':
+                # The login page redirects signed in users
+                self.client.logout()
+            encoding, wire_bytes, raw_bytes = self.measure(url_name)
+            self.assertIsNone(encoding, url_name)
+            self.assertEqual(wire_bytes, raw_bytes, url_name)
+
+    @override_settings(COMPRESS_CSRF_RESPONSES=True)
+    def test_csrf_pages_gzipped_when_enabled(self):
+        """Test that CSRF pages are gzipped with padding when opted in"""
+        self.client.login(username='testuser', password='testpass')
+        for url_name in ('user_cards', 'about', 'account_login'):
+            if url_name == 'account_login':
+                # The login page redirects signed in users
+                self.client.logout()
+            encoding, wire_bytes, raw_bytes = self.measure(url_name)
+            self.assertEqual(encoding, 'gzip', url_name)
+            self.assertLess(wire_bytes, raw_bytes, url_name)
+
+    def test_vary_header_set(self):
+        """Test that compressible responses vary on Accept-Encoding"""
+        response = self.client.get(reverse('home'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+class CompressionMiddlewareTest(TestCase):
+    """Test cases for the CompressionMiddleware"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.factory = RequestFactory()
+        self.body = b'<p>Chaos Cards</p>' * 100
+
+    def run_middleware(self, response, accept_encoding='br, gzip'):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiate_encoding(self):
+        """Test Accept-Encoding negotiation"""
+        self.assertEqual(negotiate_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(negotiate_encoding('gzip, br;q=0'), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip, br', allow_brotli=False), 'gzip')
+        self.assertIsNone(negotiate_encoding('identity'))
+        self.assertIsNone(negotiate_encoding(''))
+
+    def test_small_responses_not_compressed(self):
+        """Test that responses under the size threshold are left alone"""
+        response = self.run_middleware(HttpResponse(b'<p>tiny</p>'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_non_text_responses_not_compressed(self):
+        """Test that binary content types are left alone"""
+        response = self.run_middleware(HttpResponse(self.body, content_type='image/webp'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_gzip_fallback(self):
+        """Test that gzip is used when Brotli is not accepted"""
+        response = self.run_middleware(HttpResponse(self.body), accept_encoding='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(decode(response), self.body)
+
+    def test_strong_etag_weakened(self):
+        """Test that a strong ETag is made weak once the body is encoded"""
+        response = HttpResponse(self.body)
+        response['ETag'] = '"abc"'
+        response = self.run_middleware(response)
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+    def test_streaming_response_not_buffered(self):
+        """Test that streaming responses are compressed chunk by chunk"""
+        consumed = []
+
+        def chunks():
+            for i in range(3):
+                consumed.append(i)
+                yield self.body
+
+        response = self.run_middleware(StreamingHttpResponse(chunks()))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertFalse(response.has_header('Content-Length'))
+        # Nothing is read from the generator until the server iterates it
+        self.assertEqual(consumed, [])
+        stream = iter(response.streaming_content)
+        self.assertTrue(next(stream))
+        self.assertEqual(consumed, [0])
+
+    def test_streaming_response_round_trip(self):
+        """Test that a compressed stream decodes to the original content"""
+        response = self.run_middleware(
+            StreamingHttpResponse(iter([self.body] * 3)), accept_encoding='gzip'
+        )
+        self.assertEqual(decode(response), self.body * 3)
+
+    async def test_async_streaming_response(self):
+        """Test that async streaming responses stay async and decode correctly"""
+        async def chunks():
+            for _ in range(3):
+                yield self.body
+
+        response = self.run_middleware(StreamingHttpResponse(chunks()))
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(brotli.decompress(body), self.body * 3)
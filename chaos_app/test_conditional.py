@@ -0,0 +1,163 @@
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from about.models import About
+from chaos_app import conditional
+from chaos_app.models import Card
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=True)
+class MyCardsConditionalGetTest(TestCase):
+    """Test cases for conditional GET on the My Cards page"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.card = Card.objects.create(user=self.user, title='Card', content='Content')
+        self.client.login(username='testuser', password='testpass')
+        self.url = reverse('user_cards')
+
+    def revalidate(self):
+        etag = self.client.get(self.url)['ETag']
+        return etag, self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_current_copy_gets_304(self):
+        """Test that an unchanged page is answered with 304"""
+        etag, response = self.revalidate()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+    def test_edit_changes_etag(self):
+        """Test that editing a card on the page gives a full response"""
+        etag = self.client.get(self.url)['ETag']
+        self.card.title = 'Edited'
+        self.card.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Edited')
+
+    def test_pages_have_their_own_etag(self):
+        """Test that another page of the deck does not share the first page's ETag"""
+        for n in range(10):
+            Card.objects.create(user=self.user, title=f'More {n}', content='Content')
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'page': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_messages_are_never_swallowed(self):
+        """Test that a page with a pending flash message is always rendered"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(reverse('edit_card', args=[self.card.pk]), {'title': '', 'content': ''})
+        # The failed edit changed nothing, but its error message must be shown
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Error updating card')
+
+    def test_new_csrf_cookie_changes_etag(self):
+        """Test that a page whose CSRF token no longer matches the cookie is re-rendered"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'x' * 32
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(DECK_CACHE_ENABLED=True)
+    def test_cached_revalidation_skips_the_database(self):
+        """Test that with the deck cache a current copy costs no query"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(DECK_CACHE_ENABLED=True)
+    def test_cached_etag_follows_the_deck(self):
+        """Test that with the deck cache a new card gives a full response"""
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Card.objects.create(user=self.user, title='Fresh', content='Content')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Fresh')
+
+
+class AboutConditionalGetTest(TestCase):
+    """Test cases for conditional GET on the about page"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.about = About.objects.create(title='About', author=self.user, content='About content')
+        self.url = reverse('about')
+
+    def test_current_copy_gets_304(self):
+        """Test that an unchanged about page is answered with 304 after one query"""
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_update_changes_etag(self):
+        """Test that editing the about content gives a full response"""
+        etag = self.client.get(self.url)['ETag']
+        self.about.content = 'New about content'
+        self.about.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'New about content')
+
+    def test_login_changes_etag(self):
+        """Test that the anonymous copy is not reused once logged in"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.login(username='testuser', password='testpass')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_success_message_after_post_is_shown(self):
+        """Test that the message after sending the form is not hidden by a 304"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(self.url, {'name': 'Jo', 'email': 'jo@example.com', 'message': 'Hello'})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Contact form sent successfully!')
+
+
+@override_settings(RELEASE_VERSION='')
+class BuildFingerprintTest(TestCase):
+    """Test cases for the release part of page ETags without RELEASE_VERSION"""
+
+    def setUp(self):
+        """Set up a static root with a manifest and a request"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.manifest = Path(directory.name) / 'staticfiles.json'
+        self.manifest.write_text('{"paths": {"css/style.css": "css/style.1.css"}}')
+        override = override_settings(STATIC_ROOT=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        conditional.build_fingerprint.cache_clear()
+        self.addCleanup(conditional.build_fingerprint.cache_clear)
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.request = RequestFactory().get('/')
+
+    def etag(self):
+        conditional.build_fingerprint.cache_clear()
+        return conditional.page_etag(self.request, self.user, 'page', 1)
+
+    def test_new_static_manifest_changes_etag(self):
+        """Test that a deploy with new hashed static names changes the ETag"""
+        etag = self.etag()
+        self.assertEqual(self.etag(), etag)
+        self.manifest.write_text('{"paths": {"css/style.css": "css/style.2.css"}}')
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_release_version_wins(self):
+        """Test that a set RELEASE_VERSION is used instead of the fingerprint"""
+        etag = self.etag()
+        with override_settings(RELEASE_VERSION='v42'):
+            self.assertNotEqual(self.etag(), etag)
+            self.manifest.write_text('{}')
+            self.assertEqual(conditional.release(), 'v42')
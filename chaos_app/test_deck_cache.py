@@ -0,0 +1,206 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from chaos_app import deck_cache
+from chaos_app.auth import user_cache_key
+from chaos_app.models import Card
+
+
+@override_settings(DECK_CACHE_ENABLED=True, AUTH_USER_CACHE_ENABLED=True)
+class DeckCacheTest(TestCase):
+    """Test cases for the cached decks used by the spin and My Cards views"""
+
+    def setUp(self):
+        """Set up a user with a small deck and an empty cache"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.cards = [
+            Card.objects.create(user=self.user, title=f'Card {n}', content='Content')
+            for n in range(12)
+        ]
+        self.client.login(username='testuser', password='testpass')
+
+    def test_load_deck_caches_ids_and_first_page(self):
+        """Test that loading a deck caches every id and the first page"""
+        ids, count, first_page = deck_cache.load_deck(self.user.pk)
+        self.assertEqual(sorted(ids), sorted(card.pk for card in self.cards))
+        self.assertEqual(count, 12)
+        self.assertEqual([card.pk for card in first_page], [card.pk for card in reversed(self.cards)][:10])
+
+    def test_warm_spin_reads_one_card(self):
+        """Test that a spin with a cached deck only loads the chosen card"""
+        deck_cache.load_deck(self.user.pk)
+        self.client.get(reverse('spin_card'))  # Also caches the user
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('spin_card'))
+        self.assertIn(response.context['random_card'], self.cards)
+
+    def test_warm_first_page_skips_the_database(self):
+        """Test that the first My Cards page is served from the cached deck"""
+        self.client.get(reverse('user_cards'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('user_cards'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+        self.assertEqual(len(response.context['cards']), 10)
+        self.assertTrue(response.context['is_paginated'])
+
+    def test_saving_a_card_invalidates_the_deck(self):
+        """Test that a new card shows on the first page after it is committed"""
+        self.client.get(reverse('user_cards'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Card.objects.create(user=self.user, title='Fresh card', content='Content')
+        response = self.client.get(reverse('user_cards'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertEqual(response.context['cards'][0].title, 'Fresh card')
+
+    def test_deleted_card_is_never_spun(self):
+        """Test that a spin falls back to the database if the picked card is gone"""
+        deck_cache.load_deck(self.user.pk)
+        # Delete without running the commit hooks, so the cached ids are stale
+        Card.objects.exclude(pk=self.cards[0].pk).delete()
+        for _ in range(5):
+            response = self.client.get(reverse('spin_card'))
+            self.assertEqual(response.context['random_card'], self.cards[0])
+
+    def test_empty_deck(self):
+        """Test that a spin with an empty cached deck finds no card"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Card.objects.filter(user=self.user).delete()
+        response = self.client.get(reverse('spin_card'))
+        self.assertIsNone(response.context['random_card'])
+
+
+class WarmCachesCommandTest(TransactionTestCase):
+    """Test cases for the warm_caches management command"""
+
+    def setUp(self):
+        """Set up recently active users with cards"""
+        cache.clear()
+        self.users = [
+            User.objects.create_user(username=f'user-{n}', last_login=timezone.now())
+            for n in range(3)
+        ]
+        for user in self.users:
+            Card.objects.create(user=user, title='Card', content='Content')
+
+    @override_settings(AUTH_USER_CACHE_ENABLED=True, DECK_CACHE_ENABLED=True)
+    def test_warms_users_and_decks(self):
+        """Test that the active users and their decks are cached, with progress reported"""
+        stdout = StringIO()
+        call_command('warm_caches', users=2, concurrency=2, stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn('Rendered /about/ (200 OK)', output)
+        self.assertIn('Warmed 2/2 users', output)
+        self.assertIn('Warmed caches in', output)
+        warmed = [user for user in self.users if cache.get(user_cache_key(user.pk))]
+        self.assertEqual(len(warmed), 2)
+        for user in warmed:
+            ids_key, _ = deck_cache.deck_keys(user.pk, deck_cache.deck_version(user.pk))
+            self.assertEqual(cache.get(ids_key), list(user.cards.values_list('pk', flat=True)))
+
+    @override_settings(AUTH_USER_CACHE_ENABLED=True)
+    def test_decks_are_skipped_without_the_deck_cache(self):
+        """Test that no deck is cached when the deck cache is off"""
+        call_command('warm_caches', users=3, stdout=StringIO())
+        user = self.users[0]
+        ids_key, _ = deck_cache.deck_keys(user.pk, deck_cache.deck_version(user.pk))
+        self.assertIsNone(cache.get(ids_key))
+        self.assertIsNotNone(cache.get(user_cache_key(user.pk)))
+
+    @override_settings(AUTH_USER_CACHE_ENABLED=False, DECK_CACHE_ENABLED=True)
+    def test_users_are_skipped_without_the_user_cache(self):
+        """Test that no user is cached when the user cache is off"""
+        call_command('warm_caches', users=3, stdout=StringIO())
+        user = self.users[0]
+        ids_key, _ = deck_cache.deck_keys(user.pk, deck_cache.deck_version(user.pk))
+        self.assertIsNotNone(cache.get(ids_key))
+        self.assertIsNone(cache.get(user_cache_key(user.pk)))
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=True)
+class DeckPayloadTest(TestCase):
+    """Test cases for the deck JSON payload used by the browser spin"""
+
+    def setUp(self):
+        """Set up a user with a small deck and an empty cache"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.cards = [
+            Card.objects.create(user=self.user, title=f'Card {n}', content='Content')
+            for n in range(3)
+        ]
+        self.client.login(username='testuser', password='testpass')
+        self.url = reverse('deck_json')
+
+    def test_requires_login(self):
+        """Test that the payload is only served to logged in users"""
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_payload(self):
+        """Test that every card is listed with its display fields"""
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        payload = response.json()
+        self.assertEqual(payload['fields'], ['id', 'title', 'content', 'image', 'tags'])
+        self.assertTrue(payload['complete'])
+        self.assertEqual(
+            [row[:3] for row in payload['cards']],
+            [[card.pk, card.title, card.content] for card in reversed(self.cards)],
+        )
+        self.assertTrue(payload['cards'][0][3].endswith('default-image.webp'))
+
+    def test_other_users_cards_are_not_included(self):
+        """Test that the payload only holds the user's own cards"""
+        other = User.objects.create_user(username='other')
+        Card.objects.create(user=other, title='Private', content='Content')
+        titles = [row[1] for row in self.client.get(self.url).json()['cards']]
+        self.assertNotIn('Private', titles)
+
+    @override_settings(DECK_PAYLOAD_MAX_CARDS=2)
+    def test_large_deck_is_marked_incomplete(self):
+        """Test that a deck over the limit is cut short and marked incomplete"""
+        payload = self.client.get(self.url).json()
+        self.assertFalse(payload['complete'])
+        self.assertEqual(len(payload['cards']), 2)
+
+    def test_not_modified_until_the_deck_changes(self):
+        """Test that revalidation returns 304 until a card changes"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.cards[0].title = 'Renamed'
+        self.cards[0].save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_weakened_etag_matches(self):
+        """Test that the weak ETag of a compressed response still revalidates"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(DECK_CACHE_ENABLED=True)
+    def test_cached_revalidation_skips_the_database(self):
+        """Test that with the deck cache a 304 runs no queries"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(DECK_CACHE_ENABLED=True)
+    def test_cached_payload_changes_with_the_deck(self):
+        """Test that the cached payload is replaced when a card is added"""
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Card.objects.create(user=self.user, title='New card', content='Content')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['cards'][0][1], 'New card')
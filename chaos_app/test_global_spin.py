@@ -0,0 +1,143 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from chaos_app import global_spin
+from chaos_app.models import Card, SharedDeck
+
+
+class PublicCardTest(TestCase):
+    """Test cases for keeping Card.is_public in step with shared decks"""
+
+    def setUp(self):
+        """Set up a user with one card"""
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.card = Card.objects.create(user=self.user, title='Card', content='Content')
+
+    def is_public(self, card):
+        card.refresh_from_db()
+        return card.is_public
+
+    def test_sharing_publishes_the_deck(self):
+        """Test that publishing, unpublishing and deleting a shared deck flip its cards"""
+        self.assertFalse(self.is_public(self.card))
+        shared_deck = SharedDeck.objects.create(user=self.user)
+        self.assertTrue(self.is_public(self.card))
+        shared_deck.published = False
+        shared_deck.save()
+        self.assertFalse(self.is_public(self.card))
+        shared_deck.published = True
+        shared_deck.save()
+        shared_deck.delete()
+        self.assertFalse(self.is_public(self.card))
+
+    def test_new_cards_of_a_shared_deck_are_public(self):
+        """Test that a card added to a shared deck is public, and not one added to another deck"""
+        SharedDeck.objects.create(user=self.user)
+        other = User.objects.create_user(username='otheruser', password='testpass')
+        self.assertTrue(Card.objects.create(user=self.user, title='New', content='Content').is_public)
+        self.assertFalse(Card.objects.create(user=other, title='Other', content='Content').is_public)
+
+
+class RandomPublicCardTest(TestCase):
+    """Test cases for picking a random public card"""
+
+    def setUp(self):
+        """Set up a shared deck and a private one, with an empty cache"""
+        cache.clear()
+        self.sharer = User.objects.create_user(username='sharer', password='testpass')
+        self.private = User.objects.create_user(username='private', password='testpass')
+        SharedDeck.objects.create(user=self.sharer)
+
+    def create_cards(self, user, count):
+        return Card.objects.bulk_create(
+            Card(user=user, title=f'Card {n}', content='Content', is_public=user == self.sharer)
+            for n in range(count)
+        )
+
+    def test_no_public_cards(self):
+        """Test that there is no pick while nobody shares a card"""
+        self.create_cards(self.private, 3)
+        self.assertIsNone(global_spin.random_public_card())
+
+    def test_small_pool_picks_every_public_card(self):
+        """Test that a small pool is picked from evenly and never yields a private card"""
+        public = {card.pk for card in self.create_cards(self.sharer, 3)}
+        self.create_cards(self.private, 3)
+        picks = {global_spin.random_public_card().pk for _ in range(60)}
+        self.assertEqual(picks, public)
+
+    def test_probes_skip_gaps(self):
+        """Test that id probes only ever hit public cards, however sparse"""
+        self.create_cards(self.private, 50)
+        public = {card.pk for card in self.create_cards(self.sharer, 5)}
+        self.create_cards(self.private, 50)
+        with mock.patch.object(global_spin, 'SMALL_POOL', 1):
+            picks = {global_spin.random_public_card().pk for _ in range(60)}
+        self.assertEqual(picks, public)
+
+    def test_stale_stats_fall_back_to_a_scan(self):
+        """Test that a spin whose batches all miss still finds a public card"""
+        card = self.create_cards(self.sharer, 1)[0]
+        cache.set(global_spin.STATS_KEY, (card.pk + 1000, card.pk + 2000, 5000))
+        with mock.patch.object(global_spin, 'SMALL_POOL', 1):
+            self.assertEqual(global_spin.random_public_card(), card)
+
+    def test_stale_estimate_without_public_cards(self):
+        """Test that an estimate left over from before an unpublish does not break the spin"""
+        self.create_cards(self.private, 3)
+        with mock.patch.object(global_spin, 'estimated_public_count', return_value=5000):
+            self.assertIsNone(global_spin.random_public_card())
+        self.assertEqual(cache.get(global_spin.STATS_KEY), (None, None, 0))
+
+    def test_estimate_is_capped_to_the_id_range(self):
+        """Test that an estimate larger than the id range falls back to a count"""
+        public = {card.pk for card in self.create_cards(self.sharer, 3)}
+        with mock.patch.object(global_spin, 'estimated_public_count', return_value=5000):
+            self.assertIn(global_spin.random_public_card().pk, public)
+        self.assertEqual(cache.get(global_spin.STATS_KEY)[2], 3)
+
+    def test_batch_size_follows_density(self):
+        """Test that sparse pools draw bigger batches, up to MAX_BATCH"""
+        self.assertEqual(global_spin.batch_size(1, 1000, 1000), 3)
+        self.assertEqual(global_spin.batch_size(1, 10_000, 1000), 30)
+        self.assertEqual(global_spin.batch_size(1, 10**9, 1000), global_spin.MAX_BATCH)
+
+    def test_stats_are_cached(self):
+        """Test that a warm spin runs a single query"""
+        self.create_cards(self.sharer, 3)
+        global_spin.random_public_card()
+        with self.assertNumQueries(1):
+            global_spin.random_public_card()
+
+
+class GlobalSpinViewTest(TestCase):
+    """Test cases for the global spin view"""
+
+    def setUp(self):
+        """Set up a logged in user and another user's shared deck"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.login(username='testuser', password='testpass')
+
+    def test_shows_the_owner(self):
+        """Test that a global spin shows whose deck the card came from"""
+        sharer = User.objects.create_user(username='sharer', password='testpass')
+        SharedDeck.objects.create(user=sharer)
+        Card.objects.create(user=sharer, title='Shared card', content='Content')
+        response = self.client.get(reverse('global_spin'))
+        self.assertContains(response, 'Shared card')
+        self.assertContains(response, "From sharer's deck")
+
+    def test_nothing_shared(self):
+        """Test that a global spin says so when nobody shares a deck"""
+        Card.objects.create(user=self.user, title='Private card', content='Content')
+        response = self.client.get(reverse('global_spin'))
+        self.assertIsNone(response.context['random_card'])
+        self.assertContains(response, 'Nobody has shared a deck yet')
+
+    def test_requires_login(self):
+        """Test that anonymous users are sent to log in"""
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('global_spin')).status_code, 302)
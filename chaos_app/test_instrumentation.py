@@ -0,0 +1,93 @@
+import re
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from chaos_app.models import Card
+from chaos_app.instrumentation import collect_request_stats, current_stats
+
+
+def parse_server_timing(header):
+    """Return {metric: (duration, description)} for a Server-Timing header"""
+    metrics = {}
+    for entry in header.split(','):
+        name, *params = [part.strip() for part in entry.split(';')]
+        values = dict(param.split('=', 1) for param in params)
+        metrics[name] = (float(values['dur']), values.get('desc', '').strip('"'))
+    return metrics
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=True, SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingMiddlewareTest(TestCase):
+    """Test cases for the ServerTimingMiddleware"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass', is_staff=True)
+        for i in range(3):
+            Card.objects.create(user=self.user, title=f"Card {i}", content="Test Content")
+        self.client.login(username='testuser', password='testpass')
+
+    def test_header_reports_db_template_and_view_time(self):
+        """Test that responses carry db, tpl and view Server-Timing metrics"""
+        response = self.client.get(reverse('user_cards'))
+        metrics = parse_server_timing(response['Server-Timing'])
+        self.assertEqual(set(metrics), {'db', 'tpl', 'view'})
+        self.assertGreater(metrics['tpl'][0], 0)
+        self.assertGreaterEqual(metrics['view'][0], metrics['tpl'][0])
+
+    def test_query_count_matches_queries_run(self):
+        """Test that the db description reports the number of queries run"""
+        self.client.get(reverse('home'))  # Warm the cached user
+        with self.assertNumQueries(2) as captured:
+            response = self.client.get(reverse('spin_card'))
+        count = int(re.match(r'(\d+) queries', parse_server_timing(response['Server-Timing'])['db'][1]).group(1))
+        self.assertEqual(count, len(captured.captured_queries))
+
+    def test_async_views_are_instrumented(self):
+        """Test that async views report their queries too"""
+        response = self.client.get(reverse('spin_card'))
+        description = parse_server_timing(response['Server-Timing'])['db'][1]
+        self.assertNotEqual(description, '0 queries')
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_have_no_header(self):
+        """Test that a sample rate of 0 disables instrumentation"""
+        response = self.client.get(reverse('home'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_header_is_only_sent_to_staff(self):
+        """Test that regular and anonymous users get no header, unless DEBUG is on"""
+        User.objects.create_user(username='regular', password='testpass')
+        self.client.login(username='regular', password='testpass')
+        self.assertNotIn('Server-Timing', self.client.get(reverse('user_cards')))
+        self.client.logout()
+        self.assertNotIn('Server-Timing', self.client.get(reverse('home')))
+        with override_settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get(reverse('home')))
+
+    def test_timing_is_logged(self):
+        """Test that a sampled request logs an INFO line carrying its structured fields"""
+        with self.assertLogs('chaos_app.timing', level='INFO') as logs:
+            self.client.get(reverse('user_cards'))
+        record = logs.records[0]
+        self.assertEqual(record.levelname, 'INFO')
+        self.assertIn('view=user_cards', record.getMessage())
+        self.assertEqual((record.method, record.path, record.view, record.status),
+                         ('GET', reverse('user_cards'), 'user_cards', 200))
+        self.assertGreater(record.queries, 0)
+        self.assertGreaterEqual(record.view_ms, record.template_ms)
+        self.assertIsInstance(record.sql_ms, float)
+
+
+class RequestStatsTest(TestCase):
+    """Test cases for the per-request stats context"""
+
+    def test_stats_only_bound_inside_block(self):
+        """Test that stats are only collected inside collect_request_stats"""
+        self.assertIsNone(current_stats())
+        with collect_request_stats() as stats:
+            self.assertIs(current_stats(), stats)
+            User.objects.count()
+        self.assertIsNone(current_stats())
+        self.assertEqual(stats.queries, 1)
@@ -0,0 +1,160 @@
+import os
+import tempfile
+from django.test import TestCase, SimpleTestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY, CollectorRegistry
+from prometheus_client.mmap_dict import MmapedDict, mmap_key
+from prometheus_client.multiprocess import MultiProcessCollector
+from chaos_app.metrics import archive_dead_process, clear_directory
+from chaos_app.models import Card
+
+
+def sample(name, **labels):
+    """Return the current value of a metric sample (0 if never recorded)"""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(METRICS_TOKEN='scrape-token')
+class MetricsEndpointTest(TestCase):
+    """Test cases for the metrics endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.staff = User.objects.create_user(username='staff', password='staffpass', is_staff=True)
+
+    def test_anonymous_users_are_forbidden(self):
+        """Test that the endpoint is not public"""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_regular_users_are_forbidden(self):
+        """Test that non-staff users cannot read metrics"""
+        self.client.login(username='testuser', password='testpass')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_wrong_token_is_forbidden(self):
+        """Test that an incorrect bearer token is rejected"""
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+    def test_scraper_token_is_accepted(self):
+        """Test that the METRICS_TOKEN bearer token grants access"""
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(response, 'chaos_request_latency_seconds_bucket')
+
+    def test_staff_can_view_metrics(self):
+        """Test that staff users can read metrics"""
+        self.client.login(username='staff', password='staffpass')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'chaos_cards_created_total')
+
+
+class MetricsRecordingTest(TestCase):
+    """Test cases for the values recorded by the metrics"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        Card.objects.create(user=self.user, title="Card", content="Test Content")
+        self.client.login(username='testuser', password='testpass')
+
+    def test_request_latency_is_labelled_by_url_name(self):
+        """Test that each request is observed under its URL name"""
+        for url_name in ('home', 'spin_card', 'user_cards', 'about'):
+            before = sample('chaos_request_latency_seconds_count', view=url_name)
+            self.client.get(reverse(url_name))
+            self.assertEqual(sample('chaos_request_latency_seconds_count', view=url_name), before + 1, url_name)
+
+    def test_query_counts_are_recorded(self):
+        """Test that the queries run by a request are added to the histogram"""
+        before = sample('chaos_request_db_queries_sum', view='spin_card')
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('spin_card'))
+        self.assertEqual(
+            sample('chaos_request_db_queries_sum', view='spin_card'), before + len(captured.captured_queries),
+        )
+
+    def test_card_create_and_delete_are_counted(self):
+        """Test that card creation and deletion increment their counters"""
+        created = sample('chaos_cards_created_total')
+        deleted = sample('chaos_cards_deleted_total')
+        card = Card.objects.create(user=self.user, title="New", content="Test Content")
+        self.client.post(reverse('delete-card', args=[card.id]))
+        self.assertEqual(sample('chaos_cards_created_total'), created + 1)
+        self.assertEqual(sample('chaos_cards_deleted_total'), deleted + 1)
+
+    def test_cache_hits_and_misses_are_counted(self):
+        """Test that cache lookups are counted per cache and result"""
+        cache = caches['template_fragments']
+        hits = sample('chaos_cache_lookups_total', cache='template_fragments', result='hit')
+        misses = sample('chaos_cache_lookups_total', cache='template_fragments', result='miss')
+        cache.get('metrics-test')
+        cache.set('metrics-test', 'value')
+        self.assertEqual(cache.get('metrics-test'), 'value')
+        self.assertEqual(sample('chaos_cache_lookups_total', cache='template_fragments', result='hit'), hits + 1)
+        self.assertEqual(sample('chaos_cache_lookups_total', cache='template_fragments', result='miss'), misses + 1)
+
+
+class ArchiveDeadProcessTest(SimpleTestCase):
+    """Test cases for folding exited workers' metric files"""
+
+    def setUp(self):
+        """Set up an empty multiprocess directory"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+
+    def write(self, typ, pid, values):
+        """Write a process's raw values ((sample, labels, value) triples) as prometheus_client does"""
+        mmap = MmapedDict(os.path.join(self.path, f'{typ}_{pid}.db'))
+        for name, labels, value in values:
+            metric = name.rsplit('_', 1)[0]
+            mmap.write_value(mmap_key(metric, name, list(labels), list(labels.values()), 'Help.'), value, 0.0)
+        mmap.close()
+
+    def collect(self):
+        """Every sample the metrics endpoint would report, as {(name, le): value}"""
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry, self.path)
+        return {
+            (sample.name, sample.labels.get('le')): sample.value
+            for metric in registry.collect() for sample in metric.samples
+        }
+
+    def test_folding_keeps_the_totals(self):
+        """Test that exited workers' files are merged into one archive per type without changing any value"""
+        for pid, count in ((101, 2), (102, 3), (103, 4)):
+            self.write('counter', pid, [('things_total', {}, count)])
+            self.write('histogram', pid, [
+                ('latency_sum', {}, count / 4),
+                ('latency_bucket', {'le': '0.1'}, 1),
+                ('latency_bucket', {'le': '+Inf'}, count - 1),
+            ])
+        before = self.collect()
+        archive_dead_process(101, self.path)
+        archive_dead_process(102, self.path)
+        self.assertEqual(self.collect(), before)
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.path) if name.endswith('.db')),
+            ['counter_103.db', 'counter_archive.db', 'histogram_103.db', 'histogram_archive.db'],
+        )
+        self.assertEqual(before[('things_total', None)], 9)
+        self.assertEqual(before[('latency_count', None)], 9)
+
+    def test_clear_directory_keeps_the_master(self):
+        """Test that starting gunicorn clears old files but not the preloaded master's"""
+        self.write('counter', 101, [('things_total', {}, 1)])
+        self.write('counter', 200, [('things_total', {}, 1)])
+        clear_directory(self.path, keep_pid=200)
+        self.assertEqual([name for name in os.listdir(self.path) if name.endswith('.db')], ['counter_200.db'])
@@ -0,0 +1,134 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from chaos_app.models import Card, RequestProfile
+from chaos_app.profiler import HEADER, make_token, StackSampler
+
+
+class ProfilerMiddlewareTest(TestCase):
+    """Test cases for the ProfilerMiddleware"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.staff = User.objects.create_user(username='staff', password='staffpass', is_staff=True)
+        for user in (self.user, self.staff):
+            Card.objects.create(user=user, title="Card", content="Test Content")
+
+    def test_normal_requests_are_not_profiled(self):
+        """Test that requests without a flag or header are not profiled"""
+        self.client.login(username='staff', password='staffpass')
+        response = self.client.get(reverse('user_cards'))
+        self.assertNotIn('X-Chaos-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_query_flag_ignored_for_regular_users(self):
+        """Test that non-staff users cannot profile with the query flag"""
+        self.client.login(username='testuser', password='testpass')
+        response = self.client.get(reverse('user_cards') + '?_profile=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_staff_query_flag_profiles_async_view(self):
+        """Test that staff can profile an async view with ?_profile=1"""
+        self.client.login(username='staff', password='staffpass')
+        response = self.client.get(reverse('user_cards') + '?_profile=1')
+        profile = RequestProfile.objects.get(pk=response['X-Chaos-Profile-Id'])
+        self.assertEqual(profile.view_name, 'user_cards')
+        self.assertEqual(profile.user, self.staff)
+        self.assertEqual(profile.status_code, 200)
+        self.assertTrue(any('user_cards_view' in row['function'] for row in profile.stats))
+        self.assertIsNone(profile.peak_memory_kb)
+
+    def test_memory_flag_traces_allocations(self):
+        """Test that ?_profile=memory records allocation sites"""
+        self.client.login(username='staff', password='staffpass')
+        response = self.client.get(reverse('home') + '?_profile=memory')
+        profile = RequestProfile.objects.get(pk=response['X-Chaos-Profile-Id'])
+        self.assertTrue(any('home' in row['function'] for row in profile.stats))
+        self.assertTrue(profile.memory)
+        self.assertGreater(profile.peak_memory_kb, 0)
+
+    def test_signed_header_profiles_any_user(self):
+        """Test that a valid signed header profiles a regular user's request"""
+        self.client.login(username='testuser', password='testpass')
+        response = self.client.get(reverse('user_cards'), headers={HEADER: make_token()})
+        profile = RequestProfile.objects.get(pk=response['X-Chaos-Profile-Id'])
+        self.assertEqual(profile.user, self.user)
+
+    def test_forged_header_is_ignored(self):
+        """Test that an unsigned or tampered header does not profile"""
+        response = self.client.get(reverse('home'), headers={HEADER: make_token() + 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILER_TOKEN_MAX_AGE=-1)
+    def test_expired_header_is_ignored(self):
+        """Test that an expired token does not profile"""
+        self.client.get(reverse('home'), headers={HEADER: make_token()})
+        self.assertFalse(RequestProfile.objects.exists())
+
+
+class StackSamplerTest(TestCase):
+    """Test cases for the stack sampler"""
+
+    def test_collapsed_stack_format(self):
+        """Test that samples are exported as 'frame;frame count' lines"""
+        sampler = StackSampler(interval=0.001)
+        sampler.stacks['outer (a.py:1);inner (b.py:2)'] = 3
+        sampler.stacks['outer (a.py:1)'] = 1
+        self.assertEqual(sampler.collapsed(), 'outer (a.py:1);inner (b.py:2) 3\nouter (a.py:1) 1')
+
+
+class RequestProfileAdminTest(TestCase):
+    """Test cases for the request profile admin pages"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        self.profile = RequestProfile.objects.create(
+            method='GET', path='/my-cards/', view_name='user_cards', status_code=200, duration_ms=12.5,
+            stats=[
+                {'function': 'render_deck', 'calls': 1, 'primitive_calls': 1, 'tottime': 1.0, 'cumtime': 9.0},
+                {'function': 'hash_rows', 'calls': 50, 'primitive_calls': 50, 'tottime': 5.0, 'cumtime': 5.0},
+            ],
+            collapsed_stacks='main;view;slow 9',
+        )
+
+    def test_changelist_shows_signed_header(self):
+        """Test that the changelist offers a signed profiling header"""
+        response = self.client.get(reverse('admin:chaos_app_requestprofile_changelist'))
+        self.assertContains(response, HEADER)
+        self.assertContains(response, '/my-cards/')
+
+    def test_stats_table_is_sortable(self):
+        """Test that the cProfile table sorts by the chosen column"""
+        url = reverse('admin:chaos_app_requestprofile_stats', args=[self.profile.pk])
+        by_cumtime = self.client.get(url).content.decode()
+        self.assertLess(by_cumtime.index('render_deck'), by_cumtime.index('hash_rows'))
+        by_tottime = self.client.get(url + '?sort=tottime').content.decode()
+        self.assertLess(by_tottime.index('hash_rows'), by_tottime.index('render_deck'))
+
+    def test_collapsed_stacks_download(self):
+        """Test that collapsed stacks are downloadable for flamegraph tools"""
+        response = self.client.get(reverse('admin:chaos_app_requestprofile_collapsed', args=[self.profile.pk]))
+        self.assertEqual(response.content, b'main;view;slow 9')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+    def test_stats_require_staff(self):
+        """Test that the profile pages are not visible to regular users"""
+        User.objects.create_user(username='testuser', password='testpass')
+        self.client.login(username='testuser', password='testpass')
+        response = self.client.get(reverse('admin:chaos_app_requestprofile_stats', args=[self.profile.pk]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_stats_require_view_permission(self):
+        """Test that staff without permission to view profiles are refused"""
+        User.objects.create_user(username='staff', password='staffpass', is_staff=True)
+        self.client.login(username='staff', password='staffpass')
+        for name in ('admin:chaos_app_requestprofile_stats', 'admin:chaos_app_requestprofile_collapsed'):
+            response = self.client.get(reverse(name, args=[self.profile.pk]))
+            self.assertEqual(response.status_code, 403)
@@ -0,0 +1,44 @@
+import json
+from django.test import TestCase
+from django.urls import reverse
+
+
+class ServiceWorkerViewTest(TestCase):
+    """Test cases for the service worker and web app manifest"""
+
+    def test_service_worker_is_served_from_the_root(self):
+        """Test that the worker is at the root, so it controls every page"""
+        self.assertEqual(reverse('service_worker'), '/sw.js')
+        response = self.client.get('/sw.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/javascript')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    def test_service_worker_precaches_static_files(self):
+        """Test that static files and the deck payload URL are passed to the worker"""
+        content = self.client.get('/sw.js').content.decode()
+        self.assertIn('"/static/css/style.css"', content)
+        self.assertIn('"/static/js/spin.js"', content)
+        self.assertIn(f"const DECK_URL = '{reverse('deck_json')}';", content)
+
+    def test_service_worker_does_not_use_the_session(self):
+        """Test that the worker is the same for everyone and never varies by cookie"""
+        with self.assertNumQueries(0):
+            response = self.client.get('/sw.js')
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_manifest(self):
+        """Test that the manifest is valid JSON with the app's icons"""
+        response = self.client.get(reverse('manifest'))
+        self.assertEqual(response['Content-Type'], 'application/manifest+json')
+        manifest = json.loads(response.content)
+        self.assertEqual(manifest['start_url'], '/')
+        self.assertEqual(manifest['display'], 'standalone')
+        self.assertTrue(manifest['icons'])
+
+    def test_pages_link_the_manifest_and_register_the_worker(self):
+        """Test that every page links the manifest and registers the worker"""
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, f'<link rel="manifest" href="{reverse("manifest")}">', html=False)
+        self.assertContains(response, "navigator.serviceWorker.register('/sw.js')")
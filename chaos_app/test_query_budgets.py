@@ -0,0 +1,142 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from about.models import About
+from chaos_app import global_spin
+from chaos_app.models import Card, CardTag, SharedDeck, Tag
+from chaos_app.query_budget import query_budget, QueryBudgetExceeded
+
+# Deck sizes every view is measured at
+DECK_SIZES = (1, 10, 1000)
+
+# Maximum queries per request, by view and deck size. Budgets are measured
+# with a warm session and user cache (AUTH_USER_CACHE_ENABLED, as with Redis).
+# A view whose count grows with the deck size is running a query per card
+# (N+1).
+#
+# name: (method, url name, url args, POST data, {deck size: max queries})
+QUERY_BUDGETS = {
+    'home': ('get', 'home', None, None, {1: 0, 10: 0, 1000: 0}),
+    'spin': ('get', 'spin_card', None, None, {1: 2, 10: 2, 1000: 2}),
+    'tagged spin': ('get', 'spin_card', 'tag', None, {1: 3, 10: 3, 1000: 3}),
+    'list page 1': ('get', 'user_cards', None, None, {1: 3, 10: 3, 1000: 3}),
+    'list last page': ('get', 'user_cards', 'last_page', None, {1: 3, 10: 3, 1000: 3}),
+    'create': ('post', 'user_cards', None, {'title': 'New', 'content': 'New content'}, {1: 2, 10: 2, 1000: 2}),
+    'edit': ('post', 'edit_card', 'card', {'title': 'Edited', 'content': 'Edited'}, {1: 4, 10: 4, 1000: 4}),
+    'delete': ('post', 'delete-card', 'card', {}, {1: 4, 10: 4, 1000: 4}),
+    'shared deck': ('get', 'shared_deck_version', 'shared', None, {1: 0, 10: 0, 1000: 0}),
+    'global spin': ('get', 'global_spin', 'public', None, {1: 1, 10: 1, 1000: 1}),
+    'record spin': ('post', 'record_spin', None, {'card': '1'}, {1: 0, 10: 0, 1000: 0}),
+    'usage stats': ('get', 'user_stats', None, None, {1: 2, 10: 2, 1000: 2}),
+    'deck payload': ('get', 'deck_json', None, None, {1: 2, 10: 2, 1000: 2}),
+    'about': ('get', 'about', None, None, {1: 1, 10: 1, 1000: 1}),
+    'admin cards': ('get', 'admin:chaos_app_card_changelist', None, None, {1: 3, 10: 3, 1000: 3}),
+}
+
+
+class QueryBudgetTest(TestCase):
+    """Test cases for the query_budget context manager"""
+
+    def test_within_budget_passes(self):
+        """Test that a block within its budget does not fail"""
+        with query_budget(1):
+            User.objects.count()
+
+    def test_over_budget_fails_with_sql_dump(self):
+        """Test that exceeding the budget fails and lists the queries"""
+        user = User.objects.create_user(username='testuser', password='testpass')
+        for i in range(3):
+            Card.objects.create(user=user, title=f"Card {i}", content="Test Content")
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with query_budget(1, label='card titles'):
+                # Card.__str__ follows card.user: one query per card
+                [str(card) for card in Card.objects.all()]
+        message = str(raised.exception)
+        self.assertIn('card titles: 4 queries executed, budget is 1', message)
+        self.assertIn('3x SELECT', message)
+        self.assertIn('FROM "auth_user"', message)
+
+    def test_works_as_decorator(self):
+        """Test that query_budget can decorate a function"""
+        @query_budget(0)
+        def run_query():
+            User.objects.exists()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            run_query()
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=True)
+class ViewQueryBudgetTest(TestCase):
+    """Test cases checking every view against QUERY_BUDGETS"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass', is_staff=True, is_superuser=True)
+        About.objects.create(title='About', author=self.user, content='About content')
+
+    def seed(self, deck_size):
+        """Give the test user a deck of deck_size cards, all tagged party"""
+        cards = Card.objects.bulk_create(
+            Card(user=self.user, title=f"Card {i}", content="Test Content") for i in range(deck_size)
+        )
+        tag, _ = Tag.objects.get_or_create(user=self.user, name='party')
+        CardTag.objects.bulk_create(CardTag(card=card, tag=tag) for card in cards)
+
+    def url_for(self, url_name, args, deck_size):
+        """Resolve a budget row to a URL"""
+        if args == 'card':
+            return reverse(url_name, args=[Card.objects.filter(user=self.user).values_list('id', flat=True)[0]])
+        if args == 'shared':
+            shared_deck, _ = SharedDeck.objects.get_or_create(user=self.user)
+            shared_deck.refresh_from_db()
+            url = reverse(url_name, args=[shared_deck.slug, shared_deck.version])
+            # Measured warm, as a busy shared deck nearly always is
+            self.client.get(url)
+            return url
+        if args == 'public':
+            SharedDeck.objects.update_or_create(user=self.user, defaults={'published': True})
+            cache.delete(global_spin.STATS_KEY)
+            url = reverse(url_name)
+            # Measured with the pool stats cached, as they nearly always are
+            self.client.get(url)
+            return url
+        url = reverse(url_name)
+        if args == 'tag':
+            url += '?tag=party'
+        if args == 'last_page':
+            url += f'?page={(deck_size + 9) // 10}'
+        return url
+
+    def check_budgets(self, deck_size):
+        """Run every view once and compare its query count with the table"""
+        for name, (method, url_name, args, data, budgets) in QUERY_BUDGETS.items():
+            with self.subTest(view=name, deck_size=deck_size):
+                Card.objects.all().delete()
+                self.seed(deck_size)
+                self.client.login(username='testuser', password='testpass')
+                # Warm the session and user caches
+                self.client.get(reverse('home'))
+                url = self.url_for(url_name, args, deck_size)
+                with query_budget(budgets[deck_size], label=f'{name} with {deck_size} cards'):
+                    response = getattr(self.client, method)(url, data)
+                self.assertLess(response.status_code, 400)
+
+    def test_every_view_has_a_budget_per_deck_size(self):
+        """Test that the budget table covers every deck size"""
+        for name, row in QUERY_BUDGETS.items():
+            self.assertEqual(set(row[-1]), set(DECK_SIZES), name)
+
+    def test_budgets_with_1_card(self):
+        """Test that views stay within budget with a single card"""
+        self.check_budgets(1)
+
+    def test_budgets_with_10_cards(self):
+        """Test that views stay within budget with a full page of cards"""
+        self.check_budgets(10)
+
+    def test_budgets_with_1000_cards(self):
+        """Test that views stay within budget with a large deck"""
+        self.check_budgets(1000)
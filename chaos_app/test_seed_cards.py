@@ -0,0 +1,96 @@
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import NOT_PROVIDED
+from django.test import TestCase
+from django.contrib.auth.models import User
+from chaos_app.management.commands.seed_cards import COPY_FIELDS
+from chaos_app.models import Card
+
+
+def seed(**options):
+    """Run seed_cards quietly with small defaults"""
+    options = {'users': 20, 'cards_per_user': 5, 'seed': 7, **options}
+    call_command('seed_cards', '--end=2025-01-01', stdout=StringIO(), **options)
+
+
+def decks(prefix):
+    """Return each seeded user's (titles, created_on values), in user order"""
+    users = User.objects.filter(username__startswith=f'{prefix}-')
+    return sorted(
+        (int(user.username.rsplit('-', 1)[1]),
+         list(user.cards.order_by('created_on', 'id').values_list('title', 'created_on')))
+        for user in users
+    )
+
+
+class SeedCardsCommandTest(TestCase):
+    """Test cases for the seed_cards management command"""
+
+    def test_creates_users_and_cards(self):
+        """Test that the requested users are created with about the requested cards"""
+        seed(prefix='seeded')
+        self.assertEqual(User.objects.filter(username__startswith='seeded-').count(), 20)
+        total = Card.objects.filter(user__username__startswith='seeded-').count()
+        self.assertAlmostEqual(total / 20, 5, delta=1)
+
+    def test_seeded_users_cannot_log_in(self):
+        """Test that seeded users have unusable passwords"""
+        seed(prefix='seeded', users=2)
+        self.assertFalse(User.objects.get(username='seeded-0').has_usable_password())
+
+    def test_created_on_is_spread_before_end(self):
+        """Test that cards keep their generated, varied creation times"""
+        seed(prefix='seeded')
+        dates = list(Card.objects.values_list('created_on', flat=True))
+        self.assertGreater(len(set(dates)), len(dates) // 2)
+        self.assertTrue(all(date.year <= 2025 for date in dates))
+        self.assertLess(min(dates).year, 2025)
+
+    def test_deck_sizes_are_skewed(self):
+        """Test that some users have much larger decks than others"""
+        seed(prefix='seeded', users=50, cards_per_user=20)
+        sizes = sorted(len(cards) for _, cards in decks('seeded'))
+        self.assertGreater(sizes[-1], sizes[len(sizes) // 2] * 2)
+
+    def test_same_seed_reproduces_data(self):
+        """Test that the same seed generates the same decks"""
+        seed(prefix='first')
+        seed(prefix='second')
+        self.assertEqual(decks('first'), decks('second'))
+
+    def test_different_seed_changes_data(self):
+        """Test that a different seed generates different decks"""
+        seed(prefix='first')
+        seed(prefix='second', seed=8)
+        self.assertNotEqual(decks('first'), decks('second'))
+
+    def test_existing_prefix_is_rejected(self):
+        """Test that seeding twice with the same prefix fails cleanly"""
+        seed(prefix='seeded', users=2)
+        with self.assertRaises(CommandError):
+            seed(prefix='seeded', users=2)
+
+
+class CopyColumnsTest(TestCase):
+    """Test cases for the card columns written by COPY"""
+
+    def test_other_columns_have_database_defaults(self):
+        """Test that every card column COPY leaves out can be filled by the database"""
+        for field in Card._meta.concrete_fields:
+            if field.primary_key or field.name in COPY_FIELDS:
+                continue
+            with self.subTest(field=field.name):
+                self.assertTrue(field.null or field.db_default is not NOT_PROVIDED)
+
+    def test_insert_of_copy_columns_only(self):
+        """Test that a row with only the COPY columns can be inserted, as COPY does"""
+        user = User.objects.create_user(username='copyuser')
+        columns = ', '.join(connection.ops.quote_name(Card._meta.get_field(name).column) for name in COPY_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {connection.ops.quote_name(Card._meta.db_table)} ({columns}) VALUES (%s, %s, %s, %s, %s)',
+                [user.pk, 'Copied', 'Content', 'placeholder', '2025-01-01 00:00:00'],
+            )
+        self.assertFalse(Card.objects.get(title='Copied').is_public)
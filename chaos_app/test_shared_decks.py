@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from chaos_app import shared_decks
+from chaos_app.models import Card, SharedDeck
+
+
+class ShareDeckViewTest(TestCase):
+    """Test cases for publishing and unpublishing a deck"""
+
+    def setUp(self):
+        """Set up a logged in user"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.login(username='testuser', password='testpass')
+
+    def test_publish_and_unpublish(self):
+        """Test that a user can share their deck and stop sharing it"""
+        response = self.client.post(reverse('share_deck'), {'action': 'publish'}, follow=True)
+        shared_deck = SharedDeck.objects.get(user=self.user)
+        self.assertTrue(shared_deck.published)
+        self.assertContains(response, reverse('shared_deck', args=[shared_deck.slug]))
+
+        self.client.post(reverse('share_deck'), {'action': 'unpublish'})
+        shared_deck.refresh_from_db()
+        self.assertFalse(shared_deck.published)
+        self.assertEqual(shared_deck.version, 2)
+        self.assertEqual(self.client.get(reverse('shared_deck', args=[shared_deck.slug])).status_code, 404)
+
+    def test_requires_login(self):
+        """Test that anonymous users are sent to log in"""
+        self.client.logout()
+        response = self.client.get(reverse('share_deck'))
+        self.assertEqual(response.status_code, 302)
+
+
+class SharedDeckViewTest(TestCase):
+    """Test cases for the public shared deck pages"""
+
+    def setUp(self):
+        """Set up a user with a published deck of two cards"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        Card.objects.create(user=self.user, title='First card', content='Content')
+        Card.objects.create(user=self.user, title='Second card', content='Content')
+        self.shared_deck = SharedDeck.objects.create(user=self.user)
+        self.pointer = reverse('shared_deck', args=[self.shared_deck.slug])
+
+    def page_url(self, version=None):
+        """The URL of a version of the deck page"""
+        return reverse('shared_deck_version', args=[self.shared_deck.slug, version or self.shared_deck.version])
+
+    def test_pointer_redirects_to_the_current_version(self):
+        """Test that the public link redirects to the versioned page, cached briefly"""
+        response = self.client.get(self.pointer)
+        self.assertRedirects(response, self.page_url(), fetch_redirect_response=False)
+        max_age = settings.SHARED_DECK_POINTER_MAX_AGE
+        self.assertEqual(response['Cache-Control'], f'public, max-age={max_age}, s-maxage={max_age}')
+        self.assertEqual(response['Surrogate-Key'], f'shared-deck-{self.shared_deck.slug}')
+
+    def test_page_lists_the_cards(self):
+        """Test that the versioned page shows the deck and may be cached by CDNs"""
+        response = self.client.get(self.page_url())
+        self.assertContains(response, "testuser's deck")
+        self.assertContains(response, 'First card')
+        self.assertContains(response, 'Second card')
+        self.assertNotContains(response, 'You are not logged in')
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.SHARED_DECK_BROWSER_MAX_AGE}, s-maxage={settings.SHARED_DECK_MAX_AGE}',
+        )
+
+    def test_warm_pages_need_no_query(self):
+        """Test that the pointer and the page are served from the cache once warm"""
+        self.client.get(self.pointer)
+        self.client.get(self.page_url())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.pointer).status_code, 302)
+            self.assertEqual(self.client.get(self.page_url()).status_code, 200)
+
+    def test_no_session_or_csrf_for_logged_in_visitors(self):
+        """Test that the public pages set no cookie and do not vary on it, even for a logged in user"""
+        self.client.login(username='testuser', password='testpass')
+        for url in (self.pointer, self.page_url()):
+            response = self.client.get(url)
+            self.assertFalse(response.cookies)
+            self.assertNotIn('Cookie', response.get('Vary', ''))
+            self.assertFalse(response.wsgi_request.session.accessed)
+            self.assertNotIn('csrfmiddlewaretoken', response.content.decode())
+
+    def test_editing_a_card_moves_the_page(self):
+        """Test that a change to the deck gives it a new version and redirects the old one"""
+        old_url = self.page_url()
+        Card.objects.create(user=self.user, title='Third card', content='Content')
+        self.shared_deck.refresh_from_db()
+        self.assertEqual(self.shared_deck.version, 2)
+        response = self.client.get(old_url)
+        self.assertRedirects(response, self.page_url(), fetch_redirect_response=False)
+        self.assertContains(self.client.get(self.page_url()), 'Third card')
+
+    def test_editing_and_deleting_move_the_page(self):
+        """Test that editing or deleting a card of the published deck bumps its version"""
+        card = Card.objects.get(title='First card')
+        card.title = 'Renamed card'
+        card.save()
+        card.delete()
+        self.shared_deck.refresh_from_db()
+        self.assertEqual(self.shared_deck.version, 3)
+
+    def test_unpublished_deck_is_not_bumped(self):
+        """Test that card writes leave an unpublished deck's version alone"""
+        self.shared_deck.published = False
+        self.shared_deck.save()
+        version = self.shared_deck.version
+        Card.objects.create(user=self.user, title='Third card', content='Content')
+        Card.objects.get(title='First card').delete()
+        self.shared_deck.refresh_from_db()
+        self.assertEqual(self.shared_deck.version, version)
+
+    def test_conditional_get(self):
+        """Test that a CDN revalidating a version gets a 304"""
+        etag = self.client.get(self.page_url())['ETag']
+        response = self.client.get(self.page_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_unpublished_and_unknown_decks(self):
+        """Test that unpublished and unknown decks are not found"""
+        self.shared_deck.published = False
+        self.shared_deck.save()
+        self.assertEqual(self.client.get(self.pointer).status_code, 404)
+        self.assertEqual(self.client.get(self.page_url()).status_code, 404)
+        self.assertEqual(self.client.get(reverse('shared_deck', args=['unknown'])).status_code, 404)
+
+    def test_unpublishing_stops_a_warm_page(self):
+        """Test that a cached page is no longer served once the deck is unpublished"""
+        self.client.login(username='testuser', password='testpass')
+        url = self.page_url()
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.post(reverse('share_deck'), {'action': 'unpublish'})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_stale_page_cache_is_not_served(self):
+        """Test that a page left in the cache is not served for an unpublished deck"""
+        html = self.client.get(self.page_url()).content
+        SharedDeck.objects.filter(pk=self.shared_deck.pk).update(published=False)
+        # Another worker's cache: the page survived, only the pointer expired
+        cache.delete(shared_decks.pointer_key(self.shared_deck.slug))
+        self.assertEqual(cache.get(shared_decks.page_key(self.shared_deck.slug, self.shared_deck.version)), html)
+        self.assertEqual(self.client.get(self.page_url()).status_code, 404)
+
+    def test_only_safe_methods(self):
+        """Test that the public pages refuse POST"""
+        self.assertEqual(self.client.post(self.page_url()).status_code, 405)
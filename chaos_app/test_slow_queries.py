@@ -0,0 +1,119 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from chaos_app.instrumentation import collect_request_stats
+from chaos_app.models import Card, SlowQuery
+
+
+class SlowQueryRecorderTest(TestCase):
+    """Test cases for the slow query recorder"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        Card.objects.create(user=self.user, title="Card", content="Test Content")
+
+    def test_fast_queries_are_not_recorded(self):
+        """Test that queries under the threshold are ignored"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=10_000):
+            Card.objects.count()
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_disabled_recorder_records_nothing(self):
+        """Test that a threshold of None turns the recorder off"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=None):
+            Card.objects.count()
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_slow_query_is_recorded_with_plan_and_stack(self):
+        """Test that a slow query is stored with params, plan and stack"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0):
+            list(Card.objects.filter(title='Card'))
+        entry = SlowQuery.objects.get(sql__contains='"chaos_app_card"')
+        self.assertIn("'Card'", entry.params)
+        self.assertTrue(entry.plan)
+        self.assertNotIn('EXPLAIN failed', entry.plan)
+        self.assertIn('test_slow_queries.py', entry.stack)
+
+    def test_view_name_is_recorded(self):
+        """Test that queries run by a view are tagged with the view name"""
+        self.client.login(username='testuser', password='testpass')
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0):
+            self.client.get(reverse('user_cards'))
+        self.assertTrue(SlowQuery.objects.filter(view_name='user_cards', sql__contains='"chaos_app_card"').exists())
+
+    def test_same_statement_is_recorded_once_per_interval(self):
+        """Test that repeats of a slow statement within the interval are not recorded again"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0):
+            for i in range(5):
+                Card.objects.filter(title=f'Card {i}').exists()
+            Card.objects.filter(content='Test Content').exists()
+        self.assertEqual(SlowQuery.objects.filter(sql__contains='"title" =').count(), 1)
+        self.assertEqual(SlowQuery.objects.filter(sql__contains='"content" =').count(), 1)
+
+    def test_recording_is_left_out_of_request_stats(self):
+        """Test that only the slow query itself is counted in the request's stats"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0), collect_request_stats() as stats:
+            Card.objects.filter(title='Card').exists()
+        self.assertTrue(SlowQuery.objects.filter(sql__contains='"title" =').exists())
+        self.assertEqual(stats.queries, 1)
+
+    @override_settings(SLOW_QUERY_LOG_SIZE=3, SLOW_QUERY_RECORD_INTERVAL=0)
+    def test_log_is_a_bounded_ring_buffer(self):
+        """Test that the log never holds more than SLOW_QUERY_LOG_SIZE entries"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0):
+            for i in range(10):
+                Card.objects.filter(title=f'Card {i}').exists()
+        self.assertEqual(SlowQuery.objects.count(), 3)
+        # The newest query is kept
+        self.assertTrue(SlowQuery.objects.filter(params__contains="'Card 9'").exists())
+
+
+class DumpSlowQueriesCommandTest(TestCase):
+    """Test cases for the dump_slow_queries management command"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0):
+            Card.objects.filter(title='Needle').exists()
+
+    def test_text_output(self):
+        """Test that entries are printed with their SQL and plan"""
+        out = StringIO()
+        call_command('dump_slow_queries', stdout=out)
+        self.assertIn('Needle', out.getvalue())
+        self.assertIn('Plan:', out.getvalue())
+
+    def test_json_output(self):
+        """Test that --json prints a JSON list of entries"""
+        out = StringIO()
+        call_command('dump_slow_queries', '--json', '--sort=slowest', stdout=out)
+        entries = json.loads(out.getvalue())
+        self.assertTrue(any('Needle' in entry['params'] for entry in entries))
+
+    def test_clear(self):
+        """Test that --clear empties the log"""
+        call_command('dump_slow_queries', '--clear', stdout=StringIO())
+        self.assertFalse(SlowQuery.objects.exists())
+
+
+class SlowQueryAdminTest(TestCase):
+    """Test cases for the slow query admin pages"""
+
+    def test_staff_can_browse_slow_queries(self):
+        """Test that recorded queries are listed in the admin"""
+        User.objects.create_superuser(username='admin', password='adminpass')
+        cache.clear()
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0):
+            Card.objects.filter(title='Needle').exists()
+        client = Client()
+        client.login(username='admin', password='adminpass')
+        response = client.get(reverse('admin:chaos_app_slowquery_changelist'))
+        self.assertContains(response, 'chaos_app_card')
@@ -0,0 +1,27 @@
+from django.apps import apps
+from django.test import SimpleTestCase
+from chaos_app.management.commands.startup_profile import parse_importtime
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   allauth.core
+import time:       300 |        420 | allauth
+import time:      1000 |       1000 |     urllib3.util
+import time:       500 |       1500 |   urllib3
+import time:        80 |       1580 | cloudinary.utils
+"""
+
+
+class StartupProfileTest(SimpleTestCase):
+    """Test cases for the startup_profile command and cold start pruning"""
+
+    def test_import_time_is_grouped_by_top_level_package(self):
+        """Test that self times are summed per top-level package"""
+        packages = parse_importtime(IMPORTTIME)
+        self.assertEqual(packages['allauth'], [420, 2])
+        self.assertEqual(packages['urllib3'], [1500, 2])
+        self.assertEqual(packages['cloudinary'], [80, 1])
+
+    def test_unused_integrations_are_not_installed(self):
+        """Test that social login and cloudinary_storage are not loaded by default"""
+        self.assertFalse(apps.is_installed('allauth.socialaccount'))
+        self.assertFalse(apps.is_installed('cloudinary_storage'))
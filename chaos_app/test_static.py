@@ -0,0 +1,57 @@
+import shutil
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class CompressedManifestStaticTest(SimpleTestCase):
+    """Test cases for the hashed, precompressed static files pipeline"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            STATIC_ROOT=cls.static_root,
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {
+                    'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+                },
+            },
+            # Only collect the project's own static folder
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        cls.settings_override.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.static_root)
+        super().tearDownClass()
+
+    def test_static_tag_returns_hashed_url(self):
+        """Test that templates get content-hashed static URLs"""
+        url = static('css/style.css')
+        self.assertRegex(url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+
+    def test_compressed_variants_created(self):
+        """Test that gzip and Brotli variants are written at collectstatic time"""
+        hashed = static('js/edit_card.js').removeprefix(settings.STATIC_URL)
+        self.assertTrue((Path(self.static_root) / f'{hashed}.gz').exists())
+        self.assertTrue((Path(self.static_root) / f'{hashed}.br').exists())
+
+    def test_hashed_files_served_immutable(self):
+        """Test that hashed files get far-future immutable cache headers"""
+        middleware = WhiteNoiseMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get(static('css/style.css'), HTTP_ACCEPT_ENCODING='br, gzip')
+        response = middleware(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Encoding'], 'br')
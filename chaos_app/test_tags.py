@@ -0,0 +1,173 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from chaos_app import tags
+from chaos_app.forms import CardForm
+from chaos_app.models import Card, CardTag, Tag
+
+
+class ParseTagsTest(TestCase):
+    """Test cases for parsing tag lists"""
+
+    def test_tags_are_normalised_and_distinct(self):
+        """Test that tags are lower cased, trimmed and listed once"""
+        self.assertEqual(tags.parse_tags(' Party ,work,, party,Late   Night'), ['party', 'work', 'late night'])
+
+    def test_too_many_tags(self):
+        """Test that more than MAX_TAGS_PER_CARD tags are refused"""
+        with self.assertRaises(ValidationError):
+            tags.parse_tags(','.join(f'tag{n}' for n in range(tags.MAX_TAGS_PER_CARD + 1)))
+
+    def test_overlong_tag(self):
+        """Test that a tag longer than the name column is refused"""
+        with self.assertRaises(ValidationError):
+            tags.parse_tags('x' * (tags.TAG_MAX_LENGTH + 1))
+
+    def test_spin_tags_are_capped(self):
+        """Test that a spin combines at most MAX_SPIN_TAGS tags"""
+        names = tags.spin_tags([f'Tag{n}' for n in range(10)] + ['', 'tag0'])
+        self.assertEqual(names, [f'tag{n}' for n in range(tags.MAX_SPIN_TAGS)])
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=True)
+class TaggedSpinTest(TestCase):
+    """Test cases for tagging cards and spinning by tag"""
+
+    def setUp(self):
+        """Set up a user whose cards carry party and work tags"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.party = Card.objects.create(user=self.user, title='Party', content='Dance')
+        self.work = Card.objects.create(user=self.user, title='Work', content='Email')
+        self.both = Card.objects.create(user=self.user, title='Office party', content='Karaoke')
+        Card.objects.create(user=self.user, title='Untagged', content='Nap')
+        tags.set_card_tags(self.party, ['party'])
+        tags.set_card_tags(self.work, ['work'])
+        tags.set_card_tags(self.both, ['party', 'work'])
+        self.client.login(username='testuser', password='testpass')
+
+    def spun_titles(self, query, spins=30):
+        """The titles of the cards a number of spins came up with"""
+        return {
+            self.client.get(reverse('spin_card') + query).context['random_card'].title
+            for _ in range(spins)
+        }
+
+    def test_set_card_tags_reuses_the_users_tags(self):
+        """Test that tagging creates each tag once per user and replaces old tags"""
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        tags.set_card_tags(self.both, ['work'])
+        self.assertEqual(list(self.both.tags.values_list('name', flat=True)), ['work'])
+        tags.set_card_tags(self.both, [])
+        self.assertFalse(CardTag.objects.filter(card=self.both).exists())
+
+    def test_spin_by_one_tag(self):
+        """Test that a tagged spin only picks cards with that tag"""
+        self.assertEqual(self.spun_titles('?tag=party'), {'Party', 'Office party'})
+
+    def test_spin_by_intersection(self):
+        """Test that several tags pick cards carrying all of them"""
+        self.assertEqual(self.spun_titles('?tag=Party&tag=work', spins=5), {'Office party'})
+
+    def test_no_matching_card(self):
+        """Test that a spin with no matching card says so"""
+        response = self.client.get(reverse('spin_card') + '?tag=party&tag=holiday')
+        self.assertIsNone(response.context['random_card'])
+        self.assertContains(response, 'None of your cards are tagged party + holiday')
+
+    def test_other_users_tags_are_ignored(self):
+        """Test that a spin never picks another user's card with the same tag"""
+        other = User.objects.create_user(username='otheruser', password='testpass')
+        card = Card.objects.create(user=other, title='Not mine', content='Content')
+        tags.set_card_tags(card, ['party'])
+        self.assertEqual(self.spun_titles('?tag=party'), {'Party', 'Office party'})
+
+    def test_tagged_spin_query_count(self):
+        """Test that a tagged spin looks up the tags, counts the matches and reads one card"""
+        self.client.get(reverse('spin_card'))  # Cache the user
+        with self.assertNumQueries(3):
+            self.client.get(reverse('spin_card') + '?tag=party&tag=work')
+
+    def test_unknown_tag_skips_the_count(self):
+        """Test that a spin by a tag the user does not have stops after the tag lookup"""
+        self.client.get(reverse('spin_card'))  # Cache the user
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('spin_card') + '?tag=holiday')
+        self.assertIsNone(response.context['random_card'])
+
+    def test_card_counts_follow_tagging(self):
+        """Test that each tag counts its cards through tagging, untagging and deletes"""
+        counts = lambda: dict(Tag.objects.values_list('name', 'card_count'))
+        self.assertEqual(counts(), {'party': 2, 'work': 2})
+        tags.set_card_tags(self.party, ['work'])
+        self.assertEqual(counts(), {'party': 1, 'work': 3})
+        self.both.delete()
+        self.assertEqual(counts(), {'party': 0, 'work': 2})
+        tags.set_card_tags(self.work, [])
+        self.assertEqual(counts(), {'party': 0, 'work': 1})
+
+    def test_smallest_tag_is_walked_first(self):
+        """Test that the match query starts from the tag with the fewest cards"""
+        for n in range(3):
+            card = Card.objects.create(user=self.user, title=f'Extra {n}', content='Content')
+            tags.set_card_tags(card, ['party'])
+        matches = async_to_sync(tags.atagged_card_ids)(self.user.pk, ['party', 'work'])
+        self.assertIn(f'"tag_id" = {Tag.objects.get(name="work").pk}', str(matches.query).split('EXISTS')[0])
+        self.assertEqual(list(matches), [self.both.pk])
+
+    def test_create_and_edit_card_with_tags(self):
+        """Test that the card form saves the tags it is given"""
+        self.client.post(reverse('user_cards'), {'title': 'New', 'content': 'New content', 'tags': 'Games, party'})
+        card = Card.objects.get(title='New')
+        self.assertEqual(list(card.tags.values_list('name', flat=True)), ['games', 'party'])
+        self.client.post(reverse('edit_card', args=[card.pk]), {'title': 'New', 'content': 'New content', 'tags': 'work'})
+        self.assertEqual(list(card.tags.values_list('name', flat=True)), ['work'])
+
+    def test_card_form_rejects_too_many_tags(self):
+        """Test that the card form reports too many tags"""
+        form = CardForm(data={'title': 'Title', 'content': 'Content', 'tags': ','.join(map(str, range(20)))})
+        self.assertFalse(form.is_valid())
+        self.assertIn('tags', form.errors)
+
+    def test_my_cards_links_tags_to_spins(self):
+        """Test that My Cards shows each tag as a link to a spin of it"""
+        response = self.client.get(reverse('user_cards'))
+        self.assertContains(response, f'href="{reverse("spin_card")}?tag=party"')
+        self.assertContains(response, 'data-tags="party, work"')
+
+
+@override_settings(DECK_CACHE_ENABLED=True, AUTH_USER_CACHE_ENABLED=True)
+class CachedTaggedSpinTest(TestCase):
+    """Test cases for tagged spins with the deck cache"""
+
+    def setUp(self):
+        """Set up a user with one tagged card and an empty cache"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.card = Card.objects.create(user=self.user, title='Party', content='Dance')
+        tags.set_card_tags(self.card, ['party'])
+        self.client.login(username='testuser', password='testpass')
+
+    def test_warm_tagged_spin_reads_one_card(self):
+        """Test that a repeated tagged spin picks from the cached ids"""
+        self.client.get(reverse('spin_card') + '?tag=party')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('spin_card') + '?tag=party')
+        self.assertEqual(response.context['random_card'], self.card)
+
+    def test_tagging_invalidates_the_cached_ids(self):
+        """Test that tagging another card is seen by the next tagged spin"""
+        self.client.get(reverse('spin_card') + '?tag=work')
+        with self.captureOnCommitCallbacks(execute=True):
+            tags.set_card_tags(self.card, ['work'])
+        response = self.client.get(reverse('spin_card') + '?tag=work')
+        self.assertEqual(response.context['random_card'], self.card)
+
+    def test_payload_lists_tags(self):
+        """Test that the deck payload carries each card's tags"""
+        payload = self.client.get(reverse('deck_json')).json()
+        self.assertEqual(payload['fields'][-1], 'tags')
+        self.assertEqual(payload['cards'][0][-1], ['party'])
@@ -0,0 +1,130 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from about.models import CollaborateRequest
+from chaos_app.throttle import client_ip, parse_rate, take_token
+
+
+class TokenBucketTest(SimpleTestCase):
+    """Test cases for the token bucket behind the throttle"""
+
+    def setUp(self):
+        """Start every test with empty buckets"""
+        cache.clear()
+
+    def test_parse_rate(self):
+        """Test that rates are converted to tokens per second"""
+        self.assertEqual(parse_rate('30/m'), 0.5)
+        self.assertEqual(parse_rate('7200/hour'), 2)
+        self.assertEqual(parse_rate('2/s'), 2)
+        with self.assertRaises(ValueError):
+            parse_rate('10/fortnight')
+
+    def test_burst_is_allowed_then_refused(self):
+        """Test that a full bucket allows a burst and then refuses"""
+        results = [take_token('burst', 5, 1, now=1000)[0] for _ in range(7)]
+        self.assertEqual(results, [True] * 5 + [False] * 2)
+
+    def test_retry_after_is_time_to_next_token(self):
+        """Test that a refused request is told when a token will be available"""
+        for _ in range(2):
+            take_token('retry', 2, 0.5, now=1000)
+        allowed, retry_after = take_token('retry', 2, 0.5, now=1000.5)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 1.5)
+
+    def test_sustained_rate(self):
+        """Test that a client sending faster than the rate settles at the rate"""
+        # 4 requests a second for a minute against a 1 a second limit
+        allowed = sum(take_token('sustained', 3, 1, now=1000 + n / 4)[0] for n in range(240))
+        # The initial burst, then one a second
+        self.assertIn(allowed, range(3 + 59, 3 + 61))
+
+    def test_bucket_refills_to_burst_only(self):
+        """Test that an idle bucket never holds more than the burst"""
+        take_token('idle', 2, 1, now=1000)
+        results = [take_token('idle', 2, 1, now=5000)[0] for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+
+    @override_settings(THROTTLE_PROXY_COUNT=1)
+    def test_client_ip_behind_proxy(self):
+        """Test that the address added by the trusted proxy is used"""
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='6.6.6.6, 1.2.3.4', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(client_ip(request), '1.2.3.4')
+
+    def test_client_ip_without_proxy(self):
+        """Test that X-Forwarded-For is ignored when no proxy is trusted"""
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='6.6.6.6', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(client_ip(request), '10.0.0.1')
+
+
+@override_settings(
+    THROTTLE_ENABLED=True,
+    THROTTLE_RATES={
+        'spin_card': {'rate': '1/m', 'burst': 2},
+        'about': {'rate': '1/h', 'burst': 2, 'methods': ('POST',)},
+    },
+)
+class ThrottleMiddlewareTest(TestCase):
+    """Test cases for the throttle middleware"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.other = User.objects.create_user(username='otheruser', password='testpass')
+        self.feedback = {'name': 'Spammer', 'email': 'spam@example.com', 'message': 'Buy now'}
+
+    def test_about_posts_are_limited_per_ip(self):
+        """Test that feedback posts past the burst get a 429 and are not saved"""
+        statuses = [self.client.post(reverse('about'), self.feedback).status_code for _ in range(3)]
+        self.assertEqual(statuses, [302, 302, 429])
+        self.assertEqual(CollaborateRequest.objects.count(), 2)
+
+    def test_refused_post_runs_no_queries(self):
+        """Test that a throttled request is answered before any database work"""
+        for _ in range(2):
+            self.client.post(reverse('about'), self.feedback)
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('about'), self.feedback)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+
+    def test_other_ips_have_their_own_bucket(self):
+        """Test that one client's burst does not limit another"""
+        for _ in range(3):
+            self.client.post(reverse('about'), self.feedback)
+        response = self.client.post(reverse('about'), self.feedback, REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(THROTTLE_PROXY_COUNT=1)
+    def test_clients_behind_one_proxy_have_their_own_bucket(self):
+        """Test that clients reaching the app through the same proxy are told apart"""
+        router = {'REMOTE_ADDR': '10.0.0.1'}
+        statuses = [
+            self.client.post(reverse('about'), self.feedback, HTTP_X_FORWARDED_FOR='1.2.3.4', **router).status_code
+            for _ in range(3)
+        ]
+        self.assertEqual(statuses, [302, 302, 429])
+        response = self.client.post(reverse('about'), self.feedback, HTTP_X_FORWARDED_FOR='5.6.7.8', **router)
+        self.assertEqual(response.status_code, 302)
+
+    def test_unlisted_methods_are_not_limited(self):
+        """Test that only the configured methods use up tokens"""
+        statuses = {self.client.get(reverse('about')).status_code for _ in range(5)}
+        self.assertEqual(statuses, {200})
+
+    def test_spins_are_limited_per_user(self):
+        """Test that each logged in user has their own spin bucket"""
+        self.client.login(username='testuser', password='testpass')
+        statuses = [self.client.get(reverse('spin_card')).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.client.login(username='otheruser', password='testpass')
+        self.assertEqual(self.client.get(reverse('spin_card')).status_code, 200)
+
+    def test_disabled(self):
+        """Test that nothing is limited when throttling is turned off"""
+        with self.settings(THROTTLE_ENABLED=False):
+            statuses = {self.client.post(reverse('about'), self.feedback).status_code for _ in range(4)}
+        self.assertEqual(statuses, {302})
@@ -0,0 +1,180 @@
+import tempfile
+import uuid
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from chaos_app import usage_stats
+from chaos_app.models import Card, DailyCardSpins, DailyUsage, RollupWatermark, SpinEvent
+from chaos_app.write_behind import get_buffer
+
+
+def spin(user, card, **fields):
+    return SpinEvent.objects.create(event_id=uuid.uuid4(), user=user, card=card, spun_at=timezone.now(), **fields)
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=True)
+class RecordSpinTest(TestCase):
+    """Test cases for logging spins through the write-behind buffer"""
+
+    def setUp(self):
+        """Set up a logged in user with one card and a temporary buffer directory"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(RECORD_SPINS=True, WRITE_BEHIND_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.card = Card.objects.create(user=self.user, title='Card', content='Content')
+        self.client.login(username='testuser', password='testpass')
+
+    def test_server_spin_is_logged(self):
+        """Test that a spin is buffered and inserted by the next flush"""
+        self.client.get(reverse('spin_card'))
+        self.assertFalse(SpinEvent.objects.exists())
+        self.assertEqual(get_buffer('spin_events').flush(), 1)
+        event = SpinEvent.objects.get()
+        self.assertEqual((event.user_id, event.card_id), (self.user.pk, self.card.pk))
+
+    def test_browser_spin_is_logged_without_queries(self):
+        """Test that a spin reported by the browser is answered with a 204 and no query"""
+        self.client.get(reverse('home'))  # Cache the user
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('record_spin'), {'card': self.card.pk})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(get_buffer('spin_events').flush(), 1)
+
+    def test_invalid_reports(self):
+        """Test that a report without a card id is refused and GET is not allowed"""
+        self.assertEqual(self.client.post(reverse('record_spin'), {'card': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('record_spin')).status_code, 405)
+        self.assertFalse(get_buffer('spin_events').pending())
+
+    @override_settings(RECORD_SPINS=False)
+    def test_recording_can_be_turned_off(self):
+        """Test that nothing is buffered with RECORD_SPINS off"""
+        self.client.get(reverse('spin_card'))
+        self.assertFalse(get_buffer('spin_events').pending())
+
+
+@override_settings(USAGE_ROLLUP_LAG=0)
+class RollupTest(TestCase):
+    """Test cases for the incremental usage rollup"""
+
+    def setUp(self):
+        """Set up a user with two cards and another user with one"""
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.other = User.objects.create_user(username='otheruser', password='testpass')
+        self.first = Card.objects.create(user=self.user, title='First', content='Content')
+        self.second = Card.objects.create(user=self.user, title='Second', content='Content')
+        self.theirs = Card.objects.create(user=self.other, title='Theirs', content='Content')
+        self.today = timezone.localdate()
+
+    def test_cards_are_counted_once(self):
+        """Test that each card is counted on its day, and not again by a later run"""
+        usage_stats.roll_up()
+        usage_stats.roll_up()
+        self.assertEqual(DailyUsage.objects.get(user=self.user, day=self.today).cards_created, 2)
+        Card.objects.create(user=self.user, title='Third', content='Content')
+        self.assertEqual(usage_stats.roll_up(), {'cards': 1, 'spins': 0})
+        self.assertEqual(DailyUsage.objects.get(user=self.user, day=self.today).cards_created, 3)
+
+    def test_spins_are_counted_per_user_and_card(self):
+        """Test that spins add to the user's day and the card's day, across runs"""
+        spin(self.user, self.first)
+        spin(self.user, self.first)
+        usage_stats.roll_up()
+        spin(self.user, self.first)
+        spin(self.user, self.second)
+        usage_stats.roll_up()
+        self.assertEqual(DailyUsage.objects.get(user=self.user, day=self.today).spins, 4)
+        spins = dict(DailyCardSpins.objects.values_list('card_id', 'spins'))
+        self.assertEqual(spins, {self.first.pk: 3, self.second.pk: 1})
+
+    def test_spins_of_other_users_cards_are_dropped(self):
+        """Test that a spin reported for someone else's card, or a deleted one, is not counted"""
+        spin(self.user, self.theirs)
+        deleted = Card.objects.create(user=self.user, title='Deleted', content='Content')
+        spin(self.user, deleted)
+        deleted.delete()
+        usage_stats.roll_up()
+        self.assertFalse(DailyCardSpins.objects.exists())
+        self.assertEqual(RollupWatermark.objects.get(name='spins').last_id, SpinEvent.objects.latest('id').pk)
+
+    @override_settings(USAGE_ROLLUP_LAG=60)
+    def test_recent_rows_wait_for_the_next_run(self):
+        """Test that rows newer than USAGE_ROLLUP_LAG are left for a later run"""
+        self.assertEqual(usage_stats.roll_up(), {'cards': 0, 'spins': 0})
+        Card.objects.filter(pk=self.first.pk).update(created_on=timezone.now() - timedelta(minutes=5))
+        # Counting stops at the first unsettled row, in id order
+        self.assertEqual(usage_stats.roll_up(), {'cards': 1, 'spins': 0})
+
+    def test_batches(self):
+        """Test that a rollup in small batches counts every row"""
+        self.assertEqual(usage_stats.roll_up(batch_size=2), {'cards': 3, 'spins': 0})
+        self.assertEqual(DailyUsage.objects.get(user=self.user).cards_created, 2)
+        self.assertEqual(DailyUsage.objects.get(user=self.other).cards_created, 1)
+
+    def test_prune_keeps_recent_and_uncounted_events(self):
+        """Test that only counted events older than the retention period are deleted"""
+        old = spin(self.user, self.first)
+        SpinEvent.objects.filter(pk=old.pk).update(recorded_on=timezone.now() - timedelta(days=31))
+        recent = spin(self.user, self.first)
+        self.assertEqual(usage_stats.prune_spin_events(), 0)
+        usage_stats.roll_up()
+        self.assertEqual(usage_stats.prune_spin_events(), 1)
+        self.assertEqual(list(SpinEvent.objects.values_list('pk', flat=True)), [recent.pk])
+
+    def test_command(self):
+        """Test that the rollup command reports the rows it counted"""
+        stdout = StringIO()
+        call_command('rollup_usage', stdout=stdout)
+        self.assertIn('cards: 3 rows, spins: 0 rows', stdout.getvalue())
+
+
+class UserStatsViewTest(TestCase):
+    """Test cases for the usage statistics page"""
+
+    def setUp(self):
+        """Set up a logged in user with rolled up usage"""
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.card = Card.objects.create(user=self.user, title='Favourite', content='Content')
+        self.client.login(username='testuser', password='testpass')
+        self.today = timezone.localdate()
+
+    def test_weekly_usage(self):
+        """Test that days are summed into weeks and older days are left out"""
+        monday = self.today - timedelta(days=self.today.weekday())
+        DailyUsage.objects.create(user=self.user, day=monday, cards_created=2, spins=5)
+        DailyUsage.objects.create(user=self.user, day=monday + timedelta(days=1), cards_created=1)
+        DailyUsage.objects.create(user=self.user, day=monday - timedelta(days=1), spins=4)
+        DailyUsage.objects.create(user=self.user, day=monday - timedelta(weeks=20), cards_created=9)
+        weeks = usage_stats.weekly_usage(self.user.pk, 12)
+        self.assertEqual(len(weeks), 12)
+        self.assertEqual(weeks[-1], {'week': monday, 'cards_created': 3, 'spins': 5})
+        self.assertEqual(weeks[-2]['spins'], 4)
+        self.assertEqual(sum(week['cards_created'] for week in weeks), 3)
+
+    def test_page_shows_most_spun_cards(self):
+        """Test that the page lists the most spun cards of the user only"""
+        other = User.objects.create_user(username='otheruser', password='testpass')
+        theirs = Card.objects.create(user=other, title='Not mine', content='Content')
+        DailyCardSpins.objects.create(card=self.card, user=self.user, day=self.today, spins=3)
+        DailyCardSpins.objects.create(card=theirs, user=other, day=self.today, spins=9)
+        response = self.client.get(reverse('user_stats'))
+        self.assertContains(response, 'Favourite <span class="text-muted">(3 spins)</span>', html=False)
+        self.assertNotContains(response, 'Not mine')
+
+    def test_deleted_cards_are_left_out(self):
+        """Test that the rollup rows of a deleted card do not show"""
+        DailyCardSpins.objects.create(card=self.card, user=self.user, day=self.today, spins=3)
+        self.card.delete()
+        self.assertEqual(usage_stats.top_cards(self.user.pk, 28), [])
+
+    def test_requires_login(self):
+        """Test that anonymous users are sent to log in"""
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('user_stats')).status_code, 302)
@@ -1,4 +1,4 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, AsyncClient
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.contrib.messages import get_messages
@@ -166,6 +166,53 @@ class UserCardsViewTest(TestCase):
         self.assertEqual(str(messages_list[0]), "Error creating card. Please try again.")
 
 
+class AsyncCardViewsTest(TestCase):
+    """Test cases for the spin and list views served through the ASGI handler"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.async_client = AsyncClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.cards = [
+            Card.objects.create(user=self.user, title=f"Card {i}", content="Test Content")
+            for i in range(11)
+        ]
+
+    async def test_async_spin_returns_users_card(self):
+        """Test that an async spin picks one of the user's cards"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('spin_card'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(response.context['random_card'], self.cards)
+
+    async def test_async_spin_requires_login(self):
+        """Test that the async spin view still requires authentication"""
+        response = await self.async_client.get(reverse('spin_card'))
+        self.assertRedirects(
+            response, f"/accounts/login/?next={reverse('spin_card')}",
+            fetch_redirect_response=False
+        )
+
+    async def test_async_user_cards_pagination(self):
+        """Test that the async list view paginates the user's cards"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('user_cards'), {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_paginated'])
+        self.assertEqual(len(response.context['cards']), 1)
+        self.assertContains(response, "Card 0")
+
+    async def test_async_user_cards_post_valid_form(self):
+        """Test creating a card through the async list view"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(reverse('user_cards'), {
+            'title': 'Async Card',
+            'content': 'Test Content'
+        })
+        self.assertRedirects(response, reverse('user_cards'), fetch_redirect_response=False)
+        self.assertTrue(await Card.objects.filter(title='Async Card').aexists())
+
+
 class EditCardViewTest(TestCase):
     """Test cases for the edit_card_view"""
 
@@ -342,3 +389,35 @@ class DeleteCardViewTest(TestCase):
         self.client.login(username='testuser', password='testpass')
         response = self.client.delete(reverse('delete-card', args=[self.card.id]))
         self.assertRedirects(response, reverse('user_cards'))
+
+
+class BaseTemplateFragmentTest(TestCase):
+    """Test cases for the cached nav and footer fragments in base.html"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+
+    def test_nav_varies_with_login_state(self):
+        """Test that anonymous and signed in users get different nav fragments"""
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Register')
+        self.assertNotContains(response, 'My Cards')
+        self.client.login(username='testuser', password='testpass')
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'My Cards')
+        self.assertNotContains(response, 'Register')
+
+    def test_nav_active_link_varies_with_page(self):
+        """Test that the active nav link follows the current page"""
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, f'active" aria-current="page"\n                                href="{reverse("home")}"')
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, f'active" aria-current="page"\n                                href="{reverse("about")}"')
+
+    def test_footer_rendered(self):
+        """Test that the cached footer is part of every page"""
+        for url_name in ('home', 'about'):
+            response = self.client.get(reverse(url_name))
+            self.assertContains(response, '© Chaos Cards 2025')
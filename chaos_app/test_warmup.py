@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+from django.template import engines
+from chaos_app.warmup import warm_up, template_names
+
+
+class WarmUpTest(SimpleTestCase):
+    """Test cases for the worker warm-up hook"""
+
+    def test_warm_up_returns_elapsed_time(self):
+        """Test that warm-up runs and reports the time taken"""
+        self.assertGreaterEqual(warm_up(), 0)
+
+    def test_warm_up_fills_template_cache(self):
+        """Test that warm-up compiles templates into the cached loader"""
+        warm_up()
+        loader = engines['django'].engine.template_loaders[0]
+        cached_names = {key.split('-')[0] for key in loader.get_template_cache}
+        for template_name in ('base.html', 'chaos_app/home.html', 'account/login.html'):
+            self.assertIn(template_name, cached_names)
+
+    def test_template_names_include_local_apps(self):
+        """Test that project and local app templates are discovered"""
+        names = set(template_names())
+        self.assertIn('chaos_app/user_cards.html', names)
+        self.assertIn('about/about.html', names)
+        self.assertIn('allauth/layouts/base.html', names)
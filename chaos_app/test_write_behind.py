@@ -0,0 +1,100 @@
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from about.models import CollaborateRequest
+from chaos_app.write_behind import WriteBehindBuffer, get_buffer
+
+
+def record(n):
+    return {'name': f'Person {n}', 'email': f'p{n}@example.com', 'message': 'Hello',
+            'submission_id': f'00000000-0000-0000-0000-{n:012d}'}
+
+
+class WriteBehindBufferTest(TestCase):
+    """Test cases for the write-behind buffer"""
+
+    def setUp(self):
+        """Set up a buffer in a temporary directory"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.buffer = WriteBehindBuffer('requests', 'about.CollaborateRequest', self.directory.name)
+
+    def test_append_does_not_touch_the_database(self):
+        """Test that appending a record runs no queries"""
+        with self.assertNumQueries(0):
+            self.buffer.append(record(1))
+        self.assertTrue(self.buffer.pending())
+
+    def test_flush_inserts_in_batches(self):
+        """Test that buffered records are inserted with batched bulk_create"""
+        for n in range(5):
+            self.buffer.append(record(n))
+        with self.assertNumQueries(3):
+            self.assertEqual(self.buffer.flush(batch_size=2), 5)
+        self.assertEqual(CollaborateRequest.objects.count(), 5)
+        self.assertFalse(self.buffer.pending())
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_repeated_flush_does_not_duplicate(self):
+        """Test that a segment left by an interrupted flush is not inserted twice"""
+        for n in range(3):
+            self.buffer.append(record(n))
+        segment = self.buffer.rotate()
+        # Simulate a flush that inserted the rows but stopped before deleting the segment
+        CollaborateRequest.objects.bulk_create(
+            CollaborateRequest(**values) for values in self.buffer.read_segment(segment)
+        )
+        self.buffer.append(record(3))
+        self.assertEqual(self.buffer.flush(), 4)
+        self.assertEqual(CollaborateRequest.objects.count(), 4)
+
+    def test_torn_line_is_skipped(self):
+        """Test that a partly written line does not stop the flush"""
+        self.buffer.append(record(1))
+        with open(self.buffer.active_path, 'ab') as active:
+            active.write(b'{"name": "Pers')
+        with self.assertLogs('chaos_app.write_behind', 'WARNING'):
+            self.assertEqual(self.buffer.flush(), 1)
+
+    def test_records_appended_after_rotation_start_a_new_file(self):
+        """Test that appends after a rotation are kept for the next flush"""
+        self.buffer.append(record(1))
+        segment = self.buffer.rotate()
+        self.buffer.append(record(2))
+        self.assertEqual(len(list(self.buffer.read_segment(segment))), 1)
+        self.assertTrue(os.path.exists(self.buffer.active_path))
+
+
+class CollaborateWriteBehindTest(TestCase):
+    """Test cases for the about form with write-behind turned on"""
+
+    def setUp(self):
+        """Set up a temporary buffer directory"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(COLLABORATE_WRITE_BEHIND=True, WRITE_BEHIND_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.data = {'name': 'John Doe', 'email': 'john@example.com', 'message': 'Let us work together'}
+
+    def test_post_is_buffered_without_queries(self):
+        """Test that a valid submission is answered without touching the database"""
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('about'), self.data)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(CollaborateRequest.objects.exists())
+        self.assertTrue(get_buffer('collaborate_requests').pending())
+
+    def test_flush_command_inserts_submissions(self):
+        """Test that the flush command saves the buffered submissions"""
+        self.client.post(reverse('about'), self.data)
+        self.client.post(reverse('about'), {**self.data, 'name': 'Jane Doe'})
+        stdout = StringIO()
+        call_command('flush_write_behind', stdout=stdout)
+        self.assertIn('collaborate_requests: flushed 2 records', stdout.getvalue())
+        self.assertEqual(
+            sorted(CollaborateRequest.objects.values_list('name', flat=True)), ['Jane Doe', 'John Doe'],
+        )
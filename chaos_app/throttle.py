@@ -0,0 +1,133 @@
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+# Request throttling
+#
+# Token buckets kept in the default cache, one per URL name and client. A
+# bucket holds up to ``burst`` tokens and refills at ``rate``; each request
+# takes a token and is refused with a 429 when none is left. Clients are
+# keyed by user id when logged in and by IP address otherwise.
+#
+# With Redis every worker shares the buckets and a Lua script updates them
+# atomically. Other caches live in process memory, so a lock is enough.
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+# KEYS[1] bucket; ARGV burst, tokens per second, now, expiry in seconds.
+# Returns {allowed (0 or 1), tokens left}; tokens as a string since Lua
+# numbers are truncated to integers on the way out.
+TAKE_TOKEN_SCRIPT = '''
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return {allowed, tostring(tokens)}
+'''
+
+_lock = threading.Lock()
+_script = None
+
+
+def parse_rate(rate):
+    """Tokens per second for a rate such as '30/m', '5/hour' or '1/s'."""
+    count, _, period = rate.partition('/')
+    try:
+        return int(count) / PERIODS[period.strip()[:1].lower()]
+    except (KeyError, ValueError):
+        raise ValueError(f'Invalid throttle rate {rate!r}; expected "<count>/<s|m|h|d>".') from None
+
+
+def client_ip(request):
+    """
+    The client's address. Behind THROTTLE_PROXY_COUNT trusted proxies (e.g.
+    1 for the Heroku router) it is read from X-Forwarded-For, counting from
+    the right so a client cannot pick its own bucket.
+    """
+    proxies = settings.THROTTLE_PROXY_COUNT
+    if proxies:
+        forwarded = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        forwarded = [address for address in forwarded if address]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def _take_redis(key, burst, rate, now, expiry):
+    global _script
+    cache = caches['default']
+    key = cache.make_and_validate_key(key)
+    client = cache._cache.get_client(key, write=True)
+    if _script is None:
+        _script = client.register_script(TAKE_TOKEN_SCRIPT)
+    allowed, tokens = _script(keys=[key], args=[burst, rate, now, expiry], client=client)
+    return bool(allowed), float(tokens)
+
+
+def _take_local(key, burst, rate, now, expiry):
+    cache = caches['default']
+    with _lock:
+        tokens, updated = cache.get(key) or (burst, now)
+        tokens = min(burst, tokens + max(0, now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        cache.set(key, (tokens, now), expiry)
+    return allowed, tokens
+
+
+def take_token(key, burst, rate, now=None):
+    """
+    Take a token from the bucket ``key``. Returns (allowed, seconds until the
+    next token) where the wait is 0 when the request is allowed.
+    """
+    now = time.time() if now is None else now
+    # A bucket left alone this long is full again, so it can expire
+    expiry = max(1, math.ceil(burst / rate))
+    take = _take_redis if isinstance(caches['default'], RedisCache) else _take_local
+    allowed, tokens = take(f'throttle:{key}', burst, rate, now, expiry)
+    return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+def limit_for(request):
+    """The THROTTLE_RATES entry for the request's URL name and method, or None."""
+    match = request.resolver_match
+    limit = settings.THROTTLE_RATES.get(match.url_name) if match else None
+    if limit is None or request.method not in limit.get('methods', (request.method,)):
+        return None
+    return limit
+
+
+def check(request):
+    """
+    Take a token for the request. Returns None when it may go ahead, or the
+    number of seconds the client should wait before trying again.
+    """
+    limit = limit_for(request)
+    if limit is None:
+        return None
+    rate = parse_rate(limit['rate'])
+    allowed, retry_after = take_token(
+        f'{request.resolver_match.url_name}:{client_key(request)}', limit.get('burst', 1), rate,
+    )
+    return None if allowed else retry_after
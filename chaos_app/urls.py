@@ -5,7 +5,17 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('my-cards/', views.user_cards_view, name='user_cards'),
+    path('my-cards/deck.json', views.deck_json_view, name='deck_json'),
     path('my-cards/edit_card/<int:card_id>/', views.edit_card_view, name='edit_card'),
     path('my-cards/delete-card/<int:card_id>/', views.delete_card_view, name='delete-card'),
+    path('my-cards/share/', views.share_deck_view, name='share_deck'),
+    path('my-cards/stats/', views.user_stats_view, name='user_stats'),
+    path('decks/<slug:slug>/', views.shared_deck_view, name='shared_deck'),
+    path('decks/<slug:slug>/v<int:version>/', views.shared_deck_version_view, name='shared_deck_version'),
     path('spin/', views.random_card_view, name='spin_card'),
+    path('spin/everyone/', views.global_spin_view, name='global_spin'),
+    path('spin/record/', views.record_spin_view, name='record_spin'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('sw.js', views.service_worker_view, name='service_worker'),
+    path('manifest.webmanifest', views.manifest_view, name='manifest'),
 ]
@@ -0,0 +1,186 @@
+import uuid
+from collections import Counter
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import Card, DailyCardSpins, DailyUsage, RollupWatermark, SpinEvent
+from .write_behind import get_buffer
+
+# Usage statistics
+#
+# The stats page shows a user the cards they created and the spins they made
+# per week, and which of their cards came up most. It only reads two small
+# rollup tables, one row per user per day (DailyUsage) and per card per day
+# (DailyCardSpins), over a fixed window, so it costs the same however long
+# the user's history is.
+#
+# Spins of a user's own deck (on the server, or reported by the browser) are
+# logged as SpinEvent rows through the spin_events write-behind buffer: no
+# insert during the spin, and batched inserts when it is flushed.
+#
+# The rollup (manage.py rollup_usage) adds new rows to the tables
+# incrementally. Each source (cards and spin events) has a watermark, the
+# highest id counted so far; a run counts the rows after it in id order and
+# moves it on, in the same transaction as the counts, so every row is counted
+# exactly once. Rows newer than USAGE_ROLLUP_LAG are left for the next run:
+# ids are handed out before commit, so a lower id may still show up shortly
+# after a higher one. Cards deleted before they are counted are not counted.
+#
+# Days are dates in TIME_ZONE.
+
+
+def record_spin(user_id, card_id):
+    """Log a spin of one of the user's cards (when RECORD_SPINS is on)."""
+    if not settings.RECORD_SPINS:
+        return
+    # Analytics: a crash may lose the last few, so skip the fsync()
+    get_buffer('spin_events').append({
+        'event_id': uuid.uuid4(),
+        'user_id': user_id,
+        'card_id': card_id,
+        'spun_at': timezone.now(),
+    }, fsync=False)
+
+
+async def arecord_spin(user_id, card_id):
+    """
+    See record_spin(). The append runs in a worker thread: it may wait on the
+    buffer's lock while a flush rotates the file, which must not hold up the
+    event loop.
+    """
+    if settings.RECORD_SPINS:
+        await sync_to_async(record_spin, thread_sensitive=False)(user_id, card_id)
+
+
+# Rollup
+
+
+def settled_rows(queryset, time_field, fields, last_id, batch_size):
+    """
+    Up to ``batch_size`` rows after ``last_id`` in id order, as dicts,
+    stopping before the first row newer than USAGE_ROLLUP_LAG.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.USAGE_ROLLUP_LAG)
+    rows = []
+    for row in queryset.filter(pk__gt=last_id).order_by('pk').values('id', time_field, *fields)[:batch_size]:
+        if row[time_field] >= cutoff:
+            break
+        rows.append(row)
+    return rows
+
+
+def add_counts(model, key_fields, counts, column):
+    """
+    Add ``counts`` ({key values: n}) to ``column`` of the rows of ``model``
+    with those keys, creating the missing rows.
+    """
+    existing = model.objects.filter(**{
+        f'{field}__in': {key[n] for key in counts} for n, field in enumerate(key_fields)
+    })
+    rows = {tuple(getattr(row, field) for field in key_fields): row for row in existing}
+    changed, created = [], []
+    for key, count in counts.items():
+        row = rows.get(key)
+        if row is None:
+            created.append(model(**dict(zip(key_fields, key)), **{column: count}))
+        else:
+            setattr(row, column, getattr(row, column) + count)
+            changed.append(row)
+    model.objects.bulk_update(changed, [column], batch_size=500)
+    model.objects.bulk_create(created, batch_size=500)
+
+
+def count_cards(rows):
+    counts = Counter((row['user_id'], timezone.localdate(row['created_on'])) for row in rows)
+    add_counts(DailyUsage, ('user_id', 'day'), counts, 'cards_created')
+
+
+def count_spins(rows):
+    # Spins of cards since deleted, or reported for another user's card, are dropped
+    owners = dict(Card.objects.filter(pk__in={row['card_id'] for row in rows}).values_list('pk', 'user_id'))
+    rows = [row for row in rows if owners.get(row['card_id']) == row['user_id']]
+    days = [(row, timezone.localdate(row['spun_at'])) for row in rows]
+    add_counts(DailyUsage, ('user_id', 'day'), Counter((row['user_id'], day) for row, day in days), 'spins')
+    add_counts(
+        DailyCardSpins, ('card_id', 'user_id', 'day'),
+        Counter((row['card_id'], row['user_id'], day) for row, day in days), 'spins',
+    )
+
+
+# Watermark name: (source rows, settling time field, other fields read, counting function)
+ROLLUPS = {
+    'cards': (Card.objects.all, 'created_on', ('user_id',), count_cards),
+    'spins': (SpinEvent.objects.all, 'recorded_on', ('user_id', 'card_id', 'spun_at'), count_spins),
+}
+
+
+def roll_up_batch(name, batch_size):
+    """Count the next batch of a rollup's source rows. Returns the number of rows counted."""
+    source, time_field, fields, count = ROLLUPS[name]
+    RollupWatermark.objects.get_or_create(name=name)
+    with transaction.atomic():
+        # Locked until the counts are written: one run at a time
+        watermark = RollupWatermark.objects.select_for_update().get(name=name)
+        rows = settled_rows(source(), time_field, fields, watermark.last_id, batch_size)
+        if rows:
+            count(rows)
+            watermark.last_id = rows[-1]['id']
+            watermark.save()
+    return len(rows)
+
+
+def roll_up(batch_size=5000):
+    """Count every settled row not counted yet. Returns {rollup name: rows counted}."""
+    totals = {}
+    for name in ROLLUPS:
+        totals[name] = 0
+        while True:
+            counted = roll_up_batch(name, batch_size)
+            totals[name] += counted
+            if counted < batch_size:
+                break
+    return totals
+
+
+def prune_spin_events():
+    """Delete counted spin events older than SPIN_EVENT_RETENTION_DAYS. Returns the number deleted."""
+    last_id = RollupWatermark.objects.filter(name='spins').values_list('last_id', flat=True).first() or 0
+    cutoff = timezone.now() - timedelta(days=settings.SPIN_EVENT_RETENTION_DAYS)
+    deleted, _ = SpinEvent.objects.filter(pk__lte=last_id, recorded_on__lt=cutoff).delete()
+    return deleted
+
+
+# Reading the rollups
+
+
+def weekly_usage(user_id, weeks):
+    """
+    Cards created and spins of the last ``weeks`` weeks (starting on Monday),
+    oldest first, as dicts with week, cards_created and spins.
+    """
+    today = timezone.localdate()
+    first = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+    totals = {first + timedelta(weeks=n): {'cards_created': 0, 'spins': 0} for n in range(weeks)}
+    days = DailyUsage.objects.filter(user_id=user_id, day__gte=first).values_list('day', 'cards_created', 'spins')
+    for day, cards_created, spins in days:
+        week = totals.get(day - timedelta(days=day.weekday()))
+        if week is not None:
+            week['cards_created'] += cards_created
+            week['spins'] += spins
+    return [{'week': week, **counts} for week, counts in totals.items()]
+
+
+def top_cards(user_id, days, limit=10):
+    """The user's cards that came up most in the last ``days`` days, with their spins."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        DailyCardSpins.objects
+        # The join drops the rows of deleted cards
+        .filter(user_id=user_id, day__gte=since, card__user_id=user_id)
+        .values('card_id', 'card__title')
+        .annotate(total=Sum('spins'))
+        .order_by('-total', 'card__title')[:limit]
+    )
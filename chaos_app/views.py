@@ -1,10 +1,93 @@
+import hashlib
+import json
 import random
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.templatetags.static import static
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from .models import Card
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound, HttpResponseNotModified
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_POST, require_safe
+from .models import Card, SharedDeck
 from .forms import CardForm
+from . import deck_cache, global_spin, metrics, shared_decks, tags, usage_stats
+from .conditional import anot_modified, etag_matches, page_etag, set_validators
+
+# Files cached by the service worker when it is installed, so every page
+# renders offline (Bootstrap as linked from templates/base.html)
+PWA_PRECACHE_STATIC = (
+    'css/style.css',
+    'js/spin.js',
+    'js/edit_card.js',
+    'images/default-image.webp',
+    'images/apple-touch-icon.png',
+    'images/favicon-32x32.png',
+    'images/favicon-16x16.png',
+)
+PWA_PRECACHE_CDN = (
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.6/dist/css/bootstrap.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.6/dist/js/bootstrap.bundle.min.js',
+)
+# Card images kept by the service worker before the oldest are dropped
+PWA_MAX_IMAGES = 200
+
+# Helpers
+
+async def _aget_page(queryset, page_number, per_page=10):
+    """
+    Async equivalent of Paginator.get_page(). The count and the page rows are
+    fetched with the async ORM so the template never hits the database.
+    """
+    paginator = Paginator(queryset, per_page)
+    # Prime the cached count so page validation does not query synchronously
+    paginator.count = await queryset.acount()
+    page_obj = paginator.get_page(page_number)
+    page_obj.object_list = [obj async for obj in page_obj.object_list]
+    return page_obj, paginator
+
+async def _arandom_card(user):
+    """
+    A random card from the user's deck, or None if it is empty. With the deck
+    cache the card is picked from the cached ids and only that row is read;
+    otherwise a random offset into the user's cards is loaded.
+    """
+    user_cards = Card.objects.filter(user=user)
+    if deck_cache.enabled():
+        card_ids = await deck_cache.adeck_ids(user.pk)
+        if not card_ids:
+            return None
+        card = await user_cards.filter(pk=random.choice(card_ids)).afirst()
+        if card is not None:
+            return card
+        # Deleted since the ids were cached: fall back to the database
+
+    card_count = await user_cards.acount()
+    if not card_count:
+        return None
+    index = random.randrange(card_count)
+    return await user_cards[index:index + 1].afirst()
+
+async def _afirst_page(user):
+    """The first page of the user's cards, served from the deck cache."""
+    count, cards = await deck_cache.afirst_page(user.pk)
+    paginator = Paginator(Card.objects.filter(user=user).order_by('-created_on'), deck_cache.PAGE_SIZE)
+    paginator.count = count
+    page_obj = paginator.page(1)
+    page_obj.object_list = cards
+    return page_obj, paginator
+
+def _can_view_metrics(request):
+    """Staff users, or a scraper presenting the METRICS_TOKEN bearer token."""
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if token and constant_time_compare(authorization, f'Bearer {token}'):
+        return True
+    return request.user.is_staff
 
 # Views
 
@@ -27,46 +110,93 @@ def home(request):
 # Random Card Generator View
 
 @login_required
-def random_card_view(request):
+async def random_card_view(request):
     """
     Display a random card from the user's collection.
     If the user has no cards, display a message indicating that.
     If the user has cards, select one at random and display it.
+    Only the chosen row is loaded, rather than the whole deck (see
+    _arandom_card).
+    One or more ?tag= parameters limit the spin to the cards carrying all
+    of those tags, picked through the tag index (see chaos_app/tags.py).
 
     **Context**
         random_card (Card): The randomly selected card instance, or None if no cards exist.
         spin_attempted: A boolean flag indicating whether a spin was attempted (used to determine home page display).
+        spin_tags (list): The tags the spin was limited to, if any.
 
     **Template**
         chaos_app/home.html
     """
-    user_cards = Card.objects.filter(user=request.user)
-    if user_cards.exists():
-        # Select a random card if cards exist
-        random_card = random.choice(user_cards)
-        # Set a flag to indicate that a spin was attempted
-        spin_attempted = True
+    user = await request.auser()
+    spin_tags = tags.spin_tags(request.GET.getlist('tag'))
+    # None if no cards exist (or none carry every tag)
+    if spin_tags:
+        random_card = await tags.arandom_tagged_card(user.pk, spin_tags)
     else:
-        # Set to None if no cards exist
-        random_card = None
-        # Still set the flag to indicate a spin was attempted
-        spin_attempted = True
+        random_card = await _arandom_card(user)
+    if random_card is not None:
+        # Appended to a local file from a worker thread, without a query (see chaos_app/usage_stats.py)
+        await usage_stats.arecord_spin(user.pk, random_card.pk)
+    # Set a flag to indicate that a spin was attempted
+    spin_attempted = True
 
     return render(request, 'chaos_app/home.html', {
         'random_card': random_card,
         # Pass the flag to the template
         'spin_attempted': spin_attempted,
+        'spin_tags': spin_tags,
+    })
+
+@login_required
+async def global_spin_view(request):
+    """
+    Display a random card from every shared deck (see shared_decks.py).
+    The card is picked by probing random ids of the public cards, which
+    stays cheap however many there are (see chaos_app/global_spin.py).
+
+    **Context**
+        random_card (Card): The randomly selected public card, or None if no deck is shared.
+        spin_attempted: A boolean flag indicating whether a spin was attempted (used to determine home page display).
+        global_spin: A boolean flag indicating the card may come from another user's deck.
+
+    **Template**
+        chaos_app/home.html
+    """
+    random_card = await sync_to_async(global_spin.random_public_card)()
+
+    return render(request, 'chaos_app/home.html', {
+        'random_card': random_card,
+        'spin_attempted': True,
+        'global_spin': True,
     })
 
+@login_required
+@require_POST
+def record_spin_view(request):
+    """
+    Log a spin made in the browser (js/spin.js) for the user's stats. The
+    card is not looked up: the rollup drops spins of other users' cards.
+    Answers 204 without a query once the user is cached.
+    """
+    try:
+        card_id = int(request.POST.get('card', ''))
+    except ValueError:
+        return HttpResponse(status=400)
+    usage_stats.record_spin(request.user.pk, card_id)
+    return HttpResponse(status=204)
+
 # Card list view
 
 @login_required
-def user_cards_view(request):
+async def user_cards_view(request):
     """
     Display a list of cards created by the logged-in user.
     The cards are ordered by the date they were created, in descending order.
     Page is paginated. If >= 10 cards exist, show pagination controls.
     If the user submits a form to create a new card, it is processed, saved and displayed.
+    GET responses carry an ETag, and a browser whose copy is current gets a
+    304 (never while flash messages are waiting to be shown).
 
     **Context**
         form (CardForm): The form for creating a new card.
@@ -77,12 +207,25 @@ def user_cards_view(request):
     **Template**
         chaos_app/user_cards.html
     """
+    user = await request.auser()
+    page_number = request.GET.get('page')
+    etag = None
+    if request.method != 'POST' and deck_cache.enabled():
+        # The deck version changes with any card: a 304 without a query
+        etag = page_etag(request, user, 'cards', await deck_cache.adeck_version(user.pk))
+        response = await anot_modified(request, etag)
+        if response is not None:
+            return response
+
     if request.method == 'POST':
         form = CardForm(request.POST, request.FILES)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             card = form.save(commit=False)
-            card.user = request.user
-            card.save()
+            card.user = user
+            # Saving uploads the image to Cloudinary, off the event loop
+            await card.asave()
+            if form.cleaned_data['tags']:
+                await sync_to_async(tags.set_card_tags)(card, form.cleaned_data['tags'])
             messages.add_message(request, messages.SUCCESS,
             'Card created successfully!')
             return redirect('user_cards')
@@ -92,17 +235,59 @@ def user_cards_view(request):
     else:
         form = CardForm()
 
-    user_cards = Card.objects.filter(user=request.user).order_by('-created_on')
-    paginator = Paginator(user_cards, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if deck_cache.enabled() and page_number in (None, '', '1'):
+        # The first page is the one most visited: serve it from the deck cache
+        page_obj, paginator = await _afirst_page(user)
+    else:
+        user_cards = Card.objects.filter(user=user).order_by('-created_on').prefetch_related('tags')
+        page_obj, paginator = await _aget_page(user_cards, page_number)
+
+    if request.method != 'POST' and etag is None:
+        # Without the deck cache, validate what the page shows: the deck
+        # size and the cards on it, with their tags. A 304 still skips rendering
+        etag = page_etag(request, user, 'cards', paginator.count, *(
+            (card.pk, card.updated_on.isoformat(), *(tag.name for tag in card.tags.all()))
+            for card in page_obj.object_list
+        ))
+        response = await anot_modified(request, etag)
+        if response is not None:
+            return response
 
-    return render(request, 'chaos_app/user_cards.html', {
+    response = render(request, 'chaos_app/user_cards.html', {
         'form': form,
         'cards': page_obj,
         'is_paginated': paginator.num_pages > 1,
         'page_obj': page_obj,
     })
+    if etag is not None:
+        set_validators(response, etag)
+    return response
+
+# Deck payload view
+
+@login_required
+async def deck_json_view(request):
+    """
+    Return the logged-in user's deck as compact JSON, which static/js/spin.js
+    downloads once and spins in the browser. The ETag follows the deck
+    version (or the payload itself when the deck cache is off), so the
+    browser revalidates with a cheap 304 until a card is added, edited or
+    deleted. With the deck cache a 304 needs no database query at all.
+    """
+    user = await request.auser()
+    if deck_cache.enabled():
+        version = await deck_cache.adeck_version(user.pk)
+        etag = deck_cache.deck_etag(user.pk, version)
+        payload = None if etag_matches(request, etag) else await deck_cache.apayload(user.pk, version)
+    else:
+        payload = await deck_cache.abuild_payload(user.pk)
+        etag = deck_cache.content_etag(payload)
+        if etag_matches(request, etag):
+            payload = None
+
+    response = HttpResponseNotModified() if payload is None else HttpResponse(payload, content_type='application/json')
+    # Per user, and always revalidated so a changed deck is seen straight away
+    return set_validators(response, etag)
 
 @login_required
 def edit_card_view(request, card_id):
@@ -124,6 +309,7 @@ def edit_card_view(request, card_id):
             card = form.save(commit=False)
             card.user = request.user
             card.save()
+            tags.set_card_tags(card, form.cleaned_data['tags'])
             messages.add_message(request, messages.SUCCESS,
             "Card updated successfully!")
             return redirect('user_cards')
@@ -153,3 +339,157 @@ def delete_card_view(request, card_id):
         messages.add_message(request, messages.ERROR,
         "Error deleting card. Card not found.")
     return redirect("user_cards")
+
+# Usage statistics view
+
+@login_required
+def user_stats_view(request):
+    """
+    Display the logged-in user's cards created and spins per week, and the
+    cards that came up most. Reads only the daily rollups over a fixed window
+    (see chaos_app/usage_stats.py), so the cost does not grow with history.
+
+    **Context**
+        weeks (list): Dicts of week (the Monday), cards_created and spins, oldest first.
+        busiest_week (int): The highest weekly count, to scale the bars.
+        top_cards (list): Dicts of card_id, card__title and total spins, most spun first.
+        top_cards_days (int): The number of days the top cards are counted over.
+
+    **Template**
+        chaos_app/user_stats.html
+    """
+    weeks = usage_stats.weekly_usage(request.user.pk, settings.USAGE_STATS_WEEKS)
+    return render(request, 'chaos_app/user_stats.html', {
+        'weeks': weeks,
+        'busiest_week': max(max(week['cards_created'], week['spins']) for week in weeks) or 1,
+        'top_cards': usage_stats.top_cards(request.user.pk, settings.USAGE_TOP_CARDS_DAYS),
+        'top_cards_days': settings.USAGE_TOP_CARDS_DAYS,
+    })
+
+# Shared deck views
+
+@login_required
+def share_deck_view(request):
+    """
+    Publish the logged-in user's deck at a public, read-only link, or stop
+    sharing it.
+
+    **Context**
+        shared_deck (SharedDeck): The user's shared deck, or None if never shared.
+        share_url (str): The public link of the deck.
+
+    **Template**
+        chaos_app/share_deck.html
+    """
+    shared_deck = SharedDeck.objects.filter(user=request.user).first()
+    if request.method == 'POST':
+        publish = request.POST.get('action') == 'publish'
+        if shared_deck is None:
+            shared_deck = SharedDeck.objects.create(user=request.user, published=publish)
+        elif shared_deck.published != publish:
+            # Drop the pointer and the page of the version being left behind
+            shared_decks.forget(shared_deck)
+            shared_deck.published = publish
+            # A new version, so no cache holds a page of it
+            shared_deck.version += 1
+            shared_deck.save(update_fields=['published', 'version'])
+        messages.add_message(request, messages.SUCCESS,
+        'Your deck is now public.' if publish else 'Your deck is no longer shared.')
+        return redirect('share_deck')
+
+    return render(request, 'chaos_app/share_deck.html', {
+        'shared_deck': shared_deck,
+        'share_url': request.build_absolute_uri(reverse('shared_deck', args=[shared_deck.slug])) if shared_deck else '',
+    })
+
+@require_safe
+def shared_deck_view(request, slug):
+    """
+    The public link of a shared deck: a redirect to the page of its current
+    version, cached briefly by browsers and CDNs (see chaos_app/shared_decks.py).
+    Never reads the session, so one cached response serves everyone.
+    """
+    version = shared_decks.current_version(slug)
+    max_age = settings.SHARED_DECK_POINTER_MAX_AGE
+    if not version:
+        response = HttpResponseNotFound('This deck is not shared.', content_type='text/plain')
+    else:
+        response = redirect(shared_decks.page_url(slug, version))
+    return shared_decks.set_public_cache(response, slug, max_age, max_age)
+
+@require_safe
+def shared_deck_version_view(request, slug, version):
+    """
+    One version of a shared deck. A version never changes, so the page is
+    cached for SHARED_DECK_MAX_AGE by CDNs and by the app, and is served
+    without a query once warm. An outdated version redirects to the current
+    one.
+
+    **Template**
+        chaos_app/shared_deck.html
+    """
+    html, current = shared_decks.page(slug, version)
+    max_age = settings.SHARED_DECK_POINTER_MAX_AGE
+    if html is None:
+        if not current:
+            response = HttpResponseNotFound('This deck is not shared.', content_type='text/plain')
+        else:
+            response = redirect(shared_decks.page_url(slug, current))
+        return shared_decks.set_public_cache(response, slug, max_age, max_age)
+
+    etag = f'"shared-{slug}-{version}"'
+    response = HttpResponseNotModified() if etag_matches(request, etag) else HttpResponse(html)
+    response.headers['ETag'] = etag
+    return shared_decks.set_public_cache(
+        response, slug, settings.SHARED_DECK_BROWSER_MAX_AGE, settings.SHARED_DECK_MAX_AGE,
+    )
+
+# Progressive web app views
+
+def service_worker_view(request):
+    """
+    Serve the service worker from the site root, so that it may handle every
+    page (a worker only controls URLs below its own). Its cache version is
+    derived from the precached URLs, which change with every static file
+    hash, so each deploy replaces the cached files.
+
+    **Template**
+        chaos_app/pwa/sw.js
+    """
+    precache = [static(name) for name in PWA_PRECACHE_STATIC] + list(PWA_PRECACHE_CDN)
+    # Rendered without the request: the same for everyone, no session needed
+    response = HttpResponse(render_to_string('chaos_app/pwa/sw.js', {
+        'version': hashlib.sha1('\n'.join(precache).encode()).hexdigest()[:12],
+        'precache': json.dumps(precache),
+        'static_url': settings.STATIC_URL,
+        'max_images': PWA_MAX_IMAGES,
+    }), content_type='application/javascript')
+    # Browsers check for a new worker on every visit
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def manifest_view(request):
+    """
+    Serve the web app manifest, which lets the site be installed.
+
+    **Template**
+        chaos_app/pwa/manifest.webmanifest
+    """
+    response = HttpResponse(
+        render_to_string('chaos_app/pwa/manifest.webmanifest'), content_type='application/manifest+json',
+    )
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+# Metrics view
+
+def metrics_view(request):
+    """
+    Expose application metrics in the Prometheus text format.
+    Only available to staff users and to scrapers sending
+    ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    if not _can_view_metrics(request):
+        return HttpResponseForbidden()
+    body, content_type = metrics.export()
+    return HttpResponse(body, content_type=content_type)
@@ -0,0 +1,136 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+# Apps whose own templates folders are compiled on warm-up, in addition to
+# the project templates folder (which holds the allauth overrides)
+WARM_APPS = ['chaos_app', 'about']
+
+# Pages rendered anonymously by warm_caches(), which also fills the navbar and
+# footer {% cache %} fragments
+WARM_PATHS = ['/', '/about/', '/accounts/login/']
+
+
+def template_names():
+    """Yield the name of every template in the project and local app folders."""
+    directories = [Path(directory) for directory in settings.TEMPLATES[0]['DIRS']]
+    directories += [Path(apps.get_app_config(label).path) / 'templates' for label in WARM_APPS]
+    for directory in directories:
+        for path in sorted(directory.rglob('*.html')):
+            yield path.relative_to(directory).as_posix()
+
+
+def warm_up():
+    """
+    Prime the per-process caches of a freshly started worker so its first
+    request doesn't pay for them: the URL resolver (which imports every view
+    module) and the compiled templates held by the cached template loader.
+    Returns the time taken in seconds.
+    """
+    started = time.perf_counter()
+    get_resolver().url_patterns
+    compiled = 0
+    for template_name in template_names():
+        try:
+            get_template(template_name)
+        except (TemplateDoesNotExist, TemplateSyntaxError):
+            # e.g. overrides for allauth features that are not installed
+            logger.debug('Skipped warming template %s', template_name)
+        else:
+            compiled += 1
+    elapsed = time.perf_counter() - started
+    logger.info('Warm-up compiled %d templates in %.3fs', compiled, elapsed)
+    return elapsed
+
+
+def render_page(application, path):
+    """Serve a GET for ``path`` in-process and return the response status."""
+    host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host), 'localhost')
+    environ = {'PATH_INFO': path, 'HTTP_HOST': host}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return statuses[0]
+
+
+def active_users(limit):
+    """The ``limit`` users who logged in most recently."""
+    from django.contrib.auth.models import User
+
+    return list(User.objects.filter(is_active=True, last_login__isnull=False).order_by('-last_login')[:limit])
+
+
+def warm_user(user):
+    """Cache a user for request.user and their deck, each when that cache is on."""
+    from . import auth, deck_cache
+
+    if auth.enabled():
+        cache.set(auth.user_cache_key(user.pk), user, auth.USER_CACHE_TIMEOUT)
+    if deck_cache.enabled():
+        deck_cache.load_deck(user.pk)
+
+
+def _warm_user_in_thread(user):
+    try:
+        warm_user(user)
+    finally:
+        # Don't leave the pool thread's own connection open
+        connections.close_all()
+
+
+def warm_caches(users=50, concurrency=4, progress=None):
+    """
+    Fill the caches a deploy starts without: everything warm_up() primes,
+    the anonymous home, about and login pages (rendered in-process, which
+    also fills the template fragment cache), then the cached user and deck
+    (each when its cache is on) of the ``users`` most recently active users,
+    ``concurrency`` at a time.
+    ``progress(message)`` is called as each step completes. Returns the time
+    taken per step and in total, in seconds.
+    """
+    from django.core.handlers.wsgi import WSGIHandler
+
+    report = progress or (lambda message: None)
+    started = time.perf_counter()
+    timings = {'templates': warm_up()}
+    report(f'Compiled templates in {timings["templates"]:.2f}s')
+
+    step = time.perf_counter()
+    application = WSGIHandler()
+    for path in WARM_PATHS:
+        report(f'Rendered {path} ({render_page(application, path)})')
+    timings['pages'] = time.perf_counter() - step
+
+    from . import auth, deck_cache
+
+    step = time.perf_counter()
+    # Nothing to warm per user with both caches off
+    selected = active_users(users) if auth.enabled() or deck_cache.enabled() else []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(_warm_user_in_thread, user) for user in selected]
+        for done, future in enumerate(as_completed(futures), start=1):
+            future.result()
+            if done % 10 == 0 or done == len(futures):
+                report(f'Warmed {done}/{len(futures)} users')
+    timings['users'] = time.perf_counter() - step
+
+    timings['total'] = time.perf_counter() - started
+    logger.info('Cache warming took %.3fs (%d users)', timings['total'], len(selected))
+    return timings
@@ -0,0 +1,163 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Write-behind buffers
+#
+# Rows nobody needs to read straight away are appended to a local file
+# instead of being inserted during the request. Every record is one JSON
+# line, written with a single write() and fsync()ed before the request is
+# answered, so an accepted record survives a crash or restart.
+#
+# Flushing moves the active file aside as a segment (new records start a
+# fresh file), inserts the segment's records with bulk_create in batches and
+# only then deletes it. A flush interrupted half way is simply repeated:
+# models written through a buffer need a unique key (e.g. a submission UUID)
+# so bulk_create(ignore_conflicts=True) skips the rows already inserted.
+#
+# The files must be on storage the flusher can see after a restart; on hosts
+# with an ephemeral filesystem the gunicorn exit hooks flush them first.
+
+
+class WriteBehindBuffer:
+    """
+    An append-only buffer of records for ``model`` (an "app_label.Model"
+    string), kept in ``directory`` as ``<name>.jsonl`` plus any segments
+    waiting to be flushed.
+    """
+
+    def __init__(self, name, model, directory):
+        self.name = name
+        self.model = model
+        self.directory = Path(directory)
+        self.active_path = self.directory / f'{name}.jsonl'
+
+    def append(self, record, fsync=True):
+        """
+        Durably add one record (a dict of model field values). Records which
+        may be lost in a crash (e.g. analytics) can skip the fsync().
+        """
+        line = (json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n').encode()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(self.active_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                # Shared lock: any number of writers, but a flush waits for them
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                # The file may have been rotated between open() and flock()
+                try:
+                    current = os.stat(self.active_path).st_ino == os.fstat(fd).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    os.write(fd, line)
+                    if fsync:
+                        os.fsync(fd)
+                    return
+            finally:
+                os.close(fd)
+
+    def segments(self):
+        """Rotated files waiting to be flushed, oldest first."""
+        return sorted(self.directory.glob(f'{self.name}.*.segment'))
+
+    def rotate(self):
+        """Move the active file aside as a segment. Returns its path, or None if empty."""
+        segment = self.directory / f'{self.name}.{time.time_ns()}.segment'
+        try:
+            os.rename(self.active_path, segment)
+        except FileNotFoundError:
+            return None
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        # Wait for writers that opened the file before it was renamed
+        with open(segment, 'rb') as segment_file:
+            fcntl.flock(segment_file, fcntl.LOCK_EX)
+        return segment
+
+    def read_segment(self, segment):
+        """Yield the records of a segment, skipping any torn or corrupt line."""
+        with open(segment, 'rb') as segment_file:
+            for number, line in enumerate(segment_file, start=1):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning('Skipped unreadable line %d of %s', number, segment)
+
+    @contextmanager
+    def flush_lock(self):
+        """Let one flush at a time work on the buffer's segments."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / f'{self.name}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def flush(self, batch_size=500):
+        """Insert every buffered record. Returns the number of records flushed."""
+        if not self.pending():
+            return 0
+        model = apps.get_model(self.model)
+        flushed = 0
+        with self.flush_lock():
+            self.rotate()
+            for segment in self.segments():
+                batch = []
+                for record in self.read_segment(segment):
+                    batch.append(model(**record))
+                    if len(batch) >= batch_size:
+                        model.objects.bulk_create(batch, ignore_conflicts=True)
+                        flushed += len(batch)
+                        batch = []
+                if batch:
+                    model.objects.bulk_create(batch, ignore_conflicts=True)
+                    flushed += len(batch)
+                os.remove(segment)
+        return flushed
+
+    def pending(self):
+        """True if there are records waiting to be flushed."""
+        return self.active_path.exists() or bool(self.segments())
+
+
+def get_buffer(name):
+    """The buffer configured as ``name`` in WRITE_BEHIND_BUFFERS."""
+    return WriteBehindBuffer(name, settings.WRITE_BEHIND_BUFFERS[name], settings.WRITE_BEHIND_DIR)
+
+
+def flush_all(batch_size=500):
+    """Flush every configured buffer. Returns {name: records flushed}."""
+    return {name: get_buffer(name).flush(batch_size) for name in settings.WRITE_BEHIND_BUFFERS}
+
+
+def start_flusher(interval):
+    """
+    Flush every buffer each ``interval`` seconds from a daemon thread of the
+    current process (used by gunicorn workers, see gunicorn.conf.py).
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                flush_all()
+            except Exception:
+                logger.exception('Write-behind flush failed; retrying in %ss', interval)
+            finally:
+                connections.close_all()
+
+    thread = threading.Thread(target=run, name='chaos-write-behind', daemon=True)
+    thread.start()
+    return thread
@@ -46,8 +46,6 @@ INSTALLED_APPS = [
     'django.contrib.sites',  # Required for django-allauth
     'allauth',  # Django Allauth for authentication
     'allauth.account',  # Django Allauth account management
-    'allauth.socialaccount',  # Django Allauth social account management
-    'cloudinary_storage',  # Cloudinary storage backend
     'cloudinary',  # Cloudinary for image storage
     'crispy_forms',
     'crispy_bootstrap5',
@@ -56,6 +54,17 @@ INSTALLED_APPS = [
     'about',  # Custom app for the about page
 ]
 
+# Social login is only loaded when providers are configured, e.g.
+# SOCIAL_LOGIN_PROVIDERS=google,github (python manage.py startup_profile
+# shows what each app adds to a worker's cold start)
+SOCIAL_LOGIN_PROVIDERS = [
+    provider for provider in os.environ.get("SOCIAL_LOGIN_PROVIDERS", "").split(",") if provider
+]
+if SOCIAL_LOGIN_PROVIDERS:
+    INSTALLED_APPS += ['allauth.socialaccount'] + [
+        f'allauth.socialaccount.providers.{provider}' for provider in SOCIAL_LOGIN_PROVIDERS
+    ]
+
 # Django Allauth settings
 SITE_ID = 1  # Required for django-allauth
 LOGIN_REDIRECT_URL = '/'  # Redirect after successful login
@@ -69,30 +78,107 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
+    'chaos_app.middleware.ServerTimingMiddleware',  # Server-Timing header and timing logs
+    'chaos_app.middleware.MetricsMiddleware',  # Per-view latency and query metrics
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'chaos_app.middleware.CompressionMiddleware',  # Brotli / gzip for HTML and JSON
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'chaos_app.middleware.ThrottleMiddleware',  # 429 over THROTTLE_RATES, before CSRF and views
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'chaos_app.middleware.CachedAuthenticationMiddleware',  # Cache-backed request.user
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'chaos_app.middleware.ProfilerMiddleware',  # On-demand profiling (staff / signed header)
 ]
 
+# Identifies the deployed release in page ETags (see chaos_app/conditional.py);
+# Heroku sets HEROKU_RELEASE_VERSION when dyno metadata is enabled. Without it
+# a fingerprint of the static manifest and templates is used instead
+RELEASE_VERSION = os.environ.get("HEROKU_RELEASE_VERSION") or os.environ.get("RELEASE_VERSION", "")
+
+# Bearer token for Prometheus scrapes of /metrics/ (staff can always view it)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# On-demand request profiling (see chaos_app/profiler.py)
+PROFILER_TOKEN_MAX_AGE = 60 * 60  # seconds a signed X-Chaos-Profile header stays valid
+PROFILER_SAMPLE_INTERVAL = 0.001  # seconds between stack samples
+
+# Slow query log (see chaos_app/slow_queries.py); set the threshold to "" to turn it off
+SLOW_QUERY_THRESHOLD_MS = os.environ.get("SLOW_QUERY_THRESHOLD_MS", "200")
+SLOW_QUERY_THRESHOLD_MS = float(SLOW_QUERY_THRESHOLD_MS) if SLOW_QUERY_THRESHOLD_MS else None
+SLOW_QUERY_LOG_SIZE = 200  # entries kept before the oldest are overwritten
+SLOW_QUERY_RECORD_INTERVAL = 60  # seconds before the same statement is recorded again
+
+# Rate limiting (see chaos_app/throttle.py): token buckets per URL name, keyed
+# by user when logged in and by IP address otherwise
+THROTTLE_ENABLED = os.environ.get("THROTTLE_ENABLED", "true").lower() == "true"
+THROTTLE_RATES = {
+    # URL name: refill rate, bucket size and (optionally) the methods limited
+    'spin_card': {'rate': '60/m', 'burst': 20},
+    'global_spin': {'rate': '60/m', 'burst': 20},
+    'record_spin': {'rate': '120/m', 'burst': 30, 'methods': ('POST',)},
+    'about': {'rate': '5/h', 'burst': 3, 'methods': ('POST',)},
+}
+# Proxies in front of the app that append to X-Forwarded-For. Defaults to 1 on
+# Heroku (DYNO is set), where REMOTE_ADDR is the router's address and every
+# anonymous client would otherwise share one bucket
+THROTTLE_PROXY_COUNT = int(os.environ.get("THROTTLE_PROXY_COUNT", "1" if "DYNO" in os.environ else "0"))
+
+if 'test' in sys.argv:
+    # Tests share one cache and would drain the buckets; test_throttle turns it on
+    THROTTLE_ENABLED = False
+
+# Write-behind buffers (see chaos_app/write_behind.py): buffer name -> model
+WRITE_BEHIND_DIR = os.environ.get("WRITE_BEHIND_DIR", str(BASE_DIR / 'write_behind'))
+WRITE_BEHIND_BUFFERS = {
+    'collaborate_requests': 'about.CollaborateRequest',
+    'spin_events': 'chaos_app.SpinEvent',
+}
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL", "5"))  # seconds
+# Buffer collaboration requests instead of inserting them during the request
+COLLABORATE_WRITE_BEHIND = os.environ.get("COLLABORATE_WRITE_BEHIND", "false").lower() == "true"
+
+# Usage statistics (see chaos_app/usage_stats.py)
+# Log spins through the spin_events buffer; tests turn it on where needed
+RECORD_SPINS = os.environ.get("RECORD_SPINS", "true").lower() == "true" and 'test' not in sys.argv
+USAGE_ROLLUP_LAG = 60  # seconds a row must have settled before the rollup counts it
+USAGE_STATS_WEEKS = 12  # weeks shown on the stats page
+USAGE_TOP_CARDS_DAYS = 28  # days the most spun cards are counted over
+SPIN_EVENT_RETENTION_DAYS = 30  # counted spin events are deleted after this
+
+# Fraction of requests instrumented by ServerTimingMiddleware (0.0 - 1.0); the
+# Server-Timing header is only sent to staff users, or to everyone with DEBUG on
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get("SERVER_TIMING_SAMPLE_RATE", "1.0" if DEBUG else "0.1"))
+
+# Response compression (see chaos_app/middleware.py)
+COMPRESSION_MIN_SIZE = 500  # bytes; smaller responses are sent as they are
+COMPRESS_CSRF_RESPONSES = False  # BREACH: pages carrying a CSRF token stay uncompressed
+
 ROOT_URLCONF = 'chaos_cards.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django templates, reporting render time to ServerTimingMiddleware
+        'BACKEND': 'chaos_app.template_backends.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],  # Points to the templates folder in the root directory
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compiled templates are kept in memory for the life of the worker
+            # (chaos_app/warmup.py compiles them before the first request)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -116,6 +202,69 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The chaos_app backends count hits and misses per METRICS_NAME (/metrics/)
+
+if os.environ.get("REDIS_URL"):
+    # Shared cache across dynos and workers (Heroku Key-Value Store / Redis)
+    CACHES = {
+        'default': {
+            'BACKEND': 'chaos_app.cache_backends.InstrumentedRedisCache',
+            'LOCATION': os.environ.get("REDIS_URL"),
+            'METRICS_NAME': 'default',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'chaos_app.cache_backends.InstrumentedLocMemCache',
+            'METRICS_NAME': 'default',
+        }
+    }
+
+# {% cache %} fragments (nav, footer) stay in process memory: a network round
+# trip would cost more than rendering them, and a deploy starts them fresh.
+CACHES['template_fragments'] = {
+    'BACKEND': 'chaos_app.cache_backends.InstrumentedLocMemCache',
+    'LOCATION': 'template-fragments',
+    'METRICS_NAME': 'template_fragments',
+}
+
+# Sessions are written through to the database but read from the cache
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Keep the resolved request.user in the cache (see chaos_app/auth.py). On by
+# default only with Redis: per-process caches cannot see another worker's
+# invalidation, so a deactivated or demoted user would keep their access.
+AUTH_USER_CACHE_ENABLED = os.environ.get(
+    "AUTH_USER_CACHE_ENABLED", "true" if os.environ.get("REDIS_URL") else "false"
+).lower() == "true"
+AUTH_USER_CACHE_TIMEOUT = 300  # seconds
+
+# Cache each user's card ids and first My Cards page (see chaos_app/deck_cache.py).
+# On by default only with Redis: per-process caches cannot see another
+# worker's invalidation.
+DECK_CACHE_ENABLED = os.environ.get(
+    "DECK_CACHE_ENABLED", "true" if os.environ.get("REDIS_URL") else "false"
+).lower() == "true"
+DECK_CACHE_TIMEOUT = 600  # seconds
+DECK_PAYLOAD_MAX_CARDS = 1000  # larger decks are spun on the server
+
+# Public shared decks (see chaos_app/shared_decks.py). A versioned deck page
+# never changes, so shared caches (CDNs) keep it for SHARED_DECK_MAX_AGE;
+# browsers for SHARED_DECK_BROWSER_MAX_AGE. The /decks/<slug>/ pointer to
+# the current version is cached for SHARED_DECK_POINTER_MAX_AGE, which is
+# how long an edit takes to reach visitors.
+SHARED_DECK_MAX_AGE = 86400  # seconds
+SHARED_DECK_BROWSER_MAX_AGE = 300
+SHARED_DECK_POINTER_MAX_AGE = 60
+SHARED_DECK_MAX_CARDS = 500
+# Seconds the id range and size of the public card pool are cached for the
+# global spin (see chaos_app/global_spin.py); newly public cards join after it
+GLOBAL_SPIN_STATS_TIMEOUT = 300
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -154,6 +303,53 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static'),] # Points to the static folder in the root directory
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')  # Directory where collectstatic will place files
 
+# collectstatic writes content-hashed copies of every static file plus gzip and
+# Brotli variants, and WhiteNoise serves the hashed URLs with far-future
+# immutable cache headers.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+if 'test' in sys.argv:
+    # Tests run without collectstatic, so there is no manifest to look up
+    STORAGES['staticfiles'] = {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    }
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'chaos_app': {
+            'handlers': ['console'],
+            'level': os.environ.get("CHAOS_APP_LOG_LEVEL", "INFO"),
+        },
+        # One INFO line per request sampled by ServerTimingMiddleware; set
+        # TIMING_LOG_LEVEL=WARNING to keep them out of the logs
+        'chaos_app.timing': {
+            'level': os.environ.get("TIMING_LOG_LEVEL", "INFO"),
+        },
+    },
+}
+
+if 'test' in sys.argv:
+    # Keep per-request timing lines out of the test output
+    LOGGING['loggers']['chaos_app']['level'] = 'WARNING'
+    LOGGING['loggers']['chaos_app.timing']['level'] = 'WARNING'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,170 @@
+"""
+Gunicorn production profile for Chaos Cards.
+
+Gunicorn picks this file up automatically from the working directory, so the
+Procfile only names the application. Every value can be overridden with an
+environment variable (WEB_CONCURRENCY is set by Heroku per dyno size).
+
+https://docs.gunicorn.org/en/stable/settings.html
+"""
+import multiprocessing
+import os
+import tempfile
+
+
+def _cpu_count():
+    """CPUs this process may run on (respects container CPU affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def _memory_limit_mb():
+    """Memory available to the dyno/container in MB, or None if unknown."""
+    limits = (
+        '/sys/fs/cgroup/memory.max',  # cgroup v2
+        '/sys/fs/cgroup/memory/memory.limit_in_bytes',  # cgroup v1
+    )
+    for path in limits:
+        try:
+            with open(path) as limit_file:
+                value = limit_file.read().strip()
+        except OSError:
+            continue
+        # "max" or a huge sentinel means the cgroup is unlimited
+        if value.isdigit() and int(value) < 1 << 50:
+            return int(value) // (1024 * 1024)
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def _default_workers():
+    """
+    The usual (2 x CPU) + 1 workers, capped so that every worker fits in the
+    available memory with headroom for the master process and page cache.
+    """
+    workers = _cpu_count() * 2 + 1
+    memory_mb = _memory_limit_mb()
+    if memory_mb:
+        per_worker_mb = int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', 150))
+        workers = min(workers, int(memory_mb * 0.8) // per_worker_mb)
+    return max(workers, 1)
+
+
+def _metrics_dir():
+    """
+    Directory through which workers share Prometheus metrics. Must be set
+    before Django (and so prometheus_client) is loaded. It is emptied by
+    on_starting, not here: a reload (HUP) reads this file again while the
+    workers are still writing their files.
+    """
+    path = os.environ.setdefault(
+        'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'chaos-cards-metrics'),
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# Server socket
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Worker processes
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+workers = int(os.environ.get('WEB_CONCURRENCY', _default_workers()))
+# Threads only apply to the gthread worker class
+threads = int(os.environ.get('GUNICORN_THREADS', 2 if worker_class == 'gthread' else 1))
+
+# Load Django once in the master so workers share its pages copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Recycle workers regularly, staggered so they never all restart together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Timeouts: card creation uploads images to Cloudinary inside the request
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Metrics (see chaos_app/metrics.py)
+metrics_dir = _metrics_dir()
+
+# Logging
+accesslog = '-'
+errorlog = '-'
+
+
+# Server hooks
+
+def on_starting(server):
+    # Values from a previous run must not be carried over. With the app
+    # preloaded the master has opened its own files already: keep those
+    from chaos_app.metrics import clear_directory
+    clear_directory(metrics_dir, keep_pid=os.getpid())
+
+
+def when_ready(server):
+    # With the app preloaded, compile templates once in the master so every
+    # worker inherits them copy-on-write
+    if preload_app:
+        from chaos_app.warmup import warm_up
+        warm_up()
+
+
+def pre_fork(server, worker):
+    # Never share a database connection opened in the master with a worker
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    # Prime per-process caches before the worker accepts its first request.
+    # WARM_CACHES_ON_START also renders the public pages and loads the most
+    # active users' decks (see manage.py warm_caches)
+    if os.environ.get('WARM_CACHES_ON_START', 'false').lower() == 'true':
+        from chaos_app.warmup import warm_caches
+        warm_caches(
+            users=int(os.environ.get('WARM_CACHES_USERS', 50)),
+            concurrency=int(os.environ.get('WARM_CACHES_CONCURRENCY', 4)),
+        )
+    else:
+        from chaos_app.warmup import warm_up
+        warm_up()
+    # Insert buffered writes in the background (see chaos_app/write_behind.py)
+    from django.conf import settings
+    from chaos_app.write_behind import start_flusher
+    start_flusher(settings.WRITE_BEHIND_FLUSH_INTERVAL)
+
+
+def worker_exit(server, worker):
+    # Don't leave buffered writes behind when a worker is recycled or stopped
+    from chaos_app.write_behind import flush_all
+    flush_all()
+
+
+def on_exit(server):
+    # Last chance before the dyno's filesystem goes away: flush anything the
+    # workers did not (Django is only loaded here without preload_app)
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chaos_cards.settings')
+    django.setup()
+    from chaos_app.write_behind import flush_all
+    flush_all()
+
+
+def child_exit(server, worker):
+    # Fold an exited worker's counters into the archive files, so recycled
+    # workers do not pile up files for every scrape to read, and drop its
+    # live gauges
+    from prometheus_client import multiprocess
+    from chaos_app.metrics import archive_dead_process
+    archive_dead_process(worker.pid, metrics_dir)
+    multiprocess.mark_process_dead(worker.pid, metrics_dir)
@@ -4,6 +4,7 @@ const cardForm = document.getElementById('card-form');
 const formTitle = document.getElementById('form-title');
 const formTitleInput = document.getElementById('id_title');
 const formContent = document.getElementById('id_content');
+const formTags = document.getElementById('id_tags');
 const submitButton = document.getElementById('submit-btn');
 
 const deleteModal = new bootstrap.Modal(document.getElementById('deleteModal'));
@@ -21,9 +22,11 @@ for (let button of editButtons) {
         // Retrieve card title and content from DOM
         let cardTitle = document.getElementById(`card-title${cardId}`);
         let cardContent = document.getElementById(`card-content${cardId}`);
+        let cardTags = document.getElementById(`card-tags${cardId}`);
         // Populate form fields with card data
         formTitleInput.value = cardTitle.innerText;
         formContent.value = cardContent.innerText;
+        formTags.value = cardTags.dataset.tags;
         // Alter form title and submit button text
         formTitle.innerText = "Edit Card";
         submitButton.innerText = "Update Card";
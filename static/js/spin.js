@@ -0,0 +1,120 @@
+const spinForm = document.getElementById('spin-form');
+const demoCard = document.getElementById('demo-card');
+const spinTags = document.getElementById('spin-tags');
+
+/**
+ * Loads the user's deck from the deck payload. The browser keeps the payload
+ * in its HTTP cache and revalidates it with the ETag, so an unchanged deck
+ * only costs a 304. Resolves to a list of cards, or null when the spin
+ * should be left to the server (no cards, a very large deck or an error).
+**/
+async function loadDeck() {
+    const response = await fetch(spinForm.dataset.deckUrl, {
+        cache: 'no-cache',
+        credentials: 'same-origin',
+        headers: {'Accept': 'application/json'},
+    });
+    // A redirect means the session has expired: let the server handle it
+    if (!response.ok || response.redirected) {
+        return null;
+    }
+    const payload = await response.json();
+    if (!payload.complete || !payload.cards.length) {
+        return null;
+    }
+    // Rows are arrays with the column names given once in payload.fields
+    return payload.cards.map((row) => Object.fromEntries(
+        payload.fields.map((field, index) => [field, row[index]])
+    ));
+}
+
+/**
+ * Offers every tag of the deck as a checkbox of the spin form, keeping the
+ * tags the page was rendered with (and their ticks).
+**/
+function showTags(cards) {
+    const present = new Set(
+        Array.from(spinTags.querySelectorAll('input[name="tag"]'), (input) => input.value)
+    );
+    const names = new Set(cards.flatMap((card) => card.tags));
+    for (const name of Array.from(names).sort()) {
+        if (present.has(name)) {
+            continue;
+        }
+        const label = document.createElement('label');
+        label.className = 'spin-tag';
+        const input = document.createElement('input');
+        input.type = 'checkbox';
+        input.name = 'tag';
+        input.value = name;
+        label.append(input, ` ${name}`);
+        spinTags.append(label);
+    }
+}
+
+/**
+ * The cards carrying every ticked tag.
+**/
+function matchingCards(cards) {
+    const ticked = Array.from(spinTags.querySelectorAll('input[name="tag"]:checked'), (input) => input.value);
+    return cards.filter((card) => ticked.every((name) => card.tags.includes(name)));
+}
+
+/**
+ * Reports a spin to the server for the user's stats. Sent with keepalive so
+ * it survives the user leaving the page; a failure (e.g. offline) only
+ * loses the count.
+**/
+function recordSpin(card) {
+    const csrfToken = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+    if (!spinForm.dataset.recordUrl || !csrfToken) {
+        return;
+    }
+    fetch(spinForm.dataset.recordUrl, {
+        method: 'POST',
+        credentials: 'same-origin',
+        keepalive: true,
+        headers: {'X-CSRFToken': csrfToken[1]},
+        body: new URLSearchParams({card: card.id}),
+    }).catch(() => {});
+}
+
+/**
+ * Displays a card in place of the current one.
+**/
+function showCard(card) {
+    const image = demoCard.querySelector('img');
+    image.src = card.image;
+    image.alt = card.title;
+    demoCard.querySelector('.card-title').textContent = card.title;
+    demoCard.querySelector('.card-text').textContent = card.content;
+}
+
+if (spinForm && demoCard) {
+    // Start downloading the deck straight away, before the first spin
+    const deck = loadDeck().catch(() => null);
+    deck.then((cards) => {
+        if (cards && spinTags) {
+            showTags(cards);
+        }
+    });
+
+    spinForm.addEventListener('submit', async (e) => {
+        e.preventDefault();
+        const cards = await deck;
+        if (!cards) {
+            // Fall back to a server-side spin
+            spinForm.submit();
+            return;
+        }
+        const candidates = spinTags ? matchingCards(cards) : cards;
+        if (!candidates.length) {
+            // No card has every tag: the server says so
+            spinForm.submit();
+            return;
+        }
+        const card = candidates[Math.floor(Math.random() * candidates.length)];
+        showCard(card);
+        recordSpin(card);
+    });
+}